@@ -1,8 +1,8 @@
 # app/config.py
 import json
-from typing import List
+from typing import Annotated, List
 from pydantic import field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -13,22 +13,87 @@ class Settings(BaseSettings):
     gate_api_secret: str = ""
 
     symbols: List[str] = []
+    # биржи арбитражной матрицы (имена из exchanges.venues.CLIENTS)
+    venues: Annotated[List[str], NoDecode] = ["bybit", "gate"]
     dry_run: bool = True
 
     spread_min_bps: int = 30
     slippage_bps: int = 10
+    depth_aware: bool = True  # проверять спред по VWAP всей глубины на объём сделки
+    batch_eval: bool = False  # спреды всех символов одним проходом NumPy после опроса
     min_notional: float = 50.0
     max_order_usd: float = 100.0
-    daily_limit_usd: float = 500.0
+    daily_limit_usd: float = 500.0  # обнуляется в полночь UTC
+    # лимиты риск-движка: notional незавершённых хеджей и частота ордеров (кулдаун — ANTIFLOOD_SECONDS)
+    risk_max_symbol_usd: float = 300.0
+    risk_max_venue_usd: float = 500.0
+    risk_max_orders: int = 20  # ордеров за окно risk_window_sec; 0 — без лимита
+    risk_window_sec: float = 1.0
+    inventory_check: bool = True  # при DRY_RUN=false — сделка только если балансов хватает
+    inventory_reconcile_sec: float = 30.0  # сверка балансов в памяти с REST
 
     antiflood_seconds: int = 30
+    # таймаут ноги = mult * p99 задержки биржи в пределах [floor, cap] (до 20 замеров — cap)
+    leg_timeout_floor_ms: float = 250.0
+    leg_timeout_cap_ms: float = 5000.0
+    leg_timeout_mult: float = 3.0
+    hedge_settle_sec: float = 30.0  # сколько в фоне ждать опоздавшую ногу / разворот
+    fast_orders: bool = True  # ордера прямым подписанным REST, ccxt — фоллбек
+    warm_connections: int = 2  # сколько TLS-соединений держать открытыми к торговому REST
+    heartbeat_sec: float = 15.0  # период heartbeat, не даёт пулу остыть
+    fetch_concurrency: int = 8  # запросов стакана в полёте на одну биржу
+    # адаптивный опрос: свой период на символ по близости спреда к порогу и его волатильности
+    adaptive_poll: bool = False
+    poll_budget_rps: float = 20.0  # запросов стакана в секунду на все биржи
+    poll_min_ms: int = 200  # горячий символ — не чаще
+    poll_max_ms: int = 10000  # холодный — не реже
+    rate_soft_usage: float = 0.8  # доля бюджета запросов биржи, после которой поллинг ждёт
+    # трассировка стадий решения (/trace): сколько медленных решений держать и порог, мс (0 — p90)
+    trace_enabled: bool = True
+    trace_keep: int = 100
+    trace_slow_ms: float = 0.0
+    loop_lag_interval_ms: int = 100  # период замера задержки event loop (/metrics)
     log_level: str = "INFO"
     stop_trading: bool = False
     demo_mode: bool = False
     metrics_port: int = 8000
+    # SHARDS=N — символы делятся между N процессами, общий дневной бюджет и /metrics у супервизора
+    shards: int = 1
+    shard_report_sec: float = 1.0  # как часто шард шлёт снимок метрик супервизору
+
+    # --- WS-стаканы (Bybit/Gate) вместо REST-поллинга ---
+    ws_books: bool = False
+    event_driven: bool = False  # решения по апдейтам WS-стаканов вместо цикла раз в секунду
+    bybit_ws_url: str = ""
+    gate_ws_url: str = ""
+
+    # --- общий кэш стаканов ---
+    quote_max_age_ms: int = 250    # моложе — отдаём из памяти без запроса
+    quote_max_stale_ms: int = 3000  # если запрос упал, можно отдать стакан не старше
+
+    # --- запись стаканов (storage/books_bin.py): верх depth уровней, каталог на сутки UTC ---
+    record_books: bool = False
+    record_dir: str = "storage/books"
+    record_depth: int = 5
+    record_flush_sec: float = 1.0
+
+    # --- снапшот маркетов на диске (старт без load_markets) ---
+    markets_dir: str = "storage/markets"
+    markets_ttl_sec: int = 21600  # старше — обновляем в фоне
+
+    # --- симулятор биржи (VENUES=sim_a,sim_b / HFT_VENUE=sim) ---
+    sim_mid: float = 100.0  # стартовая цена синтетического стакана
+    sim_spread_bps: float = 5.0
+    sim_vol_bps: float = 2.0  # шаг случайного блуждания mid на каждый запрос стакана
+    sim_latency_ms: float = 5.0
+    sim_jitter_ms: float = 2.0
+    sim_partial_rate: float = 0.0  # доля ордеров, исполненных частично
+    sim_error_rate: float = 0.0  # доля вызовов, падающих NetworkError
+    sim_replay: str = ""  # JSONL со снапшотами стаканов вместо синтетики
 
     # --- HFT Bithumb ---
     hft_enabled: bool = False
+    hft_venue: str = "bithumb"  # sim — прогон HFT-цикла без сети
     hft_poll_sec: int = 3
     hft_order_usd: float = 50.0
     hft_tickers_whitelist: List[str] = []
@@ -87,6 +152,22 @@ class Settings(BaseSettings):
             return [x.strip().upper() for x in v.split(",") if x.strip()]
         return v
 
+    @field_validator("venues", mode="before")
+    @classmethod
+    def _parse_venues(cls, v):
+        if isinstance(v, str):
+            v = v.strip()
+            if v.startswith("["):
+                try:
+                    v = json.loads(v)
+                except Exception:
+                    v = v.strip("[]")
+            if isinstance(v, str):
+                v = v.split(",")
+        if isinstance(v, list):
+            return [str(x).strip().strip('"').lower() for x in v if str(x).strip()]
+        return v
+
 
 def load_settings() -> Settings:
     return Settings()
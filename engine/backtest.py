@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Settings
+from engine.decision import evaluate_books
+from engine.matrix import fx_rates
+from engine.risk import AntiFlood, RiskEngine
+from exchanges.sim import SimExchange
+from storage.books_bin import BookFrame, open_books
+from storage.journal_csv import summarize
+from web.metrics import State
+
+
+class VirtualClock:
+    """Время прогона: стоит на отметке последней проигранной записи, unix ns."""
+
+    def __init__(self, now_ns: int = 0) -> None:
+        self.now_ns = now_ns
+
+    def monotonic_ns(self) -> int:
+        return self.now_ns
+
+    def time(self) -> float:
+        return self.now_ns / 1e9
+
+
+def _book(frame: BookFrame, k: int) -> Dict[str, Any]:
+    # строка memmap -> ccxt-словарь; пустые уровни (NaN) отбрасываются
+    bids = [[p, q] for p, q in zip(frame.bid_px[k].tolist(), frame.bid_qty[k].tolist()) if p == p]
+    asks = [[p, q] for p, q in zip(frame.ask_px[k].tolist(), frame.ask_qty[k].tolist()) if p == p]
+    return {"bids": bids, "asks": asks, "timestamp": int(frame.ts_ns[k]) // 1_000_000}
+
+
+def _quote_ccy(symbols: Sequence[str]) -> str:
+    # KRW-биржа пишет BTC/KRW и курс USDT/KRW — котируемая валюта у неё не USDT
+    quotes_ = {s.split("/")[1] for s in symbols if "/" in s and not s.startswith("USDT/")}
+    return quotes_.pop() if len(quotes_) == 1 else "USDT"
+
+
+class Replay:
+    """
+    Прогон записанных стаканов (storage/books_bin.py) через тот же путь решения,
+    что и trade_once: evaluate_books -> calc_spread, правила биржи, лимиты
+    RiskEngine и Executor в dry-run. Время виртуальное: кулдауны, окно ордеров и
+    дневной бюджет считаются по отметкам записей, без sleep. step_ms — период
+    решений, как опрос раз в секунду (решаются символы, по которым с прошлого шага
+    пришёл стакан); step_ms=0 — решение на каждую запись, как EVENT_DRIVEN.
+    Биржи — SimExchange с правилами из venue_kw (lot, tick, min_cost, fee_bps).
+    """
+
+    def __init__(self, frames: Sequence[BookFrame], settings: Settings, step_ms: int = 1000,
+                 venue_kw: Optional[Dict[str, Any]] = None) -> None:
+        self.frames = list(frames)
+        self.s = settings
+        self.step_ns = int(step_ms * 1_000_000)
+        self.clock = VirtualClock()
+        by_venue: Dict[str, set] = {}
+        for f in self.frames:
+            vs, ss = f.cols["venue"], f.cols["symbol"]
+            pairs = set(zip(vs.tolist(), ss.tolist())) if len(f) else set()
+            for v, sym in pairs:
+                by_venue.setdefault(f.venues[v], set()).add(f.symbols[sym])
+        self.venues: List[SimExchange] = []
+        common: Dict[str, set] = {}
+        for name in sorted(by_venue):
+            q = _quote_ccy(sorted(by_venue[name]))
+            ex = SimExchange(name, quote_ccy=q, **(venue_kw or {}))
+            self.venues.append(ex)
+            for vsym in by_venue[name]:
+                if vsym.startswith("USDT/"):
+                    continue
+                base = vsym.split("/")[0]
+                common.setdefault(f"{base}/USDT", set()).add(name)
+        # символы, которые есть хотя бы на двух биржах (или заданные в настройках)
+        self.symbols = list(settings.symbols) or sorted(c for c, vs in common.items() if len(vs) >= 2)
+        for ex in self.venues:
+            for sym in self.symbols:
+                ex.add_market(sym)
+        self.st = State()
+        self.journal: List[Dict[str, Any]] = []
+        self.st.journal = self._journal
+        self.af = AntiFlood(getattr(settings, "antiflood_seconds", 30), clock_ns=self.clock.monotonic_ns)
+        self.limit = RiskEngine(
+            daily_usd=settings.daily_limit_usd,
+            max_symbol_usd=settings.risk_max_symbol_usd,
+            max_venue_usd=settings.risk_max_venue_usd,
+            cooldown_s=getattr(settings, "antiflood_seconds", 30),
+            max_orders=settings.risk_max_orders,
+            window_s=settings.risk_window_sec,
+            clock_ns=self.clock.monotonic_ns, wall=self.clock.time,
+        )
+        self.rows = 0
+        self.decisions = 0
+
+    def _journal(self, row: Dict[str, Any]) -> None:
+        row["ts"] = datetime.fromtimestamp(self.clock.time(), tz=timezone.utc).replace(
+            tzinfo=None).isoformat()
+        self.journal.append(row)
+
+    async def _decide(self, dirty: Dict[str, None], latest: Dict[Tuple[int, str], Any]) -> None:
+        for sym in dirty:
+            books = []
+            for i, ex in enumerate(self.venues):
+                hit = latest.get((i, ex.venue_symbol(sym)))
+                if hit is not None and not isinstance(hit, dict):
+                    hit = latest[(i, ex.venue_symbol(sym))] = _book(*hit)
+                books.append(hit)
+            if sum(b is not None for b in books) < 2:
+                continue
+            self.decisions += 1
+            await evaluate_books(sym, books, self.venues, self.s, self.st, self.af, self.limit)
+        dirty.clear()
+
+    async def run(self) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        venue_idx = {ex.name: i for i, ex in enumerate(self.venues)}
+        fx_quotes = {ex.quote_ccy for ex in self.venues if ex.quote_ccy != "USDT"}
+        to_common: Dict[Tuple[int, str], Optional[str]] = {}
+        for ex in self.venues:
+            for sym in self.symbols:
+                to_common[(venue_idx[ex.name], ex.venue_symbol(sym))] = sym
+        latest: Dict[Tuple[int, str], Any] = {}  # (биржа, символ биржи) -> (frame, k) | стакан
+        dirty: Dict[str, None] = {}  # символы с новым стаканом с прошлого решения, по порядку
+        first_ns = last_ns = None
+        next_ns = None
+        for f in self.frames:
+            if not len(f):
+                continue
+            order = np.argsort(f.cols["ts_ns"], kind="stable")
+            ts_col = f.cols["ts_ns"][order].tolist()
+            v_col = [venue_idx[f.venues[v]] for v in f.cols["venue"][order].tolist()]
+            s_col = [f.symbols[x] for x in f.cols["symbol"][order].tolist()]
+            for ts, vi, vsym, k in zip(ts_col, v_col, s_col, order.tolist()):
+                if first_ns is None:
+                    first_ns = ts
+                    next_ns = ts + self.step_ns
+                if self.step_ns and ts >= next_ns:
+                    if dirty:
+                        self.clock.now_ns = next_ns
+                        await self._decide(dirty, latest)
+                    next_ns += ((ts - next_ns) // self.step_ns + 1) * self.step_ns
+                self.clock.now_ns = last_ns = ts
+                self.rows += 1
+                if vsym.startswith("USDT/") and vsym[5:] in fx_quotes:
+                    b = _book(f, k)
+                    if b["bids"] and b["asks"]:
+                        fx_rates.set(vsym[5:], (b["bids"][0][0] + b["asks"][0][0]) / 2.0)
+                    continue
+                sym = to_common.get((vi, vsym))
+                if sym is None:
+                    continue
+                latest[(vi, vsym)] = (f, k)
+                dirty[sym] = None
+                if not self.step_ns:
+                    await self._decide(dirty, latest)
+        if dirty:
+            await self._decide(dirty, latest)
+        elapsed = time.perf_counter() - t0
+        virtual = (last_ns - first_ns) / 1e9 if first_ns is not None else 0.0
+        return {
+            "params": {"spread_min_bps": self.s.spread_min_bps, "slippage_bps": self.s.slippage_bps,
+                       "step_ms": self.step_ns // 1_000_000},
+            "rows": self.rows,
+            "decisions": self.decisions,
+            "trades": len(self.journal),
+            "pnl": summarize(self.journal),
+            "risk_rejects": dict(self.limit.rejects),
+            "virtual_s": round(virtual, 3),
+            "elapsed_s": round(elapsed, 3),
+            "speedup": round(virtual / elapsed, 1) if elapsed > 0 else None,
+            "journal": self.journal,
+        }
+
+
+def backtest_settings(**overrides: Any) -> Settings:
+    # бэктест — всегда dry-run без демо-сделок; остальное — умолчания Settings и overrides
+    # (.env не читается: прогон не зависит от боевого конфига)
+    overrides.update(dry_run=True, demo_mode=False)
+    return Settings(_env_file=None, **overrides)
+
+
+async def replay(root: str, settings: Settings, days: Optional[Sequence[str]] = None,
+                 step_ms: int = 1000, venue_kw: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return await Replay(open_books(root, days), settings, step_ms, venue_kw).run()
+
+
+def _run_point(args: Tuple[str, Dict[str, Any], Optional[Sequence[str]], int,
+                           Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    # в процессе пула: свой event loop, memmap тех же файлов (страницы общие через page cache)
+    root, overrides, days, step_ms, venue_kw = args
+    res = asyncio.run(replay(root, backtest_settings(**overrides), days, step_ms, venue_kw))
+    res.pop("journal")
+    return res
+
+
+def sweep(root: str, spread_min_bps: Sequence[int], slippage_bps: Sequence[int],
+          base: Optional[Dict[str, Any]] = None, days: Optional[Sequence[str]] = None,
+          step_ms: int = 1000, venue_kw: Optional[Dict[str, Any]] = None,
+          workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Сетка spread_min_bps x slippage_bps: точка — отдельный прогон в пуле процессов
+    (workers, по умолчанию — число ядер). Результаты в порядке сетки, без журналов.
+    """
+    points = [(root, {**(base or {}), "spread_min_bps": sp, "slippage_bps": sl}, days, step_ms, venue_kw)
+              for sp, sl in itertools.product(spread_min_bps, slippage_bps)]
+    workers = min(workers or os.cpu_count() or 1, len(points))
+    if workers <= 1:
+        return [_run_point(p) for p in points]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_point, points))
@@ -0,0 +1,108 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SpreadBatch:
+    """
+    Спреды по верху стакана сразу для многих строк (symbol x пара бирж)
+    одним проходом NumPy — та же формула, что в calc_spread, без dataclass'ов
+    и питоновского цикла. Буферы выделяются один раз на ёмкость.
+
+    Строка i: a — первая биржа пары, b — вторая.
+      s1 — купить на a, продать на b; s2 — купить на b, продать на a.
+    fee/slippage/порог можно задать скаляром или массивом на строку.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.n = 0
+        self.bid_a = np.zeros(capacity)
+        self.ask_a = np.zeros(capacity)
+        self.bid_b = np.zeros(capacity)
+        self.ask_b = np.zeros(capacity)
+        self.s1 = np.zeros(capacity)
+        self.s2 = np.zeros(capacity)
+        self._buy = np.zeros(capacity)
+        self._sell = np.zeros(capacity)
+
+    def reset(self) -> None:
+        self.n = 0
+
+    def add(self, bid_a: float, ask_a: float, bid_b: float, ask_b: float) -> int:
+        i = self.n
+        if i >= self.capacity:
+            self._grow(self.capacity * 2)
+        self.bid_a[i], self.ask_a[i], self.bid_b[i], self.ask_b[i] = bid_a, ask_a, bid_b, ask_b
+        self.n = i + 1
+        return i
+
+    def _grow(self, capacity: int) -> None:
+        for name in ("bid_a", "ask_a", "bid_b", "ask_b", "s1", "s2", "_buy", "_sell"):
+            old = getattr(self, name)
+            new = np.zeros(capacity)
+            new[: len(old)] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def compute(self, taker_fee_bps, slippage_bps, spread_min_bps
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Возвращает (s1, s2, idx, direction): спреды в bps по всем строкам,
+        индексы строк, где спред >= порога, и направление для них
+        (0 — buy_a_sell_b, 1 — buy_b_sell_a; при обоих приоритет у 0, как в trade_once).
+        Строки с пустой стороной стакана (0) получают -inf.
+        """
+        n = self.n
+        fee = np.asarray(taker_fee_bps, dtype=np.float64) / 10000.0
+        slip = 1.0 + np.asarray(slippage_bps, dtype=np.float64) / 10000.0
+        thr = np.asarray(spread_min_bps, dtype=np.float64)
+        buy, sell = self._buy[:n], self._sell[:n]
+        s1, s2 = self.s1[:n], self.s2[:n]
+
+        np.multiply(self.ask_a[:n], slip, out=buy)
+        np.multiply(self.bid_b[:n], 1.0 - fee, out=sell)
+        _bps(sell, buy, s1)
+
+        np.multiply(self.ask_b[:n], slip, out=buy)
+        np.multiply(self.bid_a[:n], 1.0 - fee, out=sell)
+        _bps(sell, buy, s2)
+
+        ok1 = s1 >= thr
+        ok = ok1 | (s2 >= thr)
+        idx = np.flatnonzero(ok)
+        direction = np.where(ok1[idx], 0, 1)
+        return s1, s2, idx, direction
+
+
+def _bps(sell: np.ndarray, buy: np.ndarray, out: np.ndarray) -> None:
+    # out = (sell - buy) / buy * 1e4; пустые стороны -> -inf
+    np.subtract(sell, buy, out=out)
+    np.divide(out, buy, out=out, where=buy > 0)
+    out *= 10000.0
+    out[(buy <= 0) | (sell <= 0)] = -np.inf
+
+
+def ema_fold(avg: float, values: np.ndarray, alpha: float = 0.1) -> float:
+    """EMA после последовательного применения values (avg = avg*(1-a) + x*a) за один проход."""
+    vals = values[np.isfinite(values)]
+    n = vals.size
+    if n == 0:
+        return avg
+    w = alpha * (1.0 - alpha) ** np.arange(n - 1, -1, -1)
+    return float(avg * (1.0 - alpha) ** n + np.dot(w, vals))
+
+
+def batch_spreads(bid_a, ask_a, bid_b, ask_b, taker_fee_bps, slippage_bps, spread_min_bps,
+                  batch: Optional[SpreadBatch] = None):
+    """Разовый вызов SpreadBatch по готовым массивам."""
+    bid_a = np.asarray(bid_a, dtype=np.float64)
+    n = bid_a.size
+    if batch is None or batch.capacity < n:
+        batch = SpreadBatch(max(n, 1))
+    batch.n = n
+    batch.bid_a[:n] = bid_a
+    batch.ask_a[:n] = ask_a
+    batch.bid_b[:n] = bid_b
+    batch.ask_b[:n] = ask_b
+    return batch.compute(taker_fee_bps, slippage_bps, spread_min_bps)
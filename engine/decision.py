@@ -0,0 +1,195 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from engine.executor import Executor
+from engine.hedges import FILLED, STUCK, Hedge, hedges
+from engine.inventory import inventory
+from engine.matrix import best_pair, fx_rates, in_usdt, top_of_books
+from engine.risk import AntiFlood, DailyLimitUsd
+from engine.signals import SpreadInput, calc_depth_spread, calc_spread
+from exchanges.base import BaseExchange, best_bid_ask
+from utils.prom import execution_seconds, spread_bps
+from utils.trace import current as current_trace
+from web.metrics import State
+
+
+# решение по символу: общий путь торгового цикла (main) и бэктеста (engine/backtest.py)
+async def evaluate_symbol(sym: str, ob_a, ob_b, ex_a: BaseExchange, ex_b: BaseExchange, s,
+                          st: State, af: AntiFlood, limit: DailyLimitUsd,
+                          spreads: Optional[Tuple[float, float]] = None,
+                          fx_a: float = 1.0, fx_b: float = 1.0, named: bool = False,
+                          tick_ns: Optional[int] = None) -> None:
+    """
+    Решение по одной паре бирж. sym — общий 'BTC/USDT'; fx_* — множитель цен
+    биржи в USDT (KRW-стаканы пересчитываются); spreads — уже посчитанные
+    (s1, s2) по верху стакана (батч/матрица); named — направление в журнале
+    по именам бирж (buy_gate_sell_bithumb) вместо a/b; tick_ns — perf_counter_ns
+    апдейта стакана, вызвавшего решение (событийный режим). Стадии пишутся
+    в трассу текущего решения (utils/trace.py), если она есть.
+    """
+    tr = current_trace.get()
+    ob_a, ob_b = in_usdt(ob_a, fx_a), in_usdt(ob_b, fx_b)
+    a_bid, a_ask = best_bid_ask(ob_a)
+    b_bid, b_ask = best_bid_ask(ob_b)
+    if not (a_bid and a_ask and b_bid and b_ask):
+        return
+
+    # комиссия — большая из двух бирж, как в батче и в проверке глубины
+    fee = max(ex_a.taker_fee_bps, ex_b.taker_fee_bps)
+    if spreads is None:
+        r1, r2 = calc_spread(SpreadInput(
+            bid_a=a_bid, ask_a=a_ask,
+            bid_b=b_bid, ask_b=b_ask,
+            taker_fee_bps=fee,
+            slippage_bps=s.slippage_bps,
+        ))
+        s1, s2 = r1.spread_bps, r2.spread_bps
+        st.avg_spread_bps = (st.avg_spread_bps * 0.9) + (max(s1, s2) * 0.1)
+        st.last_spread[sym] = max(s1, s2)
+        spread_bps.observe(max(s1, s2))
+    else:
+        s1, s2 = spreads
+    tr.mark("spread")
+
+    target = None
+    if s1 >= s.spread_min_bps:
+        target = ("buy_a_sell_b", ex_a, ex_b, a_ask, b_bid)
+    elif s2 >= s.spread_min_bps:
+        target = ("buy_b_sell_a", ex_b, ex_a, b_ask, a_bid)
+
+    demo = False
+    if not target:
+        if s.dry_run and getattr(s, "demo_mode", False):
+            target = ("buy_a_sell_b", ex_a, ex_b, a_ask, a_ask * 1.0003)
+            demo = True
+        else:
+            tr.outcome = "below"
+            return
+
+
+    usd = min(s.max_order_usd, s.daily_limit_usd)
+
+    dir_name, ex_buy, ex_sell, px_buy, px_sell = target
+    fx_buy, fx_sell = (fx_a, fx_b) if ex_buy is ex_a else (fx_b, fx_a)
+    sym_buy, sym_sell = ex_buy.venue_symbol(sym), ex_sell.venue_symbol(sym)
+
+    min_cost_buy = (ex_buy.min_notional(sym_buy) or 0.0) * fx_buy
+    min_cost_sell = (ex_sell.min_notional(sym_sell) or 0.0) * fx_sell
+    usd_base = max(usd, min_cost_buy, min_cost_sell, s.min_notional)
+    tr.mark("rules")
+    # лимиты в памяти (engine/risk.py): кулдаун, экспозиция, частота ордеров, дневной бюджет
+    reject = limit.check(sym, ex_buy.name, ex_sell.name, usd_base)
+    tr.mark("risk")
+    if reject is not None:
+        tr.outcome = reject
+        return
+
+
+    raw_amount = usd_base / px_buy
+
+    # верх стакана прошёл порог — проверяем исполнимый спред на весь notional
+    if not demo and getattr(s, "depth_aware", True):
+        d1, d2 = calc_depth_spread(ob_a, ob_b, usd_base, taker_fee_bps=fee,
+                                   spread_min_bps=s.spread_min_bps, slippage_bps=s.slippage_bps)
+        d = d1 if dir_name == "buy_a_sell_b" else d2
+        tr.mark("depth")
+        if not d.ok:
+            tr.outcome = "depth"
+            return
+        px_buy, px_sell, raw_amount = d.vwap_buy, d.vwap_sell, d.amount
+    amt_buy  = ex_buy.normalize_amount(sym_buy,  raw_amount)
+    amt_sell = ex_sell.normalize_amount(sym_sell, raw_amount)
+
+    amount = min(amt_buy, amt_sell)
+    tr.mark("normalize")
+    if amount <= 0:
+        tr.outcome = "amount"
+        return
+    # остатки из памяти (engine/inventory.py); px_buy здесь в USDT — обратно в валюту биржи
+    ok = inventory.can_hedge(ex_buy, sym_buy, ex_sell, sym_sell, amount, px_buy / fx_buy)
+    tr.mark("inventory")
+    if not ok:
+        tr.outcome = "inventory"
+        return
+
+    execu = Executor(ex_buy, ex_sell, dry_run=s.dry_run,
+                     settle_timeout=getattr(s, "hedge_settle_sec", 30.0))
+
+    if tick_ns is not None:
+        st.tick_to_dispatch.add((time.perf_counter_ns() - tick_ns) / 1000.0)
+    # между check и commit нет await — параллельные решения видят экспозицию друг друга
+    ticket = limit.commit(sym, ex_buy.name, ex_sell.name, usd_base)
+    tr.mark("dispatch")
+    t0 = asyncio.get_event_loop().time()
+    try:
+        res = await execu.market_hedge(sym_buy, amount, sell_symbol=sym_sell)
+    except BaseException:
+        limit.release(ticket)
+        raise
+    t1 = asyncio.get_event_loop().time()
+    tr.mark("execute")
+    tr.outcome = res.get("state") or res.get("status") or "sent"
+    # экспозиция снимается, когда хедж завершён (опоздавшая нога/разворот — позже, в фоне);
+    # застрявший (stuck) держит её до ручной проверки. Успех — только обе ноги исполнены.
+    def settled(h: Optional[Hedge]) -> None:
+        if h is not None and h.state == FILLED:
+            st.success_trades += 1
+        if h is None or h.state != STUCK:
+            limit.release(ticket)
+
+    if "id" in res:
+        hedges.watch(res["id"], settled)
+    else:
+        limit.release(ticket)
+        st.success_trades += 1  # dry-run
+    st.avg_execution_ms = st.avg_execution_ms * 0.8 + (t1 - t0) * 1000.0 * 0.2
+    execution_seconds.observe(t1 - t0)
+
+    if named:
+        dir_name = f"buy_{ex_buy.name}_sell_{ex_sell.name}"
+
+    pnl = (px_sell - px_buy) * amount
+    st.journal({
+        "ts": datetime.utcnow().isoformat(),
+        "symbol": sym,
+        "direction": dir_name,
+        "amount": amount,
+        "price_buy": px_buy,
+        "price_sell": px_sell,
+        "fee_buy": 0,
+        "fee_sell": 0,
+        "pnl": pnl,
+    })
+    tr.mark("journal")
+
+    st.total_trades += 1
+
+
+async def evaluate_venues(sym: str, books: List[Any], venues: Sequence[BaseExchange], s,
+                          st: State, af: AntiFlood, limit: DailyLimitUsd,
+                          tick_ns: Optional[int] = None) -> None:
+    # матрица бирж: лучший bid и лучший ask по всем биржам за O(N), дальше — как пара
+    fxs = [fx_rates.to_usdt(ex) for ex in venues]
+    bids, asks = top_of_books(books, fxs)
+    i, j, spread = best_pair(bids, asks, [ex.taker_fee_bps for ex in venues], s.slippage_bps)
+    if i < 0:
+        return
+    st.avg_spread_bps = (st.avg_spread_bps * 0.9) + (spread * 0.1)
+    st.last_spread[sym] = spread
+    spread_bps.observe(spread)
+    await evaluate_symbol(sym, books[i], books[j], venues[i], venues[j], s, st, af, limit,
+                          spreads=(spread, float("-inf")), fx_a=fxs[i], fx_b=fxs[j],
+                          named=True, tick_ns=tick_ns)
+
+
+async def evaluate_books(sym: str, books: List[Any], venues: Sequence[BaseExchange], s,
+                         st: State, af: AntiFlood, limit: DailyLimitUsd,
+                         tick_ns: Optional[int] = None) -> None:
+    # две USDT-биржи — прямое сравнение пары, иначе матрица
+    if len(venues) == 2 and all(ex.quote_ccy == "USDT" for ex in venues):
+        await evaluate_symbol(sym, books[0], books[1], venues[0], venues[1],
+                              s, st, af, limit, tick_ns=tick_ns)
+    else:
+        await evaluate_venues(sym, books, venues, s, st, af, limit, tick_ns=tick_ns)
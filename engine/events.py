@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from exchanges.base import BaseExchange
+from engine.quotes import QuoteCache, quotes
+
+log = logging.getLogger("events")
+
+# evaluate(sym, books, tick_ns) — решение по одному символу
+Evaluate = Callable[[str, List[Any], int], Awaitable[None]]
+
+
+class LatencyStats:
+    """Задержка tick -> decision в микросекундах: последнее, EMA, максимум, счётчик."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.last_us = 0.0
+        self.avg_us = 0.0
+        self.max_us = 0.0
+
+    def add(self, us: float) -> None:
+        self.count += 1
+        self.last_us = us
+        self.avg_us = us if self.count == 1 else self.avg_us * 0.9 + us * 0.1
+        if us > self.max_us:
+            self.max_us = us
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "last_us": round(self.last_us, 1),
+            "avg_us": round(self.avg_us, 1),
+            "max_us": round(self.max_us, 1),
+        }
+
+
+class EventDriver:
+    """
+    Событийный режим вместо цикла со sleep(1.0): каждый апдейт стакана символа
+    из WS-стрима пересчитывает только этот символ и сразу отдаёт решение
+    (и ордер) дальше. Пока символ считается, новые тики копятся в один
+    повторный пересчёт, а задержку меряем от самого раннего необработанного тика.
+    Биржи без стрима читаются через общий кэш стаканов.
+    """
+
+    def __init__(self, venues: Sequence[BaseExchange], symbols: Sequence[str],
+                 evaluate: Evaluate, cache: Optional[QuoteCache] = None,
+                 latency: Optional[LatencyStats] = None,
+                 paused: Callable[[], bool] = lambda: False) -> None:
+        self.venues = list(venues)
+        self.symbols = list(symbols)
+        self.evaluate = evaluate
+        self.cache = cache or quotes
+        self.paused = paused
+        self.latency = latency or LatencyStats()
+        self.ticks = 0
+        self.errors = 0
+        self._common: Dict[str, Dict[str, str]] = {}  # venue -> {venue_symbol: symbol}
+        self._dirty: Dict[str, int] = {}
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def attach(self) -> int:
+        """Подписывается на апдейты стримов; возвращает число бирж со стримом."""
+        n = 0
+        for ex in self.venues:
+            stream = getattr(ex, "stream", None)
+            if stream is None:
+                continue
+            self._common[ex.name] = {ex.venue_symbol(s): s for s in self.symbols}
+            stream.listeners.append(self._listener(ex.name))
+            n += 1
+        return n
+
+    def _listener(self, venue: str) -> Callable[[str, int], None]:
+        common = self._common[venue]
+
+        def on_update(venue_symbol: str, rx_ns: int) -> None:
+            sym = common.get(venue_symbol)
+            if sym is not None:
+                self.on_tick(sym, rx_ns)
+        return on_update
+
+    def on_tick(self, sym: str, rx_ns: int) -> None:
+        self.ticks += 1
+        if self.paused():
+            return
+        self._dirty.setdefault(sym, rx_ns)
+        if sym not in self._running:
+            self._running.add(sym)
+            t = asyncio.get_running_loop().create_task(self._run(sym))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+
+    async def _books(self, sym: str) -> List[Any]:
+        books: List[Any] = []
+        pending = []
+        for i, ex in enumerate(self.venues):
+            vsym = ex.venue_symbol(sym)
+            stream = getattr(ex, "stream", None)
+            ob = stream.get(vsym) if stream is not None else None
+            books.append(ob)
+            if ob is None:
+                pending.append((i, self.cache.get(ex, vsym)))
+        if pending:
+            res = await asyncio.gather(*(c for _, c in pending), return_exceptions=True)
+            for (i, _), ob in zip(pending, res):
+                books[i] = None if isinstance(ob, BaseException) else ob
+        return books
+
+    async def _run(self, sym: str) -> None:
+        try:
+            while sym in self._dirty:
+                tick_ns = self._dirty.pop(sym)
+                try:
+                    books = await self._books(sym)
+                    if sum(b is not None for b in books) >= 2:
+                        await self.evaluate(sym, books, tick_ns)
+                except Exception as e:
+                    self.errors += 1
+                    log.warning(f"event eval error {sym} {e}")
+                self.latency.add((time.perf_counter_ns() - tick_ns) / 1000.0)
+        finally:
+            self._running.discard(sym)
+
+    async def close(self) -> None:
+        for t in list(self._tasks):
+            t.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
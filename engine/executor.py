@@ -1,36 +1,229 @@
 import asyncio
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import ccxt.async_support as ccxt
+
 from exchanges.base import BaseExchange
+from engine.hedges import FAILED, FILLED, LATE, STUCK, UNWINDING, UNWOUND, Hedge, hedges
+from engine.inventory import inventory
+from utils.hist import Histogram
+from utils.prom import order_ack_seconds
 
 log = logging.getLogger("executor")
 
+# ошибки, при которых ордер точно не принят: лимит запросов и отказ по правилам
+# биржи. Только после них разворот можно повторить — после сетевой ошибки ордер
+# мог дойти, и повтор задвоит разворот
+RETRY_BEFORE_SEND = (ccxt.RateLimitExceeded, ccxt.InvalidOrder)
+
+
+class LegStats:
+    """
+    Задержка отправка -> ответ биржи по (venue, side) в гистограммах фиксированного
+    размера, плюс таймауты, ошибки ног и развороты (unwind) по биржам. Общие на процесс:
+    Executor создаётся на каждую сделку. timeout_for — таймаут ноги из наблюдаемого
+    p99 биржи (mult * p99 в пределах [floor, cap]); пока замеров мало — cap.
+    """
+
+    def __init__(self, floor_ms: float = 250.0, cap_ms: float = 5000.0, mult: float = 3.0,
+                 min_samples: int = 20) -> None:
+        self.floor_ms = floor_ms
+        self.cap_ms = cap_ms
+        self.mult = mult
+        self.min_samples = min_samples
+        self.ack_ms: Dict[Tuple[str, str], Histogram] = {}
+        self.timeouts: Dict[Tuple[str, str], int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.unwinds: Dict[str, int] = {}
+
+    def configure(self, floor_ms: Optional[float] = None, cap_ms: Optional[float] = None,
+                  mult: Optional[float] = None) -> None:
+        if floor_ms is not None:
+            self.floor_ms = floor_ms
+        if cap_ms is not None:
+            self.cap_ms = cap_ms
+        if mult is not None:
+            self.mult = mult
+
+    def timeout_for(self, venue: str, side: str) -> float:
+        """Таймаут ноги в секундах."""
+        h = self.ack_ms.get((venue, side))
+        if h is None or h.count < self.min_samples:
+            return self.cap_ms / 1000.0
+        return min(max(h.quantile(0.99) * self.mult, self.floor_ms), self.cap_ms) / 1000.0
+
+    def ack(self, venue: str, side: str, ms: float) -> None:
+        h = self.ack_ms.get((venue, side))
+        if h is None:
+            h = self.ack_ms[(venue, side)] = Histogram()
+        h.add(ms)
+
+    def _inc(self, d: Dict[Any, int], key: Any) -> None:
+        d[key] = d.get(key, 0) + 1
+
+    def timeout(self, venue: str, side: str) -> None:
+        self._inc(self.timeouts, (venue, side))
+
+    def error(self, venue: str, side: str) -> None:
+        self._inc(self.errors, (venue, side))
+
+    def unwind(self, venue: str) -> None:
+        self._inc(self.unwinds, venue)
+
+    def snapshot(self) -> Dict[str, Any]:
+        legs = {}
+        for venue, side in sorted(set(self.ack_ms) | set(self.timeouts) | set(self.errors)):
+            h = self.ack_ms.get((venue, side)) or Histogram()
+            snap = h.snapshot()
+            legs[f"{venue}:{side}"] = {
+                "count": snap["count"],
+                "p50_ms": snap["p50"], "p90_ms": snap["p90"],
+                "p99_ms": snap["p99"], "max_ms": snap["max"],
+                "timeouts": self.timeouts.get((venue, side), 0),
+                "errors": self.errors.get((venue, side), 0),
+            }
+        return {"legs": legs, "unwinds": dict(self.unwinds)}
+
+
+leg_stats = LegStats()
+
+
+async def _within(task: asyncio.Task, timeout: float) -> bool:
+    await asyncio.wait({task}, timeout=timeout)
+    return task.done()
+
+
 class Executor:
-    def __init__(self, ex_buy: BaseExchange, ex_sell: BaseExchange, dry_run: bool = True) -> None:
+    """
+    Рыночный хедж двумя ногами как машина состояний (engine/hedges.py).
+    Таймаут ноги берётся из наблюдаемой задержки биржи (leg_stats.timeout_for),
+    leg_timeout задаёт его явно. market_hedge не ждёт ногу дольше её таймаута:
+    опоздавшую ногу не отменяем (ордер мог исполниться) и дожидаемся в фоне
+    до settle_timeout, разворот исполненной ноги тоже идёт в фоне — цикл
+    торговли продолжает считать другие символы.
+    """
+
+    def __init__(self, ex_buy: BaseExchange, ex_sell: BaseExchange, dry_run: bool = True,
+                 leg_timeout: Optional[float] = None, settle_timeout: float = 30.0) -> None:
         self.ex_buy = ex_buy
         self.ex_sell = ex_sell
         self.dry_run = dry_run
+        self.leg_timeout = leg_timeout
+        self.settle_timeout = settle_timeout
 
-    async def market_hedge(self, symbol: str, amount: float) -> Dict[str, Any]:
+    async def _order(self, ex: BaseExchange, symbol: str, side: str, amount: float) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        inventory.order_sent(ex)  # пока ордер в пути, сверка балансов этой биржи ждёт
+        try:
+            res = await ex.create_market_order(symbol, side, amount)
+            dt = time.perf_counter() - t0
+            inventory.on_fill(ex, symbol, side, amount, res)
+        except asyncio.CancelledError:
+            raise  # таймаут ноги считает market_hedge
+        except Exception:
+            leg_stats.error(ex.name, side)
+            raise
+        finally:
+            inventory.order_done(ex)
+        leg_stats.ack(ex.name, side, dt * 1000.0)
+        order_ack_seconds.labels(ex.name, side).observe(dt)
+        return res
+
+    async def _leg(self, ex: BaseExchange, symbol: str, side: str, amount: float) -> Dict[str, Any]:
+        try:
+            return await self._order(ex, symbol, side, amount)
+        except Exception as e:
+            log.warning(f"{ex.name} {side} {symbol} failed: {e}")
+            return {"error": str(e)}
+
+    def _timeout(self, ex: BaseExchange, side: str) -> float:
+        return self.leg_timeout if self.leg_timeout is not None else leg_stats.timeout_for(ex.name, side)
+
+    async def market_hedge(self, symbol: str, amount: float,
+                           sell_symbol: Optional[str] = None) -> Dict[str, Any]:
+        # sell_symbol — если у продающей биржи другой символ (BTC/KRW против BTC/USDT)
+        sell_symbol = sell_symbol or symbol
         if self.dry_run:
             log.info({"event": "dry_trade", "symbol": symbol, "amount": amount})
             return {"status": "dry", "symbol": symbol, "amount": amount}
 
-        buy = asyncio.create_task(self.ex_buy.create_market_order(symbol, "buy", amount))
-        sell = asyncio.create_task(self.ex_sell.create_market_order(symbol, "sell", amount))
+        h = hedges.open(symbol, sell_symbol, self.ex_buy.name, self.ex_sell.name, amount)
+        buy = asyncio.create_task(self._leg(self.ex_buy, symbol, "buy", amount))
+        sell = asyncio.create_task(self._leg(self.ex_sell, sell_symbol, "sell", amount))
+        t_buy, t_sell = self._timeout(self.ex_buy, "buy"), self._timeout(self.ex_sell, "sell")
 
-        done, pending = await asyncio.wait({buy, sell}, timeout=5, return_when=asyncio.ALL_COMPLETED)
+        # у каждой ноги свой таймаут: не ответившая в свой срок — опоздавшая,
+        # даже если вторая ещё в пределах своего
+        in_time = await asyncio.gather(_within(buy, t_buy), _within(sell, t_sell))
+        pending = {t for t, ok in zip((buy, sell), in_time) if not ok}
+        h.buy = buy.result() if buy not in pending else None
+        h.sell = sell.result() if sell not in pending else None
+        if pending:
+            log.warning(f"hedge {h.id}: leg timeout, settling in background")
+            if buy in pending:
+                leg_stats.timeout(self.ex_buy.name, "buy")
+            if sell in pending:
+                leg_stats.timeout(self.ex_sell.name, "sell")
+            hedges.move(h, LATE)
+            hedges.spawn(self._settle(h, buy, sell))
+        else:
+            self._resolve(h)
+        # conn: warm | cold — платила ли нога DNS/TCP/TLS (только быстрый REST)
+        res_buy = h.buy or {"error": "buy_timeout"}
+        res_sell = h.sell or {"error": "sell_timeout"}
+        log.info({"event": "hedge_sent", "id": h.id, "symbol": symbol, "state": h.state,
+                  "buy_conn": res_buy.get("conn"), "sell_conn": res_sell.get("conn")})
+        return {"id": h.id, "state": h.state, "buy": res_buy, "sell": res_sell}
 
+    async def _settle(self, h: Hedge, buy: asyncio.Task, sell: asyncio.Task) -> None:
+        """Фон: ждём опоздавшую ногу; не дождались — локальную задачу отменяем, хедж STUCK."""
+        _, pending = await asyncio.wait({buy, sell}, timeout=self.settle_timeout)
+        for t in pending:
+            t.cancel()
+        h.buy = buy.result() if buy.done() and not buy.cancelled() else {"error": "buy_timeout"}
+        h.sell = sell.result() if sell.done() and not sell.cancelled() else {"error": "sell_timeout"}
         if pending:
-            for t in pending:
-                t.cancel()
-            log.warning("timeout on one leg")
-        res_buy = buy.result() if buy.done() else {"error": "buy_timeout"}
-        res_sell = sell.result() if sell.done() else {"error": "sell_timeout"}
-
-        if "error" in res_buy and "id" in res_sell:
-            await self.ex_sell.create_market_order(symbol, "buy", amount)
-        if "error" in res_sell and "id" in res_buy:
-            await self.ex_buy.create_market_order(symbol, "sell", amount)
-
-        return {"buy": res_buy, "sell": res_sell}
+            log.error(f"hedge {h.id}: no answer after {self.settle_timeout}s, check venue manually")
+            hedges.move(h, STUCK)
+            return
+        self._resolve(h)
+
+    def _resolve(self, h: Hedge) -> None:
+        ok_buy = h.buy is not None and "error" not in h.buy
+        ok_sell = h.sell is not None and "error" not in h.sell
+        if ok_buy and ok_sell:
+            hedges.move(h, FILLED)
+        elif not ok_buy and not ok_sell:
+            hedges.move(h, FAILED)
+        else:
+            # закрываем исполненную ногу обратным ордером
+            hedges.move(h, UNWINDING)
+            if ok_buy:
+                hedges.spawn(self._unwind(h, self.ex_buy, h.symbol, "sell", h.buy))
+            else:
+                hedges.spawn(self._unwind(h, self.ex_sell, h.sell_symbol, "buy", h.sell))
+
+    async def _unwind(self, h: Hedge, ex: BaseExchange, symbol: str, side: str,
+                      filled_leg: Dict[str, Any], attempts: int = 2) -> None:
+        leg_stats.unwind(ex.name)
+        amount = float(filled_leg.get("filled") or h.amount)
+        for _ in range(attempts):
+            try:
+                h.unwind = await asyncio.wait_for(self._order(ex, symbol, side, amount),
+                                                  self.settle_timeout)
+                hedges.move(h, UNWOUND)
+                return
+            except asyncio.TimeoutError:
+                # ордер мог исполниться — повтор рискует задвоить разворот
+                h.unwind = {"error": "unwind_timeout"}
+                break
+            except RETRY_BEFORE_SEND as e:
+                h.unwind = {"error": str(e)}
+            except Exception as e:
+                # сетевая и прочие ошибки: ордер мог дойти — не повторяем
+                h.unwind = {"error": str(e)}
+                break
+        log.error(f"hedge {h.id}: unwind on {ex.name} failed: {h.unwind}, check venue manually")
+        hedges.move(h, STUCK)
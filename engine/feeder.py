@@ -1,17 +1,71 @@
 import asyncio
 import logging
-from typing import Tuple
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from exchanges.base import BaseExchange, best_bid_ask
+from engine.quotes import QuoteCache, quotes
+from utils.trace import NULL, Trace
 
 log = logging.getLogger("feeder")
 
-async def fetch_pair(ex_a: BaseExchange, ex_b: BaseExchange, symbol: str) -> Tuple[Tuple[float, float], Tuple[float, float]]:
-    ob_a = await ex_a.get_orderbook(symbol)
-    ob_b = await ex_b.get_orderbook(symbol)
+async def fetch_pair(ex_a: BaseExchange, ex_b: BaseExchange, symbol: str,
+                     cache: Optional[QuoteCache] = None) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    cache = cache or quotes
+    ob_a, ob_b = await asyncio.gather(cache.get(ex_a, symbol), cache.get(ex_b, symbol))
     ba = best_bid_ask(ob_a)
     bb = best_bid_ask(ob_b)
     return ba, bb
 
+async def fetch_books(
+    exchanges: Sequence[BaseExchange],
+    symbols: Sequence[str],
+    concurrency: int = 8,
+    cache: Optional[QuoteCache] = None,
+    partial: bool = False,
+    traces: Optional[Dict[str, Trace]] = None,
+) -> AsyncIterator[Tuple[str, Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+    """
+    Тянет стаканы всех символов со всех бирж параллельно (не больше
+    `concurrency` запросов в полёте на биржу) и отдаёт (symbol, books, error)
+    по мере готовности — books в порядке `exchanges`. Читает через общий кэш.
+    Символ — общий 'BTC/USDT', у каждой биржи берётся её venue_symbol.
+    partial=True: упавшая нога даёт None в books, а не ошибку всего символа.
+    traces — {symbol: Trace}: время каждой ноги пишется стадией fetch:<биржа>.
+    """
+    cache = cache or quotes
+    sems = {ex.name: asyncio.Semaphore(concurrency) for ex in exchanges}
+
+    async def one(ex: BaseExchange, sym: str) -> Dict[str, Any]:
+        tr = traces.get(sym, NULL) if traces is not None else NULL
+        t0 = time.perf_counter_ns()
+        try:
+            async with sems[ex.name]:
+                return await cache.get(ex, ex.venue_symbol(sym))
+        finally:
+            tr.add("fetch:" + ex.name, t0, time.perf_counter_ns())
+
+    async def legs(sym: str):
+        try:
+            books = await asyncio.gather(*(one(ex, sym) for ex in exchanges),
+                                         return_exceptions=partial)
+            if partial:
+                ok = [b if not isinstance(b, BaseException) else None for b in books]
+                if sum(b is not None for b in ok) < 2:
+                    err = next(b for b in books if isinstance(b, BaseException))
+                    return sym, None, err
+                return sym, ok, None
+            return sym, list(books), None
+        except Exception as e:
+            return sym, None, e
+
+    tasks = [asyncio.create_task(legs(sym)) for sym in symbols]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
+
 async def stream_quotes(ex_a: BaseExchange, ex_b: BaseExchange, symbols: list[str], interval: float = 1.0):
     while True:
         for sym in symbols:
@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+# состояния хеджа
+SENT = "sent"              # обе ноги отправлены, ждём ответы
+LATE = "late"              # нога не ответила за таймаут: ордер мог исполниться, ждём в фоне
+FILLED = "filled"          # обе ноги исполнены
+FAILED = "failed"          # обе ноги отклонены — позиции нет
+UNWINDING = "unwinding"    # одна нога исполнена, вторая нет — разворачиваем исполненную
+UNWOUND = "unwound"        # разворот прошёл
+STUCK = "stuck"            # разворот не прошёл или нога так и не ответила — нужна ручная проверка
+
+DONE = (FILLED, FAILED, UNWOUND, STUCK)
+
+
+class Hedge:
+    """Один market_hedge: ноги, их результаты и история переходов состояний."""
+    __slots__ = ("id", "symbol", "sell_symbol", "buy_venue", "sell_venue", "amount",
+                 "state", "buy", "sell", "unwind", "created", "history")
+
+    def __init__(self, hid: int, symbol: str, sell_symbol: str, buy_venue: str,
+                 sell_venue: str, amount: float) -> None:
+        self.id = hid
+        self.symbol = symbol
+        self.sell_symbol = sell_symbol
+        self.buy_venue = buy_venue
+        self.sell_venue = sell_venue
+        self.amount = amount
+        self.state = SENT
+        self.buy: Optional[Dict[str, Any]] = None
+        self.sell: Optional[Dict[str, Any]] = None
+        self.unwind: Optional[Dict[str, Any]] = None
+        self.created = time.time()
+        self.history: List[List[Any]] = [[SENT, 0.0]]
+
+    def move(self, state: str) -> None:
+        self.state = state
+        self.history.append([state, round((time.time() - self.created) * 1000.0, 2)])
+
+    @property
+    def done(self) -> bool:
+        return self.state in DONE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "symbol": self.symbol, "sell_symbol": self.sell_symbol,
+            "buy_venue": self.buy_venue, "sell_venue": self.sell_venue, "amount": self.amount,
+            "state": self.state, "buy": _brief(self.buy), "sell": _brief(self.sell),
+            "unwind": _brief(self.unwind), "created": self.created,
+            "history": self.history,  # [состояние, мс от отправки]
+        }
+
+
+def _brief(res: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # без info: сырые ответы бирж большие и в /hedges не нужны
+    if res is None:
+        return None
+    return {k: v for k, v in res.items() if k != "info"}
+
+
+class HedgeBook:
+    """
+    Хеджи процесса: активные по id и последние keep завершённых. Фоновые
+    задачи (ожидание опоздавшей ноги, разворот) держатся здесь, чтобы их
+    не собрал GC; drain() дожидается их (тесты, остановка).
+    """
+
+    def __init__(self, keep: int = 500) -> None:
+        self._ids = itertools.count(1)
+        self.active: Dict[int, Hedge] = {}
+        self.recent: Deque[Hedge] = deque(maxlen=keep)
+        self._tasks: Set[asyncio.Task] = set()
+        self._watchers: Dict[int, Callable[[Optional[Hedge]], None]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def open(self, symbol: str, sell_symbol: str, buy_venue: str, sell_venue: str,
+             amount: float) -> Hedge:
+        h = Hedge(next(self._ids), symbol, sell_symbol, buy_venue, sell_venue, amount)
+        self.active[h.id] = h
+        return h
+
+    def move(self, h: Hedge, state: str) -> None:
+        h.move(state)
+        if h.done:
+            self.active.pop(h.id, None)
+            self.recent.append(h)
+            self.counts[state] = self.counts.get(state, 0) + 1
+            cb = self._watchers.pop(h.id, None)
+            if cb is not None:
+                cb(h)
+
+    def watch(self, hid: int, cb: Callable[[Optional[Hedge]], None]) -> None:
+        """cb(hedge) по завершении хеджа; уже завершённый — сразу (None, если вытеснен из recent)."""
+        if hid not in self.active:
+            cb(self.get(hid))
+            return
+        self._watchers[hid] = cb
+
+    def spawn(self, coro: Any) -> asyncio.Task:
+        t = asyncio.create_task(coro)
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+        return t
+
+    async def drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def get(self, hid: int) -> Optional[Hedge]:
+        h = self.active.get(hid)
+        if h is None:
+            h = next((x for x in self.recent if x.id == hid), None)
+        return h
+
+    def list(self, state: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        items = list(self.active.values()) + list(reversed(self.recent))
+        if state == "active":
+            items = list(self.active.values())
+        elif state:
+            items = [h for h in items if h.state == state]
+        return [h.to_dict() for h in items[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": len(self.active), "done": dict(self.counts)}
+
+
+# общий на процесс журнал хеджей (/hedges)
+hedges = HedgeBook()
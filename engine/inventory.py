@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from exchanges.base import BaseExchange
+
+log = logging.getLogger("inventory")
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    base, quote = symbol.split(":")[0].split("/")
+    return base.upper(), quote.upper()
+
+
+class Inventory:
+    """
+    Балансы бирж в памяти: загружаются при старте, двигаются по результатам
+    ордеров (Executor вызывает on_fill) и сверяются с REST в фоне раз в reconcile_sec.
+    Предторговая проверка can_hedge — словари в памяти, без запросов.
+    Биржа, чьи балансы не загрузились, не отслеживается и сделки не блокирует.
+    Балансы — свободные (get_free_balance), занятое в ордерах не считается.
+    Сверка биржи пропускается до следующего круга, если во время запроса был
+    ордер в пути (Executor отмечает order_sent/order_done) или прошло исполнение:
+    снапшот мог уже включать сделку, которую on_fill применит ещё раз.
+    quote_share < 1 (шард при SHARDS=N): котируемая валюта общая на процессы,
+    покупкам этого процесса доступна доля снапшота минус свои траты после него.
+    """
+
+    def __init__(self, reconcile_sec: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.reconcile_sec = reconcile_sec
+        self.clock = clock
+        self.balances: Dict[str, Dict[str, float]] = {}
+        self.quote_share = 1.0
+        self._synced: Dict[str, Dict[str, float]] = {}  # снапшот последней сверки
+        self.synced_at: Dict[str, float] = {}
+        self._seq: Dict[str, int] = {}  # номер последнего применённого исполнения
+        self._inflight: Dict[str, int] = {}  # отправлено ордеров без ответа, по бирже
+        self.fills = 0
+        self.checks = 0
+        self.blocked = 0
+        self.skipped = 0  # сверок, пропущенных из-за ордеров в пути
+        self.drift: Dict[str, float] = {}  # последнее расхождение памяти с REST по бирже
+
+    def configure(self, reconcile_sec: Optional[float] = None,
+                  quote_share: Optional[float] = None) -> None:
+        if reconcile_sec is not None:
+            self.reconcile_sec = reconcile_sec
+        if quote_share is not None:
+            self.quote_share = quote_share
+
+    def tracking(self, ex: BaseExchange) -> bool:
+        return ex.name in self.balances
+
+    def free(self, venue: str, ccy: str) -> float:
+        return self.balances.get(venue, {}).get(ccy, 0.0)
+
+    def spendable(self, venue: str, ccy: str) -> float:
+        """Котируемая валюта на покупку у этого процесса (при quote_share=1 — free)."""
+        free = self.free(venue, ccy)
+        if self.quote_share >= 1.0:
+            return free
+        return free - self._synced.get(venue, {}).get(ccy, 0.0) * (1.0 - self.quote_share)
+
+    def order_sent(self, ex: BaseExchange) -> None:
+        self._inflight[ex.name] = self._inflight.get(ex.name, 0) + 1
+
+    def order_done(self, ex: BaseExchange) -> None:
+        self._inflight[ex.name] = max(self._inflight.get(ex.name, 0) - 1, 0)
+
+    async def _fetch(self, ex: BaseExchange) -> None:
+        seq = self._seq.get(ex.name, 0)
+        busy = self._inflight.get(ex.name, 0)
+        try:
+            fresh = await ex.get_free_balance()
+        except Exception as e:
+            log.warning(f"{ex.name} balance failed: {e}")
+            return
+        if busy or self._inflight.get(ex.name, 0) or self._seq.get(ex.name, 0) != seq:
+            self.skipped += 1
+            return  # ордер в пути или исполнение за время запроса — снапшот неоднозначен
+        fresh = {k.upper(): float(v) for k, v in fresh.items()}
+        old = self.balances.get(ex.name)
+        if old is not None:
+            ccys = set(old) | set(fresh)
+            self.drift[ex.name] = max((abs(old.get(c, 0.0) - fresh.get(c, 0.0)) for c in ccys),
+                                      default=0.0)
+        self.balances[ex.name] = fresh
+        self._synced[ex.name] = dict(fresh)
+        self.synced_at[ex.name] = self.clock()
+
+    async def load(self, venues: Iterable[BaseExchange]) -> None:
+        await asyncio.gather(*(self._fetch(ex) for ex in venues))
+
+    async def run(self, venues: Iterable[BaseExchange]) -> None:
+        """Фоновая сверка с REST."""
+        venues = list(venues)
+        while True:
+            await asyncio.sleep(self.reconcile_sec)
+            await self.load(venues)
+
+    def can_hedge(self, ex_buy: BaseExchange, sym_buy: str, ex_sell: BaseExchange,
+                  sym_sell: str, amount: float, px_buy: float) -> bool:
+        """Хватит ли котируемой на покупку (с комиссией) и базовой на продажу."""
+        self.checks += 1
+        if self.tracking(ex_buy):
+            _, quote = split_symbol(sym_buy)
+            if self.spendable(ex_buy.name, quote) < amount * px_buy * (1.0 + ex_buy.taker_fee_bps / 1e4):
+                self.blocked += 1
+                return False
+        if self.tracking(ex_sell):
+            base, _ = split_symbol(sym_sell)
+            if self.free(ex_sell.name, base) < amount:
+                self.blocked += 1
+                return False
+        return True
+
+    def on_fill(self, ex: BaseExchange, symbol: str, side: str, amount: float,
+                order: Optional[Dict[str, Any]]) -> None:
+        """
+        Сдвиг балансов по результату ордера. filled/cost берутся из ответа
+        биржи, если они там есть; иначе — запрошенный объём по последнему
+        известному ask (быстрый REST не возвращает исполнение), остальное поправит сверка.
+        """
+        bal = self.balances.get(ex.name)
+        if bal is None or not order or "error" in order:
+            return
+        filled = order.get("filled")
+        filled = float(amount if filled is None else filled)
+        cost = order.get("cost")
+        if cost is None:
+            px = order.get("average") or order.get("price") or ex.ask_hint(symbol) or 0.0
+            cost = filled * float(px)
+        fee = cost * ex.taker_fee_bps / 1e4
+        base, quote = split_symbol(symbol)
+        if side == "buy":
+            bal[base] = bal.get(base, 0.0) + filled
+            bal[quote] = bal.get(quote, 0.0) - cost - fee
+        else:
+            bal[base] = bal.get(base, 0.0) - filled
+            bal[quote] = bal.get(quote, 0.0) + cost - fee
+        self._seq[ex.name] = self._seq.get(ex.name, 0) + 1
+        self.fills += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        return {
+            "venues": {v: {"age_s": round(now - self.synced_at.get(v, now), 1),
+                           "drift": round(self.drift.get(v, 0.0), 8)} for v in self.balances},
+            "fills": self.fills,
+            "checks": self.checks,
+            "blocked": self.blocked,
+            "skipped": self.skipped,
+        }
+
+
+# общий на процесс учёт балансов
+inventory = Inventory()
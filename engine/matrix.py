@@ -0,0 +1,154 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from exchanges.base import BaseExchange, best_bid_ask
+from engine.quotes import QuoteCache, quotes
+
+log = logging.getLogger("matrix")
+
+NO_PAIR = (-1, -1, float("-inf"))
+
+
+def best_pair(bids: Sequence[float], asks: Sequence[float], fee_bps: Sequence[float],
+              slippage_bps: float = 0.0) -> Tuple[int, int, float]:
+    """
+    Лучшая направленная пара по N биржам за O(N): (i_buy, j_sell, spread_bps).
+    Покупка по ask*(1+slippage), продажа по bid*(1-fee продающей биржи) — та же
+    формула, что в calc_spread. Держим по два лучших bid и ask, чтобы не выбрать
+    одну и ту же биржу на обе ноги. Биржи без котировки (<= 0) пропускаются.
+    """
+    slip = 1.0 + slippage_bps / 10000.0
+    b1 = b2 = a1 = a2 = -1
+    vb1 = vb2 = float("-inf")
+    va1 = va2 = float("inf")
+    for i in range(len(bids)):
+        bid, ask = bids[i], asks[i]
+        if bid > 0:
+            v = bid * (1.0 - fee_bps[i] / 10000.0)
+            if v > vb1:
+                b2, vb2, b1, vb1 = b1, vb1, i, v
+            elif v > vb2:
+                b2, vb2 = i, v
+        if ask > 0:
+            v = ask * slip
+            if v < va1:
+                a2, va2, a1, va1 = a1, va1, i, v
+            elif v < va2:
+                a2, va2 = i, v
+    if b1 < 0 or a1 < 0:
+        return NO_PAIR
+    if a1 != b1:
+        return a1, b1, (vb1 - va1) / va1 * 10000.0
+    # обе лучшие цены на одной бирже — берём лучшую из двух альтернатив
+    best = NO_PAIR
+    if b2 >= 0:
+        best = (a1, b2, (vb2 - va1) / va1 * 10000.0)
+    if a2 >= 0:
+        s = (vb1 - va2) / va2 * 10000.0
+        if s > best[2]:
+            best = (a2, b1, s)
+    return best
+
+
+def best_pairs(bids: np.ndarray, asks: np.ndarray, fee_bps: np.ndarray,
+               slippage_bps: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    То же для матрицы (символы x биржи) одним проходом NumPy:
+    массивы i_buy, j_sell, spread_bps длиной в число символов.
+    """
+    eff_bid = np.where(bids > 0, bids * (1.0 - np.asarray(fee_bps) / 10000.0), -np.inf)
+    eff_ask = np.where(asks > 0, asks * (1.0 + slippage_bps / 10000.0), np.inf)
+    rows = np.arange(bids.shape[0])
+
+    j1 = np.argmax(eff_bid, axis=1)
+    i1 = np.argmin(eff_ask, axis=1)
+    vb1, va1 = eff_bid[rows, j1], eff_ask[rows, i1]
+
+    masked_bid = eff_bid.copy()
+    masked_bid[rows, j1] = -np.inf
+    masked_ask = eff_ask.copy()
+    masked_ask[rows, i1] = np.inf
+    j2 = np.argmax(masked_bid, axis=1)
+    i2 = np.argmin(masked_ask, axis=1)
+    vb2, va2 = masked_bid[rows, j2], masked_ask[rows, i2]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s_main = (vb1 - va1) / va1 * 10000.0
+        s_alt_bid = (vb2 - va1) / va1 * 10000.0
+        s_alt_ask = (vb1 - va2) / va2 * 10000.0
+
+    same = i1 == j1
+    use_alt_ask = same & (s_alt_ask > s_alt_bid)
+    buy = np.where(use_alt_ask, i2, i1)
+    sell = np.where(same & ~use_alt_ask, j2, j1)
+    spread = np.where(same, np.maximum(s_alt_bid, s_alt_ask), s_main)
+    spread = np.where(np.isfinite(spread), spread, -np.inf)
+    return buy, sell, spread
+
+
+class FxRate:
+    """
+    Кэш курса котируемой валюты биржи к USDT (KRW у Bithumb) по её стакану
+    USDT/<quote>. to_usdt(ex) — множитель цены биржи в USDT.
+    """
+
+    def __init__(self, ttl: float = 30.0, cache: Optional[QuoteCache] = None) -> None:
+        self.ttl = ttl
+        self.cache = cache
+        self._rates: Dict[str, Tuple[float, float]] = {}  # quote -> (ts, USDT в quote)
+
+    async def refresh(self, ex: BaseExchange) -> None:
+        quote = ex.quote_ccy
+        if quote == "USDT":
+            return
+        hit = self._rates.get(quote)
+        if hit is not None and time.monotonic() - hit[0] < self.ttl:
+            return
+        ob = await (self.cache or quotes).get(ex, f"USDT/{quote}")
+        bid, ask = best_bid_ask(ob)
+        if bid <= 0 or ask <= 0:
+            raise RuntimeError(f"no USDT/{quote} rate on {ex.name}")
+        self._rates[quote] = (time.monotonic(), (bid + ask) / 2.0)
+
+    def set(self, quote: str, rate: float) -> None:
+        self._rates[quote] = (time.monotonic(), rate)
+
+    def to_usdt(self, ex: BaseExchange) -> float:
+        if ex.quote_ccy == "USDT":
+            return 1.0
+        hit = self._rates.get(ex.quote_ccy)
+        if hit is None:
+            raise RuntimeError(f"no USDT/{ex.quote_ccy} rate loaded")
+        return 1.0 / hit[1]
+
+
+def in_usdt(ob: Any, fx: float) -> Any:
+    """Стакан с ценами, пересчитанными в USDT (объёмы не меняются)."""
+    if fx == 1.0:
+        return ob
+    return {
+        "symbol": ob.get("symbol"),
+        "bids": [[p * fx, q] for p, q, *_ in ob["bids"]],
+        "asks": [[p * fx, q] for p, q, *_ in ob["asks"]],
+        "timestamp": ob.get("timestamp"),
+    }
+
+
+def top_of_books(books: List[Any], fx: List[float]) -> Tuple[List[float], List[float]]:
+    bids, asks = [], []
+    for ob, k in zip(books, fx):
+        if ob is None:
+            bids.append(0.0)
+            asks.append(0.0)
+            continue
+        bid, ask = best_bid_ask(ob)
+        bids.append(bid * k)
+        asks.append(ask * k)
+    return bids, asks
+
+
+# общий курс процесса
+fx_rates = FxRate()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from exchanges.base import BaseExchange
+from utils.prom import fetch_seconds
+
+log = logging.getLogger("quotes")
+
+
+class QuoteCache:
+    """
+    Общий кэш стаканов по ключу (venue, symbol) для всех потребителей:
+    trade_once, stream_quotes, run_hft и веб-ручек.
+
+    - свежий (моложе max_age) стакан отдаётся из памяти;
+    - параллельные читатели одного ключа ждут один и тот же запрос;
+    - если запрос упал, а в кэше лежит стакан моложе max_stale — отдаём его.
+    WS-клиенты (ex.stream подключён) держат стакан сами, их не кэшируем.
+    recorder (storage/books_bin.py) получает каждый стакан, пришедший по REST.
+    """
+
+    def __init__(self, max_age: float = 0.25, max_stale: float = 3.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.clock = clock
+        self._books: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.recorder: Optional[Any] = None
+
+    def configure(self, max_age: Optional[float] = None, max_stale: Optional[float] = None,
+                  recorder: Optional[Any] = None) -> None:
+        if max_age is not None:
+            self.max_age = max_age
+        if max_stale is not None:
+            self.max_stale = max_stale
+        if recorder is not None:
+            self.recorder = recorder
+
+    def peek(self, venue: str, symbol: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Стакан из кэша без запроса, если он не старше max_age."""
+        hit = self._books.get((venue, symbol))
+        if hit is None:
+            return None
+        age = self.max_age if max_age is None else max_age
+        return hit[1] if self.clock() - hit[0] <= age else None
+
+    def put(self, venue: str, symbol: str, ob: Any) -> None:
+        self._books[(venue, symbol)] = (self.clock(), ob)
+
+    async def get(self, ex: BaseExchange, symbol: str, max_age: Optional[float] = None) -> Any:
+        stream = getattr(ex, "stream", None)
+        if stream is not None and stream.connected:
+            return await ex.get_orderbook(symbol)
+
+        key = (ex.name, symbol)
+        hit = self._books.get(key)
+        age = self.max_age if max_age is None else max_age
+        if hit is not None and self.clock() - hit[0] <= age:
+            self.hits += 1
+            return hit[1]
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.misses += 1
+            fut = asyncio.ensure_future(self._fetch(ex, symbol, key))
+            fut.add_done_callback(_consume)
+            self._inflight[key] = fut
+        else:
+            self.coalesced += 1
+        try:
+            # shield: отмена одного читателя не должна рвать общий запрос
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if hit is not None and self.clock() - hit[0] <= self.max_stale:
+                self.stale += 1
+                log.warning(f"serving stale book {key}")
+                return hit[1]
+            raise
+
+    async def _fetch(self, ex: BaseExchange, symbol: str, key: Tuple[str, str]) -> Any:
+        t0 = time.perf_counter()
+        try:
+            ob = await ex.get_orderbook(symbol)
+            self._books[key] = (self.clock(), ob)
+            if self.recorder is not None:
+                self.recorder.record(ex.name, symbol, ob)
+            return ob
+        finally:
+            fetch_seconds.labels(ex.name).observe(time.perf_counter() - t0)
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._books),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale": self.stale,
+        }
+
+
+def _consume(fut: asyncio.Future) -> None:
+    # чтобы ошибка запроса без читателей не сыпала "exception was never retrieved"
+    if not fut.cancelled():
+        fut.exception()
+
+
+# единый кэш процесса
+quotes = QuoteCache()
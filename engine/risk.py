@@ -1,26 +1,205 @@
-from datetime import datetime, timedelta
-from typing import Dict
+import multiprocessing
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+NS = 1_000_000_000
+DAY_NS = 86_400 * NS
+
+# тикет сделки: (symbol, buy_venue, sell_venue, usd) — им же снимается экспозиция
+Ticket = Tuple[str, str, str, float]
+
 
 class AntiFlood:
-    def __init__(self, seconds: int = 30) -> None:
+    def __init__(self, seconds: float = 30, clock_ns: Callable[[], int] = time.monotonic_ns) -> None:
         self.seconds = seconds
-        self._last: Dict[str, datetime] = {}
+        self.clock_ns = clock_ns
+        self._last: Dict[str, int] = {}
 
     def allow(self, symbol: str) -> bool:
-        now = datetime.utcnow()
+        now = self.clock_ns()
         last = self._last.get(symbol)
-        if last and now - last < timedelta(seconds=self.seconds):
+        if last is not None and now - last < self.seconds * NS:
             return False
         self._last[symbol] = now
         return True
 
+
+def _ns_to_utc_midnight(wall: Callable[[], float]) -> int:
+    return int((86_400 - wall() % 86_400) * NS)
+
+
 class DailyLimitUsd:
-    def __init__(self, limit_usd: float) -> None:
+    """
+    Дневной бюджет notional с обнулением в полночь UTC. Время — monotonic_ns:
+    граница суток считается один раз от системных часов и дальше не зависит
+    от их подводки. check/commit/release — общий интерфейс с RiskEngine.
+    """
+
+    def __init__(self, limit_usd: float, clock_ns: Callable[[], int] = time.monotonic_ns,
+                 wall: Callable[[], float] = time.time) -> None:
         self.limit = limit_usd
         self.spent = 0.0
+        self.clock_ns = clock_ns
+        self.wall = wall
+        self._day_end = clock_ns() + _ns_to_utc_midnight(wall)
+
+    def _roll(self, now: int) -> None:
+        if now >= self._day_end:
+            self.spent = 0.0
+            self._day_end = now + _ns_to_utc_midnight(self.wall)
+
+    # потрачено за сегодня / списать — одна точка, которую подменяет общий бюджет шардов
+    def _spent_today(self, now: int) -> float:
+        self._roll(now)
+        return self.spent
+
+    def _spend(self, now: int, usd: float) -> None:
+        self._roll(now)
+        self.spent += usd
 
     def can_spend(self, usd: float) -> bool:
-        return self.spent + usd <= self.limit
+        return self._spent_today(self.clock_ns()) + usd <= self.limit
 
     def add(self, usd: float) -> None:
-        self.spent += usd
+        self._spend(self.clock_ns(), usd)
+
+    def check(self, symbol: str, buy_venue: str, sell_venue: str, usd: float) -> Optional[str]:
+        """None — можно; иначе причина отказа."""
+        return None if self.can_spend(usd) else "daily_budget"
+
+    def commit(self, symbol: str, buy_venue: str, sell_venue: str, usd: float) -> Ticket:
+        self.add(usd)
+        return (symbol, buy_venue, sell_venue, usd)
+
+    def release(self, ticket: Ticket) -> None:
+        pass
+
+
+class RiskEngine(DailyLimitUsd):
+    """
+    Предторговые лимиты в памяти, время — monotonic_ns:
+    - экспозиция: notional незавершённых хеджей по символу и по бирже
+      (commit добавляет, release снимает, когда хедж завершился);
+    - кулдаун символа после сделки;
+    - скользящее окно числа ордеров (хедж — два ордера);
+    - дневной бюджет с обнулением в полночь UTC.
+    check не выделяет память на успешном пути; отказы считаются по причинам.
+    """
+
+    def __init__(self, daily_usd: float, max_symbol_usd: float = float("inf"),
+                 max_venue_usd: float = float("inf"), cooldown_s: float = 0.0,
+                 max_orders: int = 0, window_s: float = 1.0,
+                 clock_ns: Callable[[], int] = time.monotonic_ns,
+                 wall: Callable[[], float] = time.time) -> None:
+        super().__init__(daily_usd, clock_ns, wall)
+        self.max_symbol_usd = max_symbol_usd
+        self.max_venue_usd = max_venue_usd
+        self.cooldown_ns = int(cooldown_s * NS)
+        self.max_orders = max_orders  # 0 — без лимита
+        self.window_ns = int(window_s * NS)
+        self.by_symbol: Dict[str, float] = {}
+        self.by_venue: Dict[str, float] = {}
+        self._last_trade: Dict[str, int] = {}
+        self._orders: Deque[int] = deque()
+        self.rejects: Dict[str, int] = {}
+
+    def _reject(self, reason: str) -> str:
+        self.rejects[reason] = self.rejects.get(reason, 0) + 1
+        return reason
+
+    def check(self, symbol: str, buy_venue: str, sell_venue: str, usd: float) -> Optional[str]:
+        now = self.clock_ns()
+        last = self._last_trade.get(symbol)
+        if last is not None and now - last < self.cooldown_ns:
+            return self._reject("cooldown")
+        if self.by_symbol.get(symbol, 0.0) + usd > self.max_symbol_usd:
+            return self._reject("symbol_exposure")
+        if (self.by_venue.get(buy_venue, 0.0) + usd > self.max_venue_usd
+                or self.by_venue.get(sell_venue, 0.0) + usd > self.max_venue_usd):
+            return self._reject("venue_exposure")
+        if self.max_orders:
+            q = self._orders
+            while q and now - q[0] >= self.window_ns:
+                q.popleft()
+            if len(q) + 2 > self.max_orders:
+                return self._reject("order_rate")
+        if self._spent_today(now) + usd > self.limit:
+            return self._reject("daily_budget")
+        return None
+
+    def commit(self, symbol: str, buy_venue: str, sell_venue: str, usd: float) -> Ticket:
+        now = self.clock_ns()
+        self._spend(now, usd)
+        self._last_trade[symbol] = now
+        self._orders.append(now)
+        self._orders.append(now)
+        self.by_symbol[symbol] = self.by_symbol.get(symbol, 0.0) + usd
+        self.by_venue[buy_venue] = self.by_venue.get(buy_venue, 0.0) + usd
+        self.by_venue[sell_venue] = self.by_venue.get(sell_venue, 0.0) + usd
+        return (symbol, buy_venue, sell_venue, usd)
+
+    def release(self, ticket: Ticket) -> None:
+        symbol, buy_venue, sell_venue, usd = ticket
+        self.by_symbol[symbol] = max(self.by_symbol.get(symbol, 0.0) - usd, 0.0)
+        self.by_venue[buy_venue] = max(self.by_venue.get(buy_venue, 0.0) - usd, 0.0)
+        self.by_venue[sell_venue] = max(self.by_venue.get(sell_venue, 0.0) - usd, 0.0)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "daily_spent_usd": round(self._spent_today(self.clock_ns()), 2),
+            "daily_limit_usd": self.limit,
+            "exposure_symbol": {k: round(v, 2) for k, v in self.by_symbol.items() if v},
+            "exposure_venue": {k: round(v, 2) for k, v in self.by_venue.items() if v},
+            "rejects": dict(self.rejects),
+        }
+
+
+class SharedBudget:
+    """
+    Дневной бюджет на несколько процессов (шарды main): потрачено и граница
+    суток — в общей памяти, списание и проверка под одной блокировкой.
+    monotonic_ns у процессов одного хоста общий, граница суток сравнима.
+    Передаётся в процесс при создании (multiprocessing.Process args).
+    """
+
+    def __init__(self, limit_usd: float, ctx: Optional[Any] = None) -> None:
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.limit = limit_usd
+        self._lock = ctx.Lock()
+        self._spent = ctx.Value("d", 0.0, lock=False)
+        self._day_end = ctx.Value("q", 0, lock=False)
+
+    def _roll(self, now: int, wall: Callable[[], float]) -> None:
+        if now >= self._day_end.value:
+            self._spent.value = 0.0
+            self._day_end.value = now + _ns_to_utc_midnight(wall)
+
+    def spent(self, now: int, wall: Callable[[], float] = time.time) -> float:
+        with self._lock:
+            self._roll(now, wall)
+            return self._spent.value
+
+    def spend(self, now: int, usd: float, wall: Callable[[], float] = time.time) -> None:
+        with self._lock:
+            self._roll(now, wall)
+            self._spent.value += usd
+
+
+class SharedRiskEngine(RiskEngine):
+    """
+    RiskEngine шарда: кулдауны, экспозиция и частота ордеров — свои (символы
+    у шардов не пересекаются), дневной бюджет — общий SharedBudget. Между check
+    и commit другой шард может успеть списать свою сделку: перерасход — не больше
+    одной сделки на шард.
+    """
+
+    def __init__(self, budget: SharedBudget, **kw: Any) -> None:
+        super().__init__(budget.limit, **kw)
+        self.budget = budget
+
+    def _spent_today(self, now: int) -> float:
+        return self.budget.spent(now, self.wall)
+
+    def _spend(self, now: int, usd: float) -> None:
+        self.budget.spend(now, usd, self.wall)
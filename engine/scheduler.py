@@ -0,0 +1,126 @@
+import heapq
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# пол волатильности: спокойный символ в 1-2 б.п. от порога всё ещё горячий
+VOL_FLOOR_BPS = 2.0
+
+
+class SymbolStats:
+    __slots__ = ("mean", "dev", "n", "interval", "due", "polls")
+
+    def __init__(self) -> None:
+        self.mean = 0.0      # EMA лучшего спреда, б.п.
+        self.dev = 0.0       # EMA |отклонения| — волатильность спреда
+        self.n = 0
+        self.interval = 0.0  # текущий период опроса, с
+        self.due = 0.0       # когда опросить (clock)
+        self.polls = 0
+
+
+class PollScheduler:
+    """
+    Период опроса на символ вместо общего раза в секунду. Вес символа —
+    насколько близко его спред к порогу в единицах собственной волатильности:
+    z = (spread_min - mean) / dev, вес = exp(-max(z, 0)) — спред у порога или
+    выше даёт 1, в трёх сигмах ниже — ~0.05. Бюджет budget (опросов символа в
+    секунду на все символы) делится так: каждому — не реже max_interval, остаток —
+    пропорционально весу, но не чаще min_interval; срезанное потолком
+    отдаётся остальным. Ещё не наблюдавшиеся символы считаются горячими.
+    """
+
+    def __init__(self, symbols: Iterable[str], budget: float, spread_min_bps: float,
+                 min_interval: float = 0.2, max_interval: float = 10.0, alpha: float = 0.2,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.budget = budget
+        self.spread_min_bps = spread_min_bps
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.alpha = alpha
+        self.clock = clock
+        self.stats: Dict[str, SymbolStats] = {s: SymbolStats() for s in symbols}
+        self.rebalance()
+
+    def weight(self, st: SymbolStats) -> float:
+        if st.n == 0:
+            return 1.0
+        gap = self.spread_min_bps - st.mean
+        if gap <= 0:
+            return 1.0
+        return math.exp(-gap / max(st.dev, VOL_FLOOR_BPS))
+
+    def observe(self, symbol: str, spread_bps: Optional[float]) -> None:
+        st = self.stats.get(symbol)
+        if st is None or spread_bps is None or not math.isfinite(spread_bps):
+            return
+        if st.n == 0:
+            st.mean = spread_bps
+        else:
+            d = spread_bps - st.mean
+            st.mean += self.alpha * d
+            st.dev += self.alpha * (abs(d) - st.dev)
+        st.n += 1
+
+    def rebalance(self) -> None:
+        """Пересчёт периодов всех символов под бюджет (O(n log n))."""
+        if not self.stats:
+            return
+        items = list(self.stats.values())
+        n = len(items)
+        floor_rate = 1.0 / self.max_interval
+        cap_rate = 1.0 / self.min_interval
+        if n * floor_rate >= self.budget:
+            rates = [self.budget / n] * n
+        else:
+            rates = [floor_rate] * n
+            spare = self.budget - n * floor_rate
+            weights = [self.weight(st) for st in items]
+            # water-filling: самые горячие упираются в потолок, их излишек — остальным
+            order = sorted(range(n), key=lambda i: weights[i], reverse=True)
+            left = sum(weights)
+            for i in order:
+                if left <= 0 or spare <= 0:
+                    break
+                add = min(spare * weights[i] / left, cap_rate - floor_rate)
+                rates[i] += add
+                spare -= add
+                left -= weights[i]
+        now = self.clock()
+        for st, r in zip(items, rates):
+            interval = 1.0 / r
+            if st.interval:
+                # стал чаще — не ждём до старого срока
+                st.due = min(st.due, now + interval)
+            st.interval = interval
+
+    def due(self) -> List[str]:
+        """Символы, которые пора опросить; их следующий срок сдвигается на период."""
+        now = self.clock()
+        out = []
+        for sym, st in self.stats.items():
+            if st.due <= now:
+                out.append(sym)
+                st.due = now + st.interval
+                st.polls += 1
+        return out
+
+    def next_in(self) -> float:
+        """Через сколько секунд ближайший срок."""
+        if not self.stats:
+            return self.max_interval
+        return max(min(st.due for st in self.stats.values()) - self.clock(), 0.0)
+
+    def snapshot(self, top: int = 10) -> Dict[str, object]:
+        hot: List[Tuple[float, str]] = heapq.nsmallest(
+            top, ((st.interval, sym) for sym, st in self.stats.items()))
+        rate = sum(1.0 / st.interval for st in self.stats.values() if st.interval)
+        return {
+            "symbols": len(self.stats),
+            "planned_polls_per_s": round(rate, 2),
+            "budget_polls_per_s": self.budget,
+            "hottest": {sym: {"interval_ms": round(iv * 1000.0),
+                              "spread_bps": round(self.stats[sym].mean, 2),
+                              "vol_bps": round(self.stats[sym].dev, 2)} for iv, sym in hot},
+        }
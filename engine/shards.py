@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from engine.hedges import hedges
+from engine.quotes import quotes
+from engine.risk import SharedBudget
+from storage.journal_csv import ensure_file
+from utils.prom import Registry, loop_lag_last, loop_lag_seconds, registry, snapshot_family, \
+    watch_loop_lag
+
+log = logging.getLogger("shards")
+
+
+def split_symbols(symbols: Sequence[str], n: int) -> List[List[str]]:
+    """Символы по шардам по кругу: соседние в списке (обычно самые ликвидные) — в разные процессы."""
+    n = max(1, min(n, len(symbols)))
+    return [list(symbols[i::n]) for i in range(n)]
+
+
+class Shard:
+    """
+    Что процесс-шард получает от супервизора: свои символы, настройки,
+    общий дневной бюджет, очередь отчётов и число шардов (count) — на него
+    делятся лимиты бирж, бюджет опроса и котируемая валюта на балансах.
+    Передаётся аргументом Process.
+    """
+
+    def __init__(self, index: int, symbols: List[str], settings: Any, budget: SharedBudget,
+                 reports: Any, count: int = 1) -> None:
+        self.index = index
+        self.count = count
+        self.symbols = symbols
+        self.settings = settings
+        self.budget = budget
+        self.reports = reports
+
+    def report(self, st: Any) -> None:
+        # снимок — только примитивы: очередь пиклит его в фоновом потоке процесса
+        snap = {
+            "shard": self.index,
+            "pid": os.getpid(),
+            "ts": time.time(),
+            "symbols": self.symbols,
+            "state": {
+                "total_trades": st.total_trades,
+                "success_trades": st.success_trades,
+                "avg_spread_bps": round(st.avg_spread_bps, 4),
+                "avg_execution_ms": round(st.avg_execution_ms, 2),
+                "last_cycle_ms": round(st.last_cycle_ms, 2),
+                "avg_cycle_ms": round(st.avg_cycle_ms, 2),
+                "loop_lag_ms": round(loop_lag_last.value * 1000.0, 2),
+                "quotes": quotes.stats(),
+                "hedges": hedges.stats(),
+                "risk": st.risk.stats() if st.risk is not None else None,
+                "last_error": st.last_error,
+            },
+            "prom": registry.dump(),
+        }
+        try:
+            self.reports.put_nowait(snap)
+        except queue.Full:
+            pass  # супервизор не успевает — пропускаем снимок, следующий его заменит
+
+    async def run_reports(self, st: Any, interval: float, lag_interval: float) -> None:
+        """Фон шарда вместо HTTP: снимок метрик супервизору раз в interval."""
+        lag = asyncio.create_task(watch_loop_lag(loop_lag_seconds, loop_lag_last, lag_interval))
+        try:
+            while True:
+                self.report(st)
+                await asyncio.sleep(interval)
+        finally:
+            lag.cancel()
+            self.report(st)  # последние счётчики перед выходом
+
+
+def _shard_main(shard: Shard) -> None:
+    # точка входа процесса (spawn): свой event loop, свои клиенты бирж и кэш стаканов
+    import uvloop
+
+    from main import main
+
+    try:
+        uvloop.run(main(shard))
+    except KeyboardInterrupt:
+        pass
+
+
+class Supervisor:
+    """
+    SHARDS=N: символы делятся между N процессами (split_symbols), у каждого —
+    своё ядро, клиенты бирж и цикл main. Общие: дневной бюджет (SharedBudget)
+    и журнал trades.csv (дописывание короткими строками). Лимиты запросов бирж,
+    POLL_BUDGET_RPS и котируемая валюта на балансах — на аккаунт, шард берёт
+    1/N. Шарды раз в shard_report_sec присылают снимок метрик; /metrics
+    супервизора складывает их (snapshot/prom). Упавший шард перезапускается не
+    чаще раза в restart_sec и считает с нуля: суммы счётчиков (arb_trades_total,
+    гистограммы) после перезапуска идут назад, rate() в Prometheus видит это
+    как сброс счётчика, arb_shard_restarts_total показывает, чей.
+    """
+
+    def __init__(self, settings: Any, ctx: Optional[Any] = None, restart_sec: float = 5.0) -> None:
+        self.s = settings
+        self.ctx = ctx or multiprocessing.get_context("spawn")
+        self.groups = split_symbols(settings.symbols, settings.shards)
+        self.budget = SharedBudget(settings.daily_limit_usd, self.ctx)
+        self.reports = self.ctx.Queue(maxsize=64 * len(self.groups))
+        self.restart_sec = restart_sec
+        self.procs: List[Optional[Any]] = [None] * len(self.groups)
+        self.started_at = [0.0] * len(self.groups)
+        self.restarts = [0] * len(self.groups)
+        self.last: Dict[int, Dict[str, Any]] = {}
+
+    def _start(self, i: int) -> None:
+        shard = Shard(i, self.groups[i], self.s, self.budget, self.reports, len(self.groups))
+        p = self.ctx.Process(target=_shard_main, args=(shard,), name=f"shard-{i}")
+        p.start()
+        self.procs[i] = p
+        self.started_at[i] = time.monotonic()
+        log.info(f"shard {i} pid {p.pid}: {len(self.groups[i])} symbols")
+
+    def start(self) -> None:
+        ensure_file()  # заголовок журнала — до шардов, чтобы не записали его дважды
+        for i in range(len(self.groups)):
+            self._start(i)
+
+    def drain(self) -> None:
+        while True:
+            try:
+                r = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            self.last[r["shard"]] = r
+
+    def check(self) -> None:
+        for i, p in enumerate(self.procs):
+            if p is None or p.is_alive():
+                continue
+            if time.monotonic() - self.started_at[i] < self.restart_sec:
+                continue
+            log.error(f"shard {i} exited with {p.exitcode}, restarting")
+            self.restarts[i] += 1
+            self._start(i)
+
+    async def run(self, stop: asyncio.Event, interval: float = 0.2) -> None:
+        self.start()
+        try:
+            while not stop.is_set():
+                self.drain()
+                self.check()
+                try:
+                    await asyncio.wait_for(stop.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.to_thread(self.stop)
+            self.drain()
+
+    def stop(self, timeout: float = 35.0) -> None:
+        # SIGTERM — шард сам закрывается (hedges.drain ждёт опоздавшие ноги), потом kill
+        for p in self.procs:
+            if p is not None and p.is_alive():
+                p.terminate()
+        deadline = time.monotonic() + timeout
+        for p in self.procs:
+            if p is None:
+                continue
+            p.join(max(deadline - time.monotonic(), 0.0))
+            if p.is_alive():
+                p.kill()
+                p.join()
+
+    # --- сводка для /metrics ---
+    def _sum(self, key: str) -> float:
+        return sum(r["state"][key] for r in self.last.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        shards = []
+        for i, p in enumerate(self.procs):
+            r = self.last.get(i)
+            item: Dict[str, Any] = {"shard": i, "pid": p.pid if p is not None else None,
+                                    "alive": p is not None and p.is_alive(),
+                                    "restarts": self.restarts[i], "symbols": self.groups[i]}
+            if r is not None:
+                item["report_age_s"] = round(now - r["ts"], 2)
+                item.update(r["state"])
+            shards.append(item)
+        return {
+            "shards": shards,
+            "total_trades": self._sum("total_trades"),
+            "success_trades": self._sum("success_trades"),
+            "risk": {"daily_spent_usd": round(self.budget.spent(time.monotonic_ns()), 2),
+                     "daily_limit_usd": self.budget.limit},
+        }
+
+    def prom(self) -> List[str]:
+        agg = Registry()
+        rejects: Dict[tuple, float] = {}
+        for i, r in sorted(self.last.items()):
+            agg.merge(r["prom"], str(i))
+            risk = r["state"]["risk"] or {}
+            for reason, n in risk.get("rejects", {}).items():
+                rejects[(reason,)] = rejects.get((reason,), 0) + n
+        lines = agg.render()
+        lines += snapshot_family("arb_shard_up", "gauge", "Shard process alive",
+                                 {(str(i),): int(p is not None and p.is_alive())
+                                  for i, p in enumerate(self.procs)}, ["shard"])
+        lines += snapshot_family("arb_shard_restarts_total", "counter", "Shard process restarts",
+                                 {(str(i),): n for i, n in enumerate(self.restarts)}, ["shard"])
+        lines += snapshot_family("arb_trades_total", "counter", "Hedges dispatched",
+                                 {(): self._sum("total_trades")})
+        lines += snapshot_family("arb_trades_success_total", "counter",
+                                 "Hedges with both legs filled (dry-run counts as success)",
+                                 {(): self._sum("success_trades")})
+        lines += snapshot_family("arb_hedges_active", "gauge", "Hedges not yet settled",
+                                 {(): sum(r["state"]["hedges"]["active"] for r in self.last.values())})
+        lines += snapshot_family("arb_risk_daily_spent_usd", "gauge", "Notional spent today (UTC)",
+                                 {(): self.budget.spent(time.monotonic_ns())})
+        if rejects:
+            lines += snapshot_family("arb_risk_rejects_total", "counter", "Pre-trade risk rejects",
+                                     rejects, ["reason"])
+        return lines
@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from typing import Any, Tuple
+
+import numpy as np
 
 @dataclass
 class SpreadInput:
@@ -32,3 +35,90 @@ def calc_spread(inp: SpreadInput) -> tuple[SpreadResult, SpreadResult]:
     r1 = SpreadResult("buy_a_sell_b", s1, False)
     r2 = SpreadResult("buy_b_sell_a", s2, False)
     return r1, r2
+
+
+@dataclass
+class DepthSpreadResult:
+    dir_name: str
+    spread_bps: float    # исполнимый спред на целевой объём (VWAP обеих ног, с комиссиями)
+    amount: float        # объём в базовой валюте на целевой notional
+    vwap_buy: float
+    vwap_sell: float
+    max_amount: float    # максимальный объём, при котором спред ещё >= spread_min_bps
+    max_notional: float
+    ok: bool
+
+
+def _side(ob: Any, key: str, levels: int) -> Tuple[np.ndarray, np.ndarray]:
+    arr = np.asarray(ob[key][:levels], dtype=np.float64)
+    if arr.size == 0:
+        return np.zeros(0), np.zeros(0)
+    return arr[:, 0], arr[:, 1]
+
+
+def _cum(px: np.ndarray, qty: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # кумулятивные объём и стоимость с нулевой точкой в начале
+    cq = np.concatenate(([0.0], np.cumsum(qty)))
+    cc = np.concatenate(([0.0], np.cumsum(px * qty)))
+    return cq, cc
+
+
+def _walk(ask_px: np.ndarray, ask_qty: np.ndarray, bid_px: np.ndarray, bid_qty: np.ndarray,
+          dir_name: str, notional: float, fee: float, slip: float, min_bps: float) -> DepthSpreadResult:
+    if ask_px.size == 0 or bid_px.size == 0:
+        return DepthSpreadResult(dir_name, -1e9, 0.0, 0.0, 0.0, 0.0, 0.0, False)
+
+    qa, ca = _cum(ask_px, ask_qty)
+    qb, cb = _cum(bid_px, bid_qty)
+    q_cap = min(qa[-1], qb[-1])
+    k_buy = (1.0 + fee) * (1.0 + slip)
+    k_sell = 1.0 - fee
+
+    # объём под notional: обратная интерполяция кривой стоимости покупки
+    q_want = float(np.interp(notional, ca, qa))
+    q = min(q_want, q_cap)
+    cost = float(np.interp(q, qa, ca))
+    proceeds = float(np.interp(q, qb, cb))
+    if q > 0:
+        vwap_buy, vwap_sell = cost / q, proceeds / q
+    else:
+        vwap_buy, vwap_sell = float(ask_px[0]), float(bid_px[0])
+    spread = bps((vwap_sell * k_sell - vwap_buy * k_buy) / (vwap_buy * k_buy))
+
+    # максимальный объём: g(q) = P(q)*k_sell - (1+min)*C(q)*k_buy, g(0) = 0.
+    # Между изломами обеих кривых g линейна, а её наклон не растёт (цены хуже
+    # с глубиной), поэтому g >= 0 ровно на [0, q*] — ищем первый излом с g < 0.
+    m = 1.0 + min_bps / 10000.0
+    grid = np.union1d(qa[qa <= q_cap], qb[qb <= q_cap])
+    g = np.interp(grid, qb, cb) * k_sell - m * k_buy * np.interp(grid, qa, ca)
+    neg = np.flatnonzero(g < 0)
+    if neg.size == 0:
+        q_max = float(grid[-1])
+    else:
+        i = int(neg[0])
+        q0, q1, g0, g1 = grid[i - 1], grid[i], g[i - 1], g[i]
+        q_max = float(q0 + g0 / (g0 - g1) * (q1 - q0))
+    max_notional = float(np.interp(q_max, qa, ca))
+
+    covered = bool(notional <= ca[-1] and q_want <= qb[-1])
+    ok = covered and spread >= min_bps
+    return DepthSpreadResult(dir_name, spread, q, vwap_buy, vwap_sell, q_max, max_notional, ok)
+
+
+def calc_depth_spread(ob_a: Any, ob_b: Any, notional: float, taker_fee_bps: float,
+                      spread_min_bps: float, slippage_bps: float = 0.0,
+                      levels: int = 25) -> tuple[DepthSpreadResult, DepthSpreadResult]:
+    """
+    Исполнимый спред с учётом глубины: проходит `levels` уровней обоих стаканов
+    на целевой notional (в котируемой валюте) и считает VWAP обеих ног.
+    Возвращает оба направления, как calc_spread. ob_* — ccxt-словарь или L2Book.
+    """
+    fee = taker_fee_bps / 10000.0
+    slip = slippage_bps / 10000.0
+    a_bp, a_bq = _side(ob_a, "bids", levels)
+    a_ap, a_aq = _side(ob_a, "asks", levels)
+    b_bp, b_bq = _side(ob_b, "bids", levels)
+    b_ap, b_aq = _side(ob_b, "asks", levels)
+    r1 = _walk(a_ap, a_aq, b_bp, b_bq, "buy_a_sell_b", notional, fee, slip, spread_min_bps)
+    r2 = _walk(b_ap, b_aq, a_bp, a_bq, "buy_b_sell_a", notional, fee, slip, spread_min_bps)
+    return r1, r2
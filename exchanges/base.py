@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 import math
 
+from .book import L2Book
+from .rules import RulesIndex
+
 
 def round_step(value: float, step: float) -> float:
     if step <= 0:
@@ -10,6 +13,44 @@ def round_step(value: float, step: float) -> float:
 
 class BaseExchange(ABC):
     name: str
+    quote_ccy: str = "USDT"      # в чём котируются основные пары биржи
+    taker_fee_bps: float = 10.0
+    _rules: Optional[RulesIndex] = None
+    _last_ask: Optional[Dict[str, float]] = None
+
+    def venue_symbol(self, common: str) -> str:
+        """'BTC/USDT' -> символ этой биржи (для KRW-бирж — 'BTC/KRW')."""
+        if self.quote_ccy != "USDT" and common.endswith("/USDT"):
+            return f"{common[:-5]}/{self.quote_ccy}"
+        return common
+
+    def rules_index(self) -> RulesIndex:
+        """Индекс правил по текущим self._markets; пересобирается, когда маркеты подменили."""
+        markets = getattr(self, "_markets", None)
+        idx = self._rules
+        if idx is None or idx.markets is not markets:
+            idx = self._rules = RulesIndex(markets)
+        return idx
+
+    def market_id(self, symbol: str) -> Optional[str]:
+        r = self.rules_index().get(symbol)
+        return r.market_id if r is not None else None
+
+    def remember_ask(self, symbol: str, ob: Any) -> None:
+        asks = ob.get("asks")
+        if asks:
+            if self._last_ask is None:
+                self._last_ask = {}
+            self._last_ask[symbol] = float(asks[0][0])
+
+    def ask_hint(self, symbol: str) -> Optional[float]:
+        """Последний известный ask (живой WS-стакан или последний REST) — для покупки на сумму."""
+        stream = getattr(self, "stream", None)
+        if stream is not None:
+            book = stream.get(symbol)
+            if book is not None and book.best_ask:
+                return book.best_ask
+        return (self._last_ask or {}).get(symbol)
 
     @abstractmethod
     async def get_ticker(self, symbol: str) -> Dict[str, Any]: ...
@@ -17,6 +58,11 @@ class BaseExchange(ABC):
     async def get_orderbook(self, symbol: str) -> Dict[str, Any]: ...
     @abstractmethod
     async def get_balance(self) -> Dict[str, float]: ...
+
+    async def get_free_balance(self) -> Dict[str, float]:
+        """Свободные средства (без занятых в ордерах); у биржи без ордеров в книге — весь баланс."""
+        return await self.get_balance()
+
     @abstractmethod
     async def create_market_order(self, symbol: str, side: str, amount: float) -> Dict[str, Any]: ...
     @abstractmethod
@@ -40,7 +86,9 @@ class BaseExchange(ABC):
         step = self.price_step(symbol)
         return round_step(price, step)
 
-def best_bid_ask(ob: Dict[str, Any]) -> Tuple[float, float]:
+def best_bid_ask(ob: Dict[str, Any] | L2Book) -> Tuple[float, float]:
+    if isinstance(ob, L2Book):
+        return ob.best_bid_ask()
     bids = ob.get("bids") or []
     asks = ob.get("asks") or []
     bid = float(bids[0][0]) if bids else 0.0
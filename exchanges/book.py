@@ -0,0 +1,220 @@
+import time
+import zlib
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class BookDesync(Exception):
+    """Локальный стакан разошёлся с биржей (пропуск апдейтов/чексумма) — нужен ресинк."""
+
+
+class BookSide:
+    """
+    Одна сторона стакана: отсортированные ключи + dict уровней.
+    Ключ — цена для asks и -цена для bids, поэтому лучший уровень всегда keys[0].
+    Поиск уровня — bisect, O(log n); лучший уровень — O(1). Вставка и удаление
+    уровня — list.insert/del, O(n) сдвиг хвоста, но это memmove не больше
+    max_levels (200) указателей — дешевле сортированного контейнера на таком размере.
+    """
+    __slots__ = ("sign", "keys", "qty", "raw", "_cum_qty", "_cum_cost")
+
+    def __init__(self, bids: bool) -> None:
+        self.sign = -1.0 if bids else 1.0
+        self.keys: List[float] = []
+        self.qty: Dict[float, float] = {}
+        self.raw: Dict[float, Tuple[str, str]] = {}  # для чексумм — строки как прислала биржа
+        self._cum_qty: Optional[List[float]] = None
+        self._cum_cost: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.qty.clear()
+        self.raw.clear()
+        self._cum_qty = self._cum_cost = None
+
+    def set(self, px: Any, qty: Any) -> None:
+        p, q = float(px), float(qty)
+        k = p * self.sign
+        i = bisect_left(self.keys, k)
+        exists = i < len(self.keys) and self.keys[i] == k
+        if q == 0.0:
+            if exists:
+                del self.keys[i]
+                del self.qty[p]
+                self.raw.pop(p, None)
+        else:
+            if not exists:
+                self.keys.insert(i, k)
+            self.qty[p] = q
+            if isinstance(px, str) and isinstance(qty, str):
+                self.raw[p] = (px, qty)
+            else:
+                self.raw.pop(p, None)
+        self._cum_qty = self._cum_cost = None
+
+    def truncate(self, n: int) -> None:
+        for k in self.keys[n:]:
+            p = k * self.sign
+            self.qty.pop(p, None)
+            self.raw.pop(p, None)
+        del self.keys[n:]
+        self._cum_qty = self._cum_cost = None
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not self.keys:
+            return None
+        p = self.keys[0] * self.sign
+        return p, self.qty[p]
+
+    def top(self, n: int) -> List[List[float]]:
+        s, qty = self.sign, self.qty
+        return [[k * s, qty[k * s]] for k in self.keys[:n]]
+
+    def _prefix(self) -> None:
+        s, qty = self.sign, self.qty
+        sizes = [qty[k * s] for k in self.keys]
+        self._cum_qty = list(accumulate(sizes))
+        self._cum_cost = list(accumulate(k * s * q for k, q in zip(self.keys, sizes)))
+
+    def depth(self, n: int) -> Tuple[float, float]:
+        """(объём, стоимость в котируемой) первых n уровней; O(1) между изменениями."""
+        if self._cum_qty is None:
+            self._prefix()
+        if not self._cum_qty or n <= 0:
+            return 0.0, 0.0
+        i = min(n, len(self._cum_qty)) - 1
+        return self._cum_qty[i], self._cum_cost[i]
+
+    def raw_level(self, i: int) -> Tuple[str, str]:
+        p = self.keys[i] * self.sign
+        r = self.raw.get(p)
+        return r if r is not None else (repr(p), repr(self.qty[p]))
+
+
+class L2Book:
+    """
+    Инкрементальный L2-стакан: снапшот + дельты, контроль последовательности
+    id апдейтов и чексумм (verify — для лент, присылающих CRC32 уровней, как
+    OKX; Bybit v5 и Gate spot.obu чексумму не шлют, у них — только id). Читается как ccxt-словарь (ob["bids"][0][0]), так что
+    best_bid_ask, calc_spread и остальной код работают с ним напрямую.
+    """
+
+    def __init__(self, symbol: str, depth: int = 25, max_levels: int = 200) -> None:
+        self.symbol = symbol
+        self.depth = depth
+        self.max_levels = max_levels
+        self.bids = BookSide(bids=True)
+        self.asks = BookSide(bids=False)
+        self.seq = 0
+        self.ts: Optional[int] = None
+        self.received = 0.0
+        self.synced = False
+        self._view: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_ccxt(cls, ob: Dict[str, Any], depth: int = 25) -> "L2Book":
+        book = cls(ob.get("symbol") or "", depth=depth)
+        book.snapshot(ob.get("bids") or [], ob.get("asks") or [],
+                      seq=ob.get("nonce") or 0, ts=ob.get("timestamp"))
+        return book
+
+    # --- изменения ---
+    def snapshot(self, bids: Iterable[Sequence[Any]], asks: Iterable[Sequence[Any]],
+                 seq: int = 0, ts: Optional[int] = None) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        self._apply(bids, asks)
+        self._stamp(seq, ts)
+        self.synced = True
+
+    def apply(self, bids: Iterable[Sequence[Any]], asks: Iterable[Sequence[Any]],
+              seq: int, ts: Optional[int] = None, prev_seq: Optional[int] = None) -> None:
+        """
+        Дельта: уровни с нулевым объёмом удаляются. prev_seq — id, который
+        должен совпасть с последним применённым (иначе BookDesync).
+        """
+        if not self.synced:
+            return
+        if prev_seq is not None and prev_seq != self.seq:
+            self.synced = False
+            raise BookDesync(self.symbol)
+        self._apply(bids, asks)
+        self._stamp(seq, ts)
+
+    def invalidate(self) -> None:
+        self.synced = False
+
+    def _apply(self, bids: Iterable[Sequence[Any]], asks: Iterable[Sequence[Any]]) -> None:
+        for px, qty, *_ in bids:
+            self.bids.set(px, qty)
+        for px, qty, *_ in asks:
+            self.asks.set(px, qty)
+        if len(self.bids) > self.max_levels:
+            self.bids.truncate(self.max_levels)
+        if len(self.asks) > self.max_levels:
+            self.asks.truncate(self.max_levels)
+
+    def _stamp(self, seq: int, ts: Optional[int]) -> None:
+        self._view = None
+        self.seq = int(seq)
+        self.ts = ts
+        self.received = time.monotonic()
+
+    # --- чтение ---
+    @property
+    def best_bid(self) -> float:
+        b = self.bids.best()
+        return b[0] if b else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        a = self.asks.best()
+        return a[0] if a else 0.0
+
+    def best_bid_ask(self) -> Tuple[float, float]:
+        return self.best_bid, self.best_ask
+
+    def cum_depth(self, side: str, n: int) -> Tuple[float, float]:
+        return (self.bids if side == "bids" else self.asks).depth(n)
+
+    def checksum(self, n: int = 25) -> int:
+        """
+        CRC32 (знаковый int32) по первым n уровням, чередуя bid и ask:
+        'bid_px:bid_qty:ask_px:ask_qty:...' — строки в том виде, как их прислала биржа.
+        """
+        parts: List[str] = []
+        for i in range(n):
+            if i < len(self.bids):
+                parts.extend(self.bids.raw_level(i))
+            if i < len(self.asks):
+                parts.extend(self.asks.raw_level(i))
+        crc = zlib.crc32(":".join(parts).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def verify(self, expected: int, n: int = 25) -> None:
+        if self.checksum(n) != int(expected):
+            self.synced = False
+            raise BookDesync(self.symbol)
+
+    # --- совместимость с ccxt-словарём ---
+    def to_dict(self) -> Dict[str, Any]:
+        if self._view is None:
+            self._view = {
+                "symbol": self.symbol,
+                "bids": self.bids.top(self.depth),
+                "asks": self.asks.top(self.depth),
+                "timestamp": self.ts,
+                "datetime": None,
+                "nonce": self.seq,
+            }
+        return self._view
+
+    def __getitem__(self, key: str) -> Any:
+        return self.to_dict()[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.to_dict().get(key, default)
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import AsyncResolver, ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+log = logging.getLogger("connections")
+
+
+class ConnectionManager:
+    """
+    Соединения к торговому REST одной биржи: DNS через aiodns с долгим кэшем,
+    пул keep-alive и фоновый heartbeat, который держит не меньше min_warm
+    открытых TLS-соединений (параллельные лёгкие GET открывают недостающие и
+    не дают простаивающим закрыться). По каждому запросу видно, ушёл ли он по
+    уже открытому соединению (warm) или платил DNS/TCP/TLS (cold).
+    """
+
+    def __init__(self, venue: str, url: str, heartbeat_path: str, min_warm: int = 2,
+                 heartbeat: float = 15.0, keepalive: float = 60.0, timeout: float = 5.0) -> None:
+        self.venue = venue
+        self.url = url.rstrip("/")
+        self.heartbeat_path = heartbeat_path
+        self.min_warm = min_warm
+        self.heartbeat = heartbeat
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.refs = 0
+        self.opened = 0          # всего открыто соединений
+        self.warm_sent = 0       # запросы по тёплому соединению
+        self.cold_sent = 0       # запросы, открывшие соединение
+        self.heartbeats = 0
+        self.heartbeat_errors = 0
+        self.last_heartbeat_ms = 0.0
+        self._session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._trace = TraceConfig()
+        self._trace.on_connection_create_start.append(self._on_create)
+        self._trace.on_connection_reuseconn.append(self._on_reuse)
+
+    async def _on_create(self, session, ctx, params) -> None:
+        self.opened += 1
+        if isinstance(ctx.trace_request_ctx, dict):
+            ctx.trace_request_ctx["warm"] = False
+
+    async def _on_reuse(self, session, ctx, params) -> None:
+        if isinstance(ctx.trace_request_ctx, dict):
+            ctx.trace_request_ctx["warm"] = True
+
+    def session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(resolver=AsyncResolver(), ttl_dns_cache=3600,
+                                     keepalive_timeout=self.keepalive)
+            self._session = ClientSession(connector=connector, trace_configs=[self._trace],
+                                          timeout=ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def request(self, method: str, path: str, **kw: Any) -> Tuple[int, bytes, bool]:
+        """(status, body, warm) — warm=False, если под запрос открывалось соединение."""
+        ctx: Dict[str, Any] = {"warm": True}
+        async with self.session().request(method, self.url + path,
+                                          trace_request_ctx=ctx, **kw) as r:
+            body = await r.read()
+        if ctx["warm"]:
+            self.warm_sent += 1
+        else:
+            self.cold_sent += 1
+        return r.status, body, ctx["warm"]
+
+    async def warm(self) -> None:
+        """min_warm параллельных heartbeat'ов: недостающие соединения откроются."""
+        t0 = time.perf_counter()
+        res = await asyncio.gather(*(self.session().get(self.url + self.heartbeat_path)
+                                     for _ in range(self.min_warm)), return_exceptions=True)
+        for r in res:
+            if isinstance(r, BaseException):
+                self.heartbeat_errors += 1
+                log.warning(f"{self.venue} heartbeat failed: {r}")
+            else:
+                await r.read()
+                r.release()
+                self.heartbeats += 1
+        self.last_heartbeat_ms = (time.perf_counter() - t0) * 1000.0
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                log.warning(f"{self.venue} warm-up error {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    def start(self) -> None:
+        self.refs += 1
+        if self.min_warm > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+
+    async def release(self) -> None:
+        self.refs -= 1
+        if self.refs <= 0:
+            await self.close()
+
+    async def close(self) -> None:
+        self.refs = 0
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "opened": self.opened,
+            "warm_sent": self.warm_sent,
+            "cold_sent": self.cold_sent,
+            "heartbeats": self.heartbeats,
+            "heartbeat_errors": self.heartbeat_errors,
+            "last_heartbeat_ms": round(self.last_heartbeat_ms, 2),
+        }
+
+
+class ConnectionPools:
+    """Менеджеры соединений процесса по (venue, url): клиенты одной биржи делят пул."""
+
+    def __init__(self, min_warm: int = 2, heartbeat: float = 15.0) -> None:
+        self.min_warm = min_warm
+        self.heartbeat = heartbeat
+        self.managers: Dict[Tuple[str, str], ConnectionManager] = {}
+
+    def configure(self, min_warm: Optional[int] = None, heartbeat: Optional[float] = None) -> None:
+        if min_warm is not None:
+            self.min_warm = min_warm
+        if heartbeat is not None:
+            self.heartbeat = heartbeat
+
+    def get(self, venue: str, url: str, heartbeat_path: str) -> ConnectionManager:
+        key = (venue, url)
+        m = self.managers.get(key)
+        if m is None:
+            m = self.managers[key] = ConnectionManager(venue, url, heartbeat_path,
+                                                       self.min_warm, self.heartbeat)
+        return m
+
+    def stats(self) -> Dict[str, Any]:
+        return {venue: m.stats() for (venue, _), m in self.managers.items()}
+
+
+pools = ConnectionPools()
@@ -0,0 +1,235 @@
+import base64
+import hashlib
+import hmac
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import ccxt.async_support as ccxt
+import orjson
+
+from exchanges.connections import ConnectionManager, pools
+
+
+class FastPathUnavailable(Exception):
+    """Быстрый путь не может отправить ордер (нет ключей/id/цены) — ордер идёт через ccxt."""
+
+
+def num(x: float) -> str:
+    """Число для API без экспоненты и хвостовых нулей: 1e-05 -> '0.00001'."""
+    s = f"{x:.12f}".rstrip("0").rstrip(".")
+    return s or "0"
+
+
+def _head(raw: bytes, n: int = 200) -> str:
+    return raw[:n].decode("utf-8", "replace")
+
+
+class FastOrderPath(ABC):
+    """
+    Прямая отправка/отмена рыночных ордеров подписанным REST без ccxt:
+    прогретые соединения (ConnectionManager), минимальное тело, подпись на месте.
+    Бросает FastPathUnavailable только до отправки запроса — тогда клиент
+    уходит в ccxt. Ошибки после отправки (ответ биржи, таймаут) пробрасываются:
+    повтор через другой путь мог бы задвоить ордер.
+    """
+    venue = ""
+    url = ""
+    heartbeat_path = ""  # лёгкий публичный GET для прогрева соединений
+
+    def __init__(self, api_key: str, api_secret: str, url: Optional[str] = None,
+                 price_hint: Callable[[str], Optional[float]] = lambda sym: None,
+                 timeout: float = 5.0) -> None:
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.url = (url or self.url).rstrip("/")
+        self.price_hint = price_hint
+        self.timeout = timeout
+        self.conns: ConnectionManager = pools.get(self.venue, self.url, self.heartbeat_path)
+        self.sent = 0
+        self.last_warm = True  # ушёл ли последний запрос по тёплому соединению
+        self._started = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key and self.api_secret)
+
+    def start(self) -> None:
+        """Прогрев соединений и heartbeat — только если быстрый путь будет работать."""
+        if self.enabled and not self._started:
+            self._started = True
+            self.conns.start()
+
+    async def close(self) -> None:
+        # пул общий на биржу: закрываем, когда его больше никто не держит
+        if self._started:
+            self._started = False
+            await self.conns.release()
+        elif self.conns.refs == 0:
+            await self.conns.close()
+
+    async def _send(self, method: str, path: str, headers: Dict[str, str],
+                    body: bytes = b"", query: str = "") -> Any:
+        self.sent += 1
+        status, raw, self.last_warm = await self.conns.request(
+            method, f"{path}?{query}" if query else path, data=body or None, headers=headers)
+        # статус — до разбора: страница ошибки балансировщика (HTML 502/429) не JSON
+        if status >= 400:
+            raise ccxt.ExchangeError(f"{self.venue} {status} {_head(raw)}")
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            raise ccxt.ExchangeError(f"{self.venue} {status} not json: {_head(raw)}") from None
+
+    def _order(self, oid: str, symbol: str, side: str, amount: float, data: Any) -> Dict[str, Any]:
+        return {"id": oid, "symbol": symbol, "side": side, "amount": amount,
+                "conn": "warm" if self.last_warm else "cold", "info": data}
+
+    def _check(self, symbol: str, market_id: Optional[str]) -> str:
+        if not self.enabled:
+            raise FastPathUnavailable(f"{self.venue}: no api keys")
+        if not market_id:
+            raise FastPathUnavailable(f"{self.venue}: no market id for {symbol}")
+        return market_id
+
+    def _quote_total(self, symbol: str, amount: float) -> float:
+        # рыночная покупка на бирже задаётся суммой в котируемой валюте
+        px = self.price_hint(symbol)
+        if not px:
+            raise FastPathUnavailable(f"{self.venue}: no price for market buy {symbol}")
+        return amount * px
+
+    @abstractmethod
+    async def create_market(self, symbol: str, market_id: Optional[str], side: str,
+                            amount: float) -> Dict[str, Any]: ...
+    @abstractmethod
+    async def cancel(self, order_id: str, symbol: str, market_id: Optional[str]) -> Any: ...
+
+
+class BybitFastPath(FastOrderPath):
+    """Bybit v5: HMAC-SHA256(ts + key + recv_window + body), заголовки X-BAPI-*."""
+    venue = "bybit"
+    url = "https://api.bybit.com"
+    heartbeat_path = "/v5/market/time"
+    recv_window = "5000"
+
+    def _headers(self, body: bytes) -> Dict[str, str]:
+        ts = str(int(time.time() * 1000))
+        pre = (ts + self.api_key + self.recv_window).encode() + body
+        return {
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-TIMESTAMP": ts,
+            "X-BAPI-RECV-WINDOW": self.recv_window,
+            "X-BAPI-SIGN": hmac.new(self.api_secret.encode(), pre, hashlib.sha256).hexdigest(),
+            "Content-Type": "application/json",
+        }
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        body = orjson.dumps(payload)
+        data = await self._send("POST", path, self._headers(body), body)
+        if data.get("retCode") != 0:
+            raise ccxt.ExchangeError(f"bybit {data.get('retCode')} {data.get('retMsg')}")
+        return data
+
+    async def create_market(self, symbol, market_id, side, amount):
+        mid = self._check(symbol, market_id)
+        data = await self._post("/v5/order/create", {
+            "category": "spot", "symbol": mid, "side": "Buy" if side == "buy" else "Sell",
+            "orderType": "Market", "qty": num(amount), "marketUnit": "baseCoin",
+        })
+        return self._order(data["result"]["orderId"], symbol, side, amount, data)
+
+    async def cancel(self, order_id, symbol, market_id):
+        mid = self._check(symbol, market_id)
+        return await self._post("/v5/order/cancel",
+                                {"category": "spot", "symbol": mid, "orderId": order_id})
+
+
+class GateFastPath(FastOrderPath):
+    """Gate v4: HMAC-SHA512('METHOD\\npath\\nquery\\nsha512(body)\\nts'), заголовки KEY/SIGN/Timestamp."""
+    venue = "gate"
+    url = "https://api.gateio.ws"
+    heartbeat_path = "/api/v4/spot/time"
+    prefix = "/api/v4"
+
+    def _headers(self, method: str, path: str, query: str, body: bytes) -> Dict[str, str]:
+        ts = str(int(time.time()))
+        pre = "\n".join((method, path, query, hashlib.sha512(body).hexdigest(), ts))
+        return {
+            "KEY": self.api_key,
+            "Timestamp": ts,
+            "SIGN": hmac.new(self.api_secret.encode(), pre.encode(), hashlib.sha512).hexdigest(),
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+
+    async def create_market(self, symbol, market_id, side, amount):
+        mid = self._check(symbol, market_id)
+        qty = self._quote_total(symbol, amount) if side == "buy" else amount
+        body = orjson.dumps({"currency_pair": mid, "type": "market", "side": side,
+                             "amount": num(qty), "time_in_force": "ioc"})
+        path = self.prefix + "/spot/orders"
+        data = await self._send("POST", path, self._headers("POST", path, "", body), body)
+        return self._order(str(data["id"]), symbol, side, amount, data)
+
+    async def cancel(self, order_id, symbol, market_id):
+        mid = self._check(symbol, market_id)
+        path = f"{self.prefix}/spot/orders/{order_id}"
+        query = urlencode({"currency_pair": mid})
+        return await self._send("DELETE", path, self._headers("DELETE", path, query, b""),
+                                query=query)
+
+
+class BithumbFastPath(FastOrderPath):
+    """Bithumb API 2.0: JWT HS256 с query_hash (SHA512 от параметров запроса)."""
+    venue = "bithumb"
+    url = "https://api.bithumb.com"
+    heartbeat_path = "/v1/ticker?markets=KRW-BTC"
+
+    def _token(self, query: str) -> str:
+        payload = {
+            "access_key": self.api_key,
+            "nonce": str(uuid.uuid4()),
+            "timestamp": int(time.time() * 1000),
+        }
+        if query:
+            payload["query_hash"] = hashlib.sha512(query.encode()).hexdigest()
+            payload["query_hash_alg"] = "SHA512"
+        return jwt_hs256(payload, self.api_secret)
+
+    @staticmethod
+    def market_code(symbol: str) -> str:
+        # 'BTC/KRW' -> 'KRW-BTC'
+        base, quote = symbol.split(":")[0].split("/")
+        return f"{quote}-{base}"
+
+    async def create_market(self, symbol, market_id, side, amount):
+        self._check(symbol, market_id)
+        params = {"market": self.market_code(symbol), "side": "bid" if side == "buy" else "ask"}
+        if side == "buy":
+            params.update(ord_type="price", price=num(int(self._quote_total(symbol, amount))))
+        else:
+            params.update(ord_type="market", volume=num(amount))
+        headers = {"Authorization": f"Bearer {self._token(urlencode(params))}",
+                   "Content-Type": "application/json"}
+        data = await self._send("POST", "/v1/orders", headers, orjson.dumps(params))
+        return self._order(data["uuid"], symbol, side, amount, data)
+
+    async def cancel(self, order_id, symbol, market_id):
+        self._check(symbol, market_id)
+        query = urlencode({"uuid": order_id})
+        headers = {"Authorization": f"Bearer {self._token(query)}"}
+        return await self._send("DELETE", "/v1/order", headers, query=query)
+
+
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def jwt_hs256(payload: Dict[str, Any], secret: str) -> str:
+    head = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+    body = _b64url(orjson.dumps(payload))
+    sig = hmac.new(secret.encode(), f"{head}.{body}".encode(), hashlib.sha256).digest()
+    return f"{head}.{body}.{_b64url(sig)}"
@@ -1,77 +1,126 @@
 import ccxt.async_support as ccxt
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional
 from .base import BaseExchange
+from .fastrest import GateFastPath, FastPathUnavailable
+from .markets import markets_store
+from .ratelimit import limiter_for
+from .rules import TradingRules
+from .stream import GateBookStream
 
 class GateClient(BaseExchange):
     name = "gate"
 
-    def __init__(self, api_key: str, api_secret: str) -> None:
+    def __init__(self, api_key: str, api_secret: str,
+                 stream: bool = False, ws_url: Optional[str] = None,
+                 fast: bool = True, rest_url: Optional[str] = None) -> None:
         self.x = ccxt.gateio({
             "apiKey": api_key,
             "secret": api_secret,
-            "enableRateLimit": True,
+            "enableRateLimit": False,  # лимиты держит self.limiter
         })
         self._markets: Dict[str, Any] = {}
+        # общий на биржу token bucket: ордера идут раньше стаканов
+        self.limiter = limiter_for(self.name)
+        # ордера — прямым подписанным REST, ccxt остаётся фоллбеком
+        self.fast: Optional[GateFastPath] = (
+            GateFastPath(api_key, api_secret, url=rest_url, price_hint=self.ask_hint) if fast else None)
+        # WS-режим: стаканы держим в памяти, REST — только фоллбек
+        self.stream: Optional[GateBookStream] = GateBookStream(url=ws_url) if stream else None
 
     def normalize_symbol(self, common: str) -> str:
         if "/" in common:
             return common
-        key = common.upper().replace("-", "").replace("_", "").replace(":", "").replace("/", "")
-        for s in self._markets.keys():
-            if s.replace("/", "").upper() == key:
-                return s
+        sym = self.rules_index().resolve(common)
+        if sym is not None:
+            return sym
         if common.upper().endswith("USDT"):
             return f"{common[:-4]}/USDT"
         return common
 
-    def _m(self, symbol: str) -> Dict[str, Any]:
-        sym = self.normalize_symbol(symbol)
-        m = self._markets.get(sym)
-        if not m:
-            raise RuntimeError(f"markets not loaded or symbol not found: {sym}")
-        return m
+    def _r(self, symbol: str) -> TradingRules:
+        r = self.rules_index().get(symbol)
+        if r is None:
+            raise RuntimeError(f"markets not loaded or symbol not found: {self.normalize_symbol(symbol)}")
+        return r
 
     def lot_size(self, symbol: str) -> float:
-        m = self._m(symbol)
-        step = m.get("limits", {}).get("amount", {}).get("min") or m.get("precision", {}).get("amount")
-        return float(step or 0.000001)
+        return self._r(symbol).lot
 
     def price_step(self, symbol: str) -> float:
-        m = self._m(symbol)
-        p = m.get("precision", {}).get("price")
-        if isinstance(p, int):
-            return 10 ** (-p)
-        return float(p or 0.01)
+        return self._r(symbol).tick
 
     def min_notional(self, symbol: str) -> float:
-        m = self._m(symbol)
-        cost = m.get("limits", {}).get("cost", {}).get("min")
-        return float(cost or 0.0)
+        return self._r(symbol).min_cost
 
     async def get_ticker(self, symbol: str) -> Dict[str, Any]:
+        await self.limiter.acquire("fetch_ticker")
         return await self.x.fetch_ticker(self.normalize_symbol(symbol))
 
+    def watch(self, symbols: Iterable[str]) -> None:
+        if self.stream is None:
+            return
+        self.stream.subscribe(self.normalize_symbol(s) for s in symbols)
+        self.stream.start()
+
     async def get_orderbook(self, symbol: str) -> Dict[str, Any]:
-        return await self.x.fetch_order_book(self.normalize_symbol(symbol), limit=25)
+        sym = self.normalize_symbol(symbol)
+        if self.stream is not None:
+            ob = self.stream.get(sym)
+            if ob is not None:
+                return ob
+            self.watch([sym])
+        await self.limiter.acquire("fetch_order_book")
+        ob = await self.x.fetch_order_book(sym, limit=25)
+        self.remember_ask(sym, ob)
+        return ob
 
     async def get_balance(self) -> Dict[str, float]:
+        await self.limiter.acquire("fetch_balance")
         b = await self.x.fetch_balance()
         total = b.get("total", {})
         return {k: float(v) for k, v in total.items()}
 
+    async def get_free_balance(self) -> Dict[str, float]:
+        await self.limiter.acquire("fetch_balance")
+        b = await self.x.fetch_balance()
+        free = b.get("free", {})
+        return {k: float(v) for k, v in free.items() if v is not None}
+
     async def create_market_order(self, symbol: str, side: str, amount: float) -> Dict[str, Any]:
         amt = self.normalize_amount(symbol, amount)
-        return await self.x.create_order(self.normalize_symbol(symbol), "market", side, amt)
+        sym = self.normalize_symbol(symbol)
+        await self.limiter.acquire("create_order")
+        if self.fast is not None:
+            try:
+                return await self.fast.create_market(sym, self.market_id(sym), side, amt)
+            except FastPathUnavailable:
+                pass
+        return await self.x.create_order(sym, "market", side, amt)
 
     async def cancel_order(self, order_id: str, symbol: str) -> None:
-        await self.x.cancel_order(order_id, self.normalize_symbol(symbol))
+        sym = self.normalize_symbol(symbol)
+        await self.limiter.acquire("cancel_order")
+        if self.fast is not None:
+            try:
+                await self.fast.cancel(order_id, sym, self.market_id(sym))
+                return
+            except FastPathUnavailable:
+                pass
+        await self.x.cancel_order(order_id, sym)
 
     async def close(self) -> None:
+        await markets_store.close(self)
+        if self.fast is not None:
+            await self.fast.close()
+        if self.stream is not None:
+            await self.stream.stop()
         await self.x.close()
 
     async def __aenter__(self) -> "GateClient":
-        await self.x.load_markets()
-        self._markets = self.x.markets
+        # маркеты со снапшота на диске, свежие — в фоне (exchanges/markets.py)
+        await markets_store.open(self)
+        if self.fast is not None:
+            self.fast.start()  # DNS/TCP/TLS до первого ордера, дальше heartbeat
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ccxt
+import orjson
+
+log = logging.getLogger("markets")
+
+
+class MarketsStore:
+    """
+    Снапшот маркетов ccxt на диске, файл на биржу: клиент стартует из файла без
+    load_markets. Если снапшот старше ttl — стартуем из него же, а свежие маркеты
+    тянем в фоне; дальше обновляем раз в ttl. Новые маркеты подменяются одним
+    присваиванием (ex._markets) вместе с индексом правил, файл пишется через
+    временный + os.replace.
+    В файле — уже разобранные ccxt маркеты (после set_markets): при той же версии
+    ccxt они только переиндексируются, без дорогого set_markets на тысячи пар.
+    """
+
+    def __init__(self, root: str = "storage/markets", ttl: float = 6 * 3600.0,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.root = Path(root)
+        self.ttl = ttl
+        self.clock = clock
+        self._tasks: Dict[int, asyncio.Task] = {}  # id(клиента) -> фоновое обновление
+
+    def configure(self, root: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        if root is not None:
+            self.root = Path(root)
+        if ttl is not None:
+            self.ttl = ttl
+
+    def path(self, venue: str) -> Path:
+        return self.root / f"{venue}.json"
+
+    def load(self, venue: str) -> Optional[Tuple[float, Any, Any, bool]]:
+        """
+        (ts, markets, currencies, built) или None, если снапшота нет/он битый.
+        built — маркеты записаны этой же версией ccxt и готовы к restore().
+        """
+        try:
+            data = orjson.loads(self.path(venue).read_bytes())
+            return (float(data["ts"]), data["markets"], data.get("currencies"),
+                    data.get("ccxt") == ccxt.__version__)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning(f"{venue} markets snapshot unreadable: {e}")
+            return None
+
+    def save(self, venue: str, markets: Any, currencies: Any = None) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(venue)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(orjson.dumps({
+            "ts": self.clock(),
+            "markets": list(markets.values()) if isinstance(markets, dict) else markets,
+            "currencies": currencies,
+            "ccxt": ccxt.__version__,
+        }, option=orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp, path)
+
+    async def open(self, ex: Any) -> None:
+        """Маркеты для ex (ccxt в ex.x): с диска, если есть снапшот, иначе load_markets."""
+        snap = self.load(ex.name)
+        if snap is None:
+            await self.fetch(ex)
+            delay = self.ttl
+        else:
+            ts, markets, currencies, built = snap
+            if built:
+                restore(ex.x, markets, currencies or {})
+            else:
+                ex.x.set_markets(markets, currencies or None)
+            ex._markets = ex.x.markets
+            ex.rules_index()
+            delay = max(0.0, ts + self.ttl - self.clock())
+        self._tasks[id(ex)] = asyncio.create_task(self._refresher(ex, delay))
+
+    async def fetch(self, ex: Any) -> None:
+        limiter = getattr(ex, "limiter", None)
+        if limiter is not None:
+            await limiter.acquire("load_markets")
+        markets = await ex.x.load_markets(reload=True)
+        ex._markets = markets
+        ex.rules_index()
+        await asyncio.to_thread(self.save, ex.name, markets, ex.x.currencies)
+
+    async def _refresher(self, ex: Any, delay: float) -> None:
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.fetch(ex)
+                delay = self.ttl
+            except Exception as e:
+                log.warning(f"{ex.name} markets refresh failed: {e}")
+                delay = min(self.ttl, 60.0)
+
+    async def close(self, ex: Any) -> None:
+        t = self._tasks.pop(id(ex), None)
+        if t is not None:
+            t.cancel()
+            await asyncio.gather(t, return_exceptions=True)
+
+
+def restore(x: Any, markets: List[Dict[str, Any]], currencies: Dict[str, Any]) -> None:
+    """То, что делает ccxt set_markets, для уже разобранных маркетов: только индексы."""
+    by_id: Dict[str, List[Dict[str, Any]]] = {}
+    for m in sorted(markets, key=lambda m: not m.get("spot")):  # spot первыми, как в ccxt
+        by_id.setdefault(m["id"], []).append(m)
+    by_symbol = {m["symbol"]: m for m in markets}
+    x.markets = by_symbol
+    x.markets_by_id = by_id
+    x.symbols = sorted(by_symbol)
+    x.ids = sorted(by_id)
+    x.currencies = currencies
+    x.currencies_by_id = x.index_by(list(currencies.values()), "id")
+    x.codes = sorted(currencies)
+
+
+# общий для всех клиентов процесса
+markets_store = MarketsStore()
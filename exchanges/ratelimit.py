@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger("ratelimit")
+
+# приоритеты: меньше — раньше
+ORDER = 0     # create/cancel — не ждут за поллингом
+ACCOUNT = 1   # балансы, статусы ордеров
+MARKET = 2    # стаканы, тикеры, маркеты
+
+# эндпоинт -> (вес, приоритет)
+ENDPOINTS: Dict[str, Tuple[float, int]] = {
+    "create_order": (1.0, ORDER),
+    "cancel_order": (1.0, ORDER),
+    "fetch_order": (1.0, ACCOUNT),
+    "fetch_balance": (2.0, ACCOUNT),
+    "fetch_order_book": (1.0, MARKET),
+    "fetch_ticker": (1.0, MARKET),
+    "load_markets": (5.0, MARKET),
+}
+
+# бюджет на биржу: rate — вес в секунду, burst — ёмкость ведра; weights — свои веса
+VENUE_LIMITS: Dict[str, Dict[str, Any]] = {
+    "bybit": {"rate": 20.0, "burst": 40.0},
+    "gate": {"rate": 15.0, "burst": 30.0, "weights": {"load_markets": 10.0}},
+    "bithumb": {"rate": 10.0, "burst": 20.0, "weights": {"fetch_balance": 3.0}},
+}
+
+
+class RateLimiter:
+    """
+    Token bucket одной биржи с весами эндпоинтов и приоритетами: пока в очереди
+    есть ордер или отмена, стаканы ждут за ними, а не наоборот. Внутри одного
+    приоритета — FIFO. usage() — доля бюджета, занятая сейчас (с учётом очереди):
+    > 1 — запросы уже ждут; по ней поллинг притормаживает заранее, до 429.
+    """
+
+    def __init__(self, venue: str, rate: float, burst: float,
+                 weights: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.venue = venue
+        self.rate = rate
+        self.burst = burst
+        self.weights = weights or {}
+        self.clock = clock
+        self.tokens = burst
+        self._ts = clock()
+        self._queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._queued_weight = 0.0
+        self._drainer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None  # создаётся в цикле дренера
+        self.granted = [0, 0, 0]
+        self.waited = [0, 0, 0]
+        self.max_wait_ms = [0.0, 0.0, 0.0]
+
+    def cost(self, endpoint: str) -> Tuple[float, int]:
+        w, prio = ENDPOINTS.get(endpoint, (1.0, MARKET))
+        return min(self.weights.get(endpoint, w), self.burst), prio
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def usage(self) -> float:
+        self._refill()
+        return (self.burst - self.tokens + self._queued_weight) / self.burst
+
+    async def acquire(self, endpoint: str) -> None:
+        w, prio = self.cost(endpoint)
+        self._refill()
+        # вперёд можно, только если никто не ждёт с тем же или более высоким приоритетом
+        if self.tokens >= w and (not self._queue or self._queue[0][0] > prio):
+            self.tokens -= w
+            self.granted[prio] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (prio, next(self._seq), w, fut))
+        self._queued_weight += w
+        if self._drainer is None:
+            self._drainer = asyncio.create_task(self._drain())
+        elif self._wake is not None:
+            self._wake.set()
+        t0 = self.clock()
+        await fut
+        ms = (self.clock() - t0) * 1000.0
+        self.granted[prio] += 1
+        self.waited[prio] += 1
+        if ms > self.max_wait_ms[prio]:
+            self.max_wait_ms[prio] = ms
+
+    async def _drain(self) -> None:
+        self._wake = wake = asyncio.Event()
+        try:
+            while self._queue:
+                _, _, w, fut = self._queue[0]
+                if fut.done():  # ожидающего отменили
+                    heapq.heappop(self._queue)
+                    self._queued_weight -= w
+                    continue
+                self._refill()
+                if self.tokens >= w:
+                    heapq.heappop(self._queue)
+                    self._queued_weight -= w
+                    self.tokens -= w
+                    fut.set_result(None)
+                    continue
+                # ждём токены либо новый запрос (он может оказаться приоритетнее)
+                wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), (w - self.tokens) / self.rate)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._drainer = None
+            self._wake = None
+
+    async def wait_below(self, soft: float, max_wait: float = 5.0) -> float:
+        """Ждёт, пока usage() не опустится до soft; возвращает, сколько ждали (с)."""
+        return await wait_below([self], soft, max_wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "usage": round(self.usage(), 3),
+            "tokens": round(self.tokens, 2),
+            "queued": len(self._queue),
+            "granted": {"order": self.granted[ORDER], "account": self.granted[ACCOUNT],
+                        "market": self.granted[MARKET]},
+            "max_wait_ms": {"order": round(self.max_wait_ms[ORDER], 1),
+                            "account": round(self.max_wait_ms[ACCOUNT], 1),
+                            "market": round(self.max_wait_ms[MARKET], 1)},
+        }
+
+
+async def wait_below(limiters: Iterable[RateLimiter], soft: float, max_wait: float = 5.0) -> float:
+    """
+    Притормаживание поллинга: ждём, пока у всех бирж usage() <= soft,
+    но не дольше max_wait. Возвращает время ожидания в секундах.
+    """
+    limiters = list(limiters)
+    waited = 0.0
+    while waited < max_wait:
+        over = [(lim.usage() - soft) * lim.burst / lim.rate for lim in limiters]
+        delay = max(over, default=0.0)
+        if delay <= 0:
+            break
+        delay = min(delay, max_wait - waited)
+        await asyncio.sleep(delay)
+        waited += delay
+    return waited
+
+
+# один лимитер на биржу на процесс: все клиенты биржи делят один IP/аккаунт
+limiters: Dict[str, RateLimiter] = {}
+# доля бюджета биржи у этого процесса: при SHARDS=N IP и аккаунт делят N процессов
+_share = 1.0
+
+
+def _budget(venue: str) -> Tuple[float, float]:
+    cfg = VENUE_LIMITS.get(venue, {"rate": 10.0, "burst": 20.0})
+    return cfg["rate"] * _share, cfg["burst"] * _share
+
+
+def configure_share(share: float) -> None:
+    """Доля бюджета бирж у процесса (шард — 1/N); уже созданные лимитеры пересчитываются."""
+    global _share
+    _share = share
+    for venue, lim in limiters.items():
+        lim.rate, lim.burst = _budget(venue)
+        lim.tokens = min(lim.tokens, lim.burst)
+
+
+def limiter_for(venue: str) -> RateLimiter:
+    lim = limiters.get(venue)
+    if lim is None:
+        rate, burst = _budget(venue)
+        lim = limiters[venue] = RateLimiter(venue, rate, burst,
+                                            VENUE_LIMITS.get(venue, {}).get("weights"))
+    return lim
@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import hmac
+import itertools
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import orjson
+from aiohttp import web
+
+
+class RestStandIn:
+    """
+    Локальная замена приватного REST биржи (bybit | gate | bithumb) для офлайн-
+    тестов и бенчмарков ордеров: принимает создание/отмену ордера в формате
+    биржи, проверяет подпись ключом secret и сразу отвечает. Bybit-ответы
+    подходят и для ccxt (тот же /v5/order/create). Неверная подпись — 401.
+    """
+
+    def __init__(self, venue: str, api_key: str = "key", secret: str = "secret",
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        if venue not in ("bybit", "gate", "bithumb"):
+            raise ValueError(f"unknown venue {venue}")
+        self.venue = venue
+        self.api_key = api_key
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.orders: List[Dict[str, Any]] = []
+        self.cancels: List[str] = []
+        self.rejected = 0
+        self.heartbeats = 0
+        self._ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        app = web.Application()
+        r = app.router
+        r.add_post("/v5/order/create", self._bybit_create)
+        r.add_post("/v5/order/cancel", self._bybit_cancel)
+        r.add_post("/api/v4/spot/orders", self._gate_create)
+        r.add_delete("/api/v4/spot/orders/{id}", self._gate_cancel)
+        r.add_post("/v1/orders", self._bithumb_create)
+        r.add_delete("/v1/order", self._bithumb_cancel)
+        for path in ("/v5/market/time", "/api/v4/spot/time", "/v1/ticker"):
+            r.add_get(path, self._heartbeat)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _heartbeat(self, request: web.Request) -> web.Response:
+        self.heartbeats += 1
+        return web.json_response({"server_time": 0})
+
+    def _deny(self) -> web.Response:
+        self.rejected += 1
+        return web.json_response({"error": "bad signature"}, status=401)
+
+    # --- bybit v5 ---
+    def _bybit_ok(self, request: web.Request, body: bytes) -> bool:
+        h = request.headers
+        pre = (h.get("X-BAPI-TIMESTAMP", "") + h.get("X-BAPI-API-KEY", "")
+               + h.get("X-BAPI-RECV-WINDOW", "")).encode() + body
+        want = hmac.new(self.secret.encode(), pre, hashlib.sha256).hexdigest()
+        return h.get("X-BAPI-API-KEY") == self.api_key and hmac.compare_digest(want, h.get("X-BAPI-SIGN", ""))
+
+    async def _bybit_create(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self._bybit_ok(request, body):
+            return self._deny()
+        self.orders.append(orjson.loads(body))
+        oid = str(next(self._ids))
+        return web.json_response({"retCode": 0, "retMsg": "OK",
+                                  "result": {"orderId": oid, "orderLinkId": ""},
+                                  "retExtInfo": {}, "time": 0})
+
+    async def _bybit_cancel(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self._bybit_ok(request, body):
+            return self._deny()
+        oid = orjson.loads(body)["orderId"]
+        self.cancels.append(oid)
+        return web.json_response({"retCode": 0, "retMsg": "OK",
+                                  "result": {"orderId": oid, "orderLinkId": ""}})
+
+    # --- gate v4 ---
+    def _gate_ok(self, request: web.Request, body: bytes) -> bool:
+        h = request.headers
+        pre = "\n".join((request.method, request.path, request.query_string,
+                         hashlib.sha512(body).hexdigest(), h.get("Timestamp", "")))
+        want = hmac.new(self.secret.encode(), pre.encode(), hashlib.sha512).hexdigest()
+        return h.get("KEY") == self.api_key and hmac.compare_digest(want, h.get("SIGN", ""))
+
+    async def _gate_create(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self._gate_ok(request, body):
+            return self._deny()
+        order = orjson.loads(body)
+        self.orders.append(order)
+        return web.json_response({"id": str(next(self._ids)), "status": "closed", **order},
+                                 status=201)
+
+    async def _gate_cancel(self, request: web.Request) -> web.Response:
+        if not self._gate_ok(request, b""):
+            return self._deny()
+        oid = request.match_info["id"]
+        self.cancels.append(oid)
+        return web.json_response({"id": oid, "status": "cancelled"})
+
+    # --- bithumb 2.0 (JWT) ---
+    def _bithumb_ok(self, request: web.Request, query: str) -> bool:
+        auth = request.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return False
+        try:
+            head, body, sig = auth[7:].split(".")
+            want = hmac.new(self.secret.encode(), f"{head}.{body}".encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(base64.urlsafe_b64encode(want).rstrip(b"=").decode(), sig):
+                return False
+            claims = orjson.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        except ValueError:
+            return False
+        if claims.get("access_key") != self.api_key:
+            return False
+        return claims.get("query_hash") == hashlib.sha512(query.encode()).hexdigest()
+
+    async def _bithumb_create(self, request: web.Request) -> web.Response:
+        params = orjson.loads(await request.read())
+        if not self._bithumb_ok(request, urlencode(params)):
+            return self._deny()
+        self.orders.append(params)
+        return web.json_response({"uuid": f"C{next(self._ids):010d}", "state": "wait", **params},
+                                 status=201)
+
+    async def _bithumb_cancel(self, request: web.Request) -> web.Response:
+        if not self._bithumb_ok(request, request.query_string):
+            return self._deny()
+        oid = request.query.get("uuid", "")
+        self.cancels.append(oid)
+        return web.json_response({"uuid": oid, "state": "cancel"})
@@ -0,0 +1,67 @@
+from typing import Any, Dict, Optional
+
+
+def alias_key(symbol: str) -> str:
+    """'btc-usdt', 'BTC_USDT', 'BTCUSDT', 'BTC/USDT' -> 'BTCUSDT'."""
+    return symbol.upper().replace("-", "").replace("_", "").replace(":", "").replace("/", "")
+
+
+class TradingRules:
+    """Торговые правила одного символа, посчитанные один раз при загрузке маркетов."""
+    __slots__ = ("symbol", "lot", "tick", "min_cost", "min_amount", "market_id")
+
+    def __init__(self, symbol: str, lot: float, tick: float,
+                 min_cost: float, min_amount: float, market_id: str = "") -> None:
+        self.symbol = symbol
+        self.lot = lot              # шаг количества (как раньше lot_size)
+        self.tick = tick            # шаг цены
+        self.min_cost = min_cost    # минимальный notional в котируемой
+        self.min_amount = min_amount
+        self.market_id = market_id  # id биржи ('BTCUSDT', 'BTC_USDT') для прямого REST
+
+    @classmethod
+    def from_market(cls, symbol: str, m: Dict[str, Any]) -> "TradingRules":
+        limits = m.get("limits") or {}
+        precision = m.get("precision") or {}
+        amount_min = (limits.get("amount") or {}).get("min")
+        step = amount_min or precision.get("amount")
+        p = precision.get("price")
+        tick = 10 ** (-p) if isinstance(p, int) else float(p or 0.01)
+        cost = (limits.get("cost") or {}).get("min")
+        return cls(symbol, float(step or 0.000001), tick, float(cost or 0.0),
+                   float(amount_min or 0.0), m.get("id") or "")
+
+
+class RulesIndex:
+    """
+    Индекс правил по маркетам ccxt: символ -> TradingRules и карта алиасов
+    (BTCUSDT, BTC-USDT, BTC_USDT -> 'BTC/USDT') за O(1) вместо прохода по всем
+    маркетам. markets — dict, из которого собран индекс: клиент пересобирает
+    индекс, когда маркеты подменили целиком.
+    """
+    __slots__ = ("markets", "rules", "aliases", "by_base")
+
+    def __init__(self, markets: Optional[Dict[str, Any]]) -> None:
+        self.markets = markets
+        self.rules: Dict[str, TradingRules] = {}
+        self.aliases: Dict[str, str] = {}
+        self.by_base: Dict[str, str] = {}  # BASE -> первый символ с этой базой
+        for sym, m in (markets or {}).items():
+            self.rules[sym] = TradingRules.from_market(sym, m)
+            # первый маркет с ключом выигрывает — как у прежнего линейного поиска
+            self.aliases.setdefault(sym.replace("/", "").upper(), sym)
+            base = (m.get("base") or "").upper()
+            if base:
+                self.by_base.setdefault(base, sym)
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        if symbol in self.rules:
+            return symbol
+        return self.aliases.get(alias_key(symbol))
+
+    def get(self, symbol: str) -> Optional[TradingRules]:
+        r = self.rules.get(symbol)
+        if r is None:
+            sym = self.aliases.get(alias_key(symbol))
+            r = self.rules.get(sym) if sym is not None else None
+        return r
@@ -0,0 +1,244 @@
+import asyncio
+import itertools
+import random
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import ccxt.async_support as ccxt
+import orjson
+
+from .base import BaseExchange
+from .rules import TradingRules
+
+
+class SimExchange(BaseExchange):
+    """
+    Биржа в памяти процесса для офлайн-нагрузки trade_once / market_hedge / run_hft.
+    Стакан — синтетический (случайное блуждание mid с фиксированным спредом и
+    лестницей уровней) или проигрываемый из снапшотов; рыночный ордер
+    исполняется по текущему стакану и съедает уровни до следующего обновления.
+    Задержка каждого вызова — latency_ms ± jitter_ms; partial_rate — доля
+    ордеров, исполненных частично (остаток отменён, как у IOC); error_rate —
+    доля вызовов, падающих ccxt.NetworkError. Балансы списываются по сделкам,
+    нехватка — ccxt.InsufficientFunds.
+    """
+
+    def __init__(self, name: str = "sim", symbols: Iterable[str] = (), quote_ccy: str = "USDT",
+                 mid: float = 100.0, spread_bps: float = 5.0, vol_bps: float = 2.0,
+                 depth: int = 20, level_qty: float = 1.0, tick: float = 0.01, lot: float = 0.0001,
+                 min_cost: float = 1.0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 partial_rate: float = 0.0, error_rate: float = 0.0, fee_bps: float = 10.0,
+                 balances: Optional[Dict[str, float]] = None,
+                 replay: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 seed: Optional[int] = None) -> None:
+        self.name = name
+        self.quote_ccy = quote_ccy
+        self.taker_fee_bps = fee_bps
+        self.mid0 = mid
+        self.spread_bps = spread_bps
+        self.vol_bps = vol_bps
+        self.depth = depth
+        self.level_qty = level_qty
+        self.tick = tick
+        self.lot = lot
+        self.min_cost = min_cost
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.partial_rate = partial_rate
+        self.error_rate = error_rate
+        # разные биржи с одним конфигом расходятся по-разному, но воспроизводимо
+        self.rng = random.Random(zlib.crc32(name.encode()) if seed is None else seed)
+        self.balances: Dict[str, float] = dict(balances or {})
+        self.replay = replay or {}
+        self._replay_pos: Dict[str, int] = {}
+        self._mid: Dict[str, float] = {}
+        self._books: Dict[str, Dict[str, Any]] = {}
+        self._markets: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self.orders: List[Dict[str, Any]] = []
+        self.calls = 0
+        self.errors = 0
+        for s in symbols:
+            self.add_market(s)
+
+    def add_market(self, symbol: str) -> str:
+        sym = self.venue_symbol(symbol.upper())
+        if sym not in self._markets:
+            base, quote = sym.split("/")
+            # структура как у ccxt: RulesIndex/rules_index() работают без изменений
+            self._markets[sym] = {
+                "id": f"{base}{quote}", "symbol": sym, "base": base, "quote": quote,
+                "precision": {"amount": self.lot, "price": self.tick},
+                "limits": {"amount": {"min": self.lot}, "cost": {"min": self.min_cost}},
+            }
+            self._markets = dict(self._markets)  # новый dict — индекс правил пересоберётся
+        return sym
+
+    # --- задержка и сбои ---
+    async def _io(self) -> None:
+        self.calls += 1
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0.0) / 1000.0)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise ccxt.NetworkError(f"{self.name}: injected error")
+
+    # --- стакан ---
+    def _next_book(self, sym: str) -> Dict[str, Any]:
+        frames = self.replay.get(sym)
+        if frames:
+            i = self._replay_pos.get(sym, 0)
+            self._replay_pos[sym] = i + 1
+            f = frames[i % len(frames)]
+            return {"symbol": sym, "bids": [list(lvl) for lvl in f["bids"]],
+                    "asks": [list(lvl) for lvl in f["asks"]], "timestamp": int(time.time() * 1000)}
+        mid = self._mid.get(sym, self.mid0)
+        mid *= 1.0 + self.rng.gauss(0.0, self.vol_bps / 1e4)
+        self._mid[sym] = mid
+        half = mid * self.spread_bps / 2e4
+        step = max(self.tick, mid * 1e-4)
+        bids = [[self.normalize_price(sym, mid - half - i * step), self.level_qty]
+                for i in range(self.depth)]
+        asks = [[self.normalize_price(sym, mid + half + i * step) + self.tick, self.level_qty]
+                for i in range(self.depth)]
+        return {"symbol": sym, "bids": bids, "asks": asks, "timestamp": int(time.time() * 1000)}
+
+    def book(self, symbol: str) -> Dict[str, Any]:
+        """Текущий стакан без задержки и без сдвига цены (то, по чему идёт матчинг)."""
+        sym = self.normalize_symbol(symbol)
+        ob = self._books.get(sym)
+        if ob is None:
+            ob = self._books[sym] = self._next_book(sym)
+        return ob
+
+    def _match(self, sym: str, side: str, amount: float) -> Dict[str, Any]:
+        levels = self.book(sym)["asks" if side == "buy" else "bids"]
+        want = amount
+        if self.partial_rate and self.rng.random() < self.partial_rate:
+            want = self.normalize_amount(sym, amount * self.rng.uniform(0.1, 0.9))
+        filled = cost = 0.0
+        while levels and filled < want:
+            px, qty = levels[0][0], levels[0][1]
+            take = min(qty, want - filled)
+            filled += take
+            cost += take * px
+            if take >= qty:
+                levels.pop(0)
+            else:
+                levels[0][1] = qty - take
+        return {"filled": filled, "cost": cost}
+
+    def _settle(self, sym: str, side: str, filled: float, cost: float, fee: float) -> None:
+        if not self.balances:
+            return  # без балансов — бесконечный счёт
+        base, quote = sym.split("/")
+        if side == "buy":
+            self.balances[quote] = self.balances.get(quote, 0.0) - cost - fee
+            self.balances[base] = self.balances.get(base, 0.0) + filled
+        else:
+            self.balances[base] = self.balances.get(base, 0.0) - filled
+            self.balances[quote] = self.balances.get(quote, 0.0) + cost - fee
+
+    def _check_funds(self, sym: str, side: str, amount: float) -> None:
+        if not self.balances:
+            return
+        base, quote = sym.split("/")
+        if side == "buy":
+            asks = self.book(sym)["asks"]
+            px = asks[0][0] if asks else 0.0
+            need, have, ccy = amount * px, self.balances.get(quote, 0.0), quote
+        else:
+            need, have, ccy = amount, self.balances.get(base, 0.0), base
+        if need > have:
+            raise ccxt.InsufficientFunds(f"{self.name}: need {need} {ccy}, have {have}")
+
+    # --- BaseExchange ---
+    def normalize_symbol(self, common: str) -> str:
+        sym = self.rules_index().resolve(common)
+        return sym if sym is not None else self.add_market(common)
+
+    def _r(self, symbol: str) -> TradingRules:
+        r = self.rules_index().get(self.normalize_symbol(symbol))
+        if r is None:
+            raise RuntimeError(f"{self.name}: no market for {symbol}")
+        return r
+
+    def lot_size(self, symbol: str) -> float:
+        return self._r(symbol).lot
+
+    def price_step(self, symbol: str) -> float:
+        return self._r(symbol).tick
+
+    def min_notional(self, symbol: str) -> float:
+        return self._r(symbol).min_cost
+
+    async def get_ticker(self, symbol: str) -> Dict[str, Any]:
+        await self._io()
+        ob = self.book(symbol)
+        bid, ask = ob["bids"][0][0], ob["asks"][0][0]
+        return {"symbol": ob["symbol"], "bid": bid, "ask": ask, "last": (bid + ask) / 2.0}
+
+    async def get_orderbook(self, symbol: str) -> Dict[str, Any]:
+        await self._io()
+        sym = self.normalize_symbol(symbol)
+        ob = self._books[sym] = self._next_book(sym)
+        self.remember_ask(sym, ob)
+        return {"symbol": sym, "bids": [list(lvl) for lvl in ob["bids"]],
+                "asks": [list(lvl) for lvl in ob["asks"]], "timestamp": ob["timestamp"]}
+
+    async def get_balance(self) -> Dict[str, float]:
+        await self._io()
+        return dict(self.balances)
+
+    async def create_market_order(self, symbol: str, side: str, amount: float) -> Dict[str, Any]:
+        sym = self.normalize_symbol(symbol)
+        amt = self.normalize_amount(sym, amount)
+        await self._io()
+        if amt <= 0:
+            raise ccxt.InvalidOrder(f"{self.name}: amount {amount} below lot {self.lot_size(sym)}")
+        self._check_funds(sym, side, amt)
+        m = self._match(sym, side, amt)
+        filled, cost = m["filled"], m["cost"]
+        fee = cost * self.taker_fee_bps / 1e4
+        self._settle(sym, side, filled, cost, fee)
+        order = {
+            "id": str(next(self._ids)), "symbol": sym, "type": "market", "side": side,
+            "amount": amt, "filled": filled, "remaining": amt - filled,
+            "average": cost / filled if filled else None, "cost": cost,
+            # рыночный ордер не висит: остаток отменяется, как IOC
+            "status": "closed" if filled >= amt else "canceled",
+            "fee": {"cost": fee, "currency": sym.split("/")[1]},
+            "timestamp": int(time.time() * 1000),
+        }
+        self.orders.append(order)
+        return order
+
+    async def cancel_order(self, order_id: str, symbol: str) -> None:
+        await self._io()
+        raise ccxt.OrderNotFound(f"{self.name}: market order {order_id} already done")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "errors": self.errors, "orders": len(self.orders)}
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self) -> "SimExchange":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+
+def load_replay(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """JSONL со снапшотами {"symbol", "bids", "asks"} -> кадры по символам для replay."""
+    frames: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                ob = orjson.loads(line)
+                frames.setdefault(ob["symbol"], []).append(ob)
+    return frames
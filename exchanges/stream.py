@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+from aiohttp import ClientSession, WSMsgType
+
+from .book import BookDesync, L2Book
+
+log = logging.getLogger("stream")
+
+
+class BookStream(ABC):
+    """
+    Публичный WS-стрим стаканов одной биржи: подписка на depth-каналы,
+    локальная копия стакана по каждому символу, реконнект с бэкоффом и
+    переподпиской. Конкретный формат сообщений — в наследниках.
+    listeners вызываются синхронно после каждого применённого снапшота/дельты
+    с (symbol, rx_ns) — perf_counter_ns момента получения сообщения.
+    """
+    venue = ""
+    url = ""
+
+    def __init__(self, url: Optional[str] = None, depth: int = 25,
+                 ping_interval: float = 20.0, reconnect_min: float = 0.5,
+                 reconnect_max: float = 30.0) -> None:
+        self.url = url or self.url
+        self.depth = depth
+        self.ping_interval = ping_interval
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.books: Dict[str, L2Book] = {}
+        self.reconnects = 0
+        self.resyncs = 0
+        self.listeners: List[Callable[[str, int], None]] = []
+        self.rx_ns = 0
+        self._symbols: Dict[str, str] = {}  # ws-символ -> общий 'BTC/USDT'
+        self._ws: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()  # отправки подписок: держим ссылку, пока не ушли
+
+    # --- формат биржи ---
+    @staticmethod
+    @abstractmethod
+    def ws_symbol(symbol: str) -> str: ...
+    @abstractmethod
+    def subscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]: ...
+    @abstractmethod
+    def unsubscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]: ...
+
+    def ping_message(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    @abstractmethod
+    def on_message(self, msg: Dict[str, Any]) -> None: ...
+
+    # --- публичное API ---
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    def symbols(self) -> List[str]:
+        return list(self._symbols.values())
+
+    def subscribe(self, symbols: Iterable[str]) -> None:
+        new = []
+        for sym in symbols:
+            ws_sym = self.ws_symbol(sym)
+            if ws_sym not in self._symbols:
+                self._symbols[ws_sym] = sym
+                self.books[sym] = L2Book(sym, depth=self.depth)
+                new.append(ws_sym)
+        if new and self.connected:
+            self._spawn_send(self.subscribe_messages(new))
+
+    def get(self, symbol: str, max_age: Optional[float] = None) -> Optional[L2Book]:
+        """
+        Живой стакан из памяти (L2Book, читается как ccxt-словарь) или None,
+        если он ещё/уже не синхронизирован.
+        """
+        book = self.books.get(symbol)
+        if book is None or not book.synced or not self.connected:
+            return None
+        if max_age is not None and time.monotonic() - book.received > max_age:
+            return None
+        return book
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- внутреннее ---
+    def _snapshot(self, symbol: str, bids, asks, seq: int, ts: Optional[int]) -> None:
+        self.books[symbol].snapshot(bids, asks, seq, ts)
+        self._notify(symbol)
+
+    def _delta(self, symbol: str, bids, asks, seq: int, ts: Optional[int],
+               prev_seq: Optional[int] = None, checksum: Optional[int] = None) -> None:
+        book = self.books[symbol]
+        if not book.synced:
+            return  # ждём снапшот
+        book.apply(bids, asks, seq, ts, prev_seq=prev_seq)
+        # чексумма — только у лент, которые её шлют (OKX-подобные); Bybit/Gate — по id
+        if checksum is not None:
+            book.verify(checksum)
+        self._notify(symbol)
+
+    def _notify(self, symbol: str) -> None:
+        for cb in self.listeners:
+            try:
+                cb(symbol, self.rx_ns)
+            except Exception as e:
+                log.warning(f"{self.venue} listener error {e}")
+
+    def _resync(self, ws_sym: str) -> None:
+        sym = self._symbols.get(ws_sym)
+        if sym is None:
+            return
+        self.books[sym].invalidate()
+        self.resyncs += 1
+        log.warning(f"{self.venue} book desync {sym}, resubscribing")
+        if self.connected:
+            msgs = self.unsubscribe_messages([ws_sym]) + self.subscribe_messages([ws_sym])
+            self._spawn_send(msgs)
+
+    def _spawn_send(self, msgs: List[Dict[str, Any]]) -> None:
+        t = asyncio.create_task(self._send_all(msgs))
+        self._sends.add(t)
+        t.add_done_callback(self._sends.discard)
+
+    async def _send_all(self, msgs: List[Dict[str, Any]]) -> None:
+        ws = self._ws
+        if ws is None:
+            return
+        for m in msgs:
+            await ws.send_str(orjson.dumps(m).decode())
+
+    async def _pinger(self) -> None:
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            msg = self.ping_message()
+            if msg is not None:
+                await self._send_all([msg])
+
+    async def run(self) -> None:
+        delay = self.reconnect_min
+        async with ClientSession() as session:
+            while True:
+                pinger = None
+                try:
+                    async with session.ws_connect(self.url, autoping=True) as ws:
+                        self._ws = ws
+                        delay = self.reconnect_min
+                        await self._send_all(self.subscribe_messages(list(self._symbols)))
+                        pinger = asyncio.create_task(self._pinger())
+                        async for msg in ws:
+                            if msg.type == WSMsgType.TEXT:
+                                self.rx_ns = time.perf_counter_ns()
+                                data = orjson.loads(msg.data)
+                                try:
+                                    self.on_message(data)
+                                except BookDesync as e:
+                                    self._resync(self.ws_symbol(str(e)))
+                            elif msg.type in (WSMsgType.CLOSED, WSMsgType.ERROR):
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning(f"{self.venue} ws error {e}")
+                finally:
+                    if pinger:
+                        pinger.cancel()
+                    self._ws = None
+                    for book in self.books.values():
+                        book.invalidate()
+                self.reconnects += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+
+
+class BybitBookStream(BookStream):
+    venue = "bybit"
+    url = "wss://stream.bybit.com/v5/public/spot"
+    level = 50
+
+    @staticmethod
+    def ws_symbol(symbol: str) -> str:
+        return symbol.split(":")[0].replace("/", "").upper()
+
+    def _topic(self, ws_sym: str) -> str:
+        return f"orderbook.{self.level}.{ws_sym}"
+
+    def _ops(self, op: str, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        # Bybit spot: не больше 10 топиков в одном запросе
+        topics = [self._topic(s) for s in ws_symbols]
+        return [{"op": op, "args": topics[i:i + 10]} for i in range(0, len(topics), 10)]
+
+    def subscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        return self._ops("subscribe", ws_symbols)
+
+    def unsubscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        return self._ops("unsubscribe", ws_symbols)
+
+    def ping_message(self) -> Optional[Dict[str, Any]]:
+        return {"op": "ping"}
+
+    def on_message(self, msg: Dict[str, Any]) -> None:
+        topic = msg.get("topic") or ""
+        if not topic.startswith("orderbook."):
+            if msg.get("success") is False:
+                log.warning(f"bybit ws: {msg}")
+            return
+        data = msg["data"]
+        ws_sym = data["s"]
+        sym = self._symbols.get(ws_sym)
+        if sym is None:
+            return
+        seq = int(data.get("u") or 0)
+        # u=1 — снапшот после рестарта сервиса биржи
+        if msg.get("type") == "snapshot" or seq == 1:
+            self._snapshot(sym, data.get("b", []), data.get("a", []), seq, msg.get("ts"))
+            return
+        book = self.books[sym]
+        if book.synced and seq <= book.seq:
+            book.invalidate()
+            raise BookDesync(sym)
+        self._delta(sym, data.get("b", []), data.get("a", []), seq, msg.get("ts"))
+
+
+class GateBookStream(BookStream):
+    venue = "gate"
+    url = "wss://api.gateio.ws/ws/v4/"
+    level = 50
+
+    @staticmethod
+    def ws_symbol(symbol: str) -> str:
+        return symbol.split(":")[0].replace("/", "_").upper()
+
+    def _stream(self, ws_sym: str) -> str:
+        return f"ob.{ws_sym}.{self.level}"
+
+    def _event(self, event: str, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        return [{
+            "time": int(time.time()),
+            "channel": "spot.obu",
+            "event": event,
+            "payload": [self._stream(s) for s in ws_symbols],
+        }]
+
+    def subscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        return self._event("subscribe", ws_symbols)
+
+    def unsubscribe_messages(self, ws_symbols: List[str]) -> List[Dict[str, Any]]:
+        return self._event("unsubscribe", ws_symbols)
+
+    def ping_message(self) -> Optional[Dict[str, Any]]:
+        return {"time": int(time.time()), "channel": "spot.ping"}
+
+    def on_message(self, msg: Dict[str, Any]) -> None:
+        if msg.get("channel") != "spot.obu" or msg.get("event") != "update":
+            if msg.get("error"):
+                log.warning(f"gate ws: {msg}")
+            return
+        r = msg["result"]
+        ws_sym = r["s"].split(".")[1]
+        sym = self._symbols.get(ws_sym)
+        if sym is None:
+            return
+        seq = int(r["u"])
+        if r.get("full"):
+            self._snapshot(sym, r.get("b", []), r.get("a", []), seq, r.get("t"))
+            return
+        # Gate: первый id апдейта должен продолжать последний применённый
+        self._delta(sym, r.get("b", []), r.get("a", []), seq, r.get("t"),
+                    prev_seq=int(r["U"]) - 1)
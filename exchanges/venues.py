@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from .base import BaseExchange
+from .bithumb import BithumbClient
+from .bybit import BybitClient
+from .gate import GateClient
+from .sim import SimExchange, load_replay
+
+log = logging.getLogger("venues")
+
+# имя в VENUES -> класс клиента
+CLIENTS: Dict[str, Type[BaseExchange]] = {
+    "bybit": BybitClient,
+    "gate": GateClient,
+    "bithumb": BithumbClient,
+    "sim": SimExchange,  # sim, sim_a, sim_b... — независимые симулированные биржи
+}
+
+
+def make_client(name: str, s: Any) -> BaseExchange:
+    """Клиент биржи по имени с ключами/режимами из Settings."""
+    name = name.lower()
+    cls = CLIENTS.get("sim" if name.startswith("sim") else name)
+    if cls is None:
+        raise ValueError(f"unknown venue {name}")
+    if cls is SimExchange:
+        return make_sim(name, s)
+    key = getattr(s, f"{name}_api_key", "") or ""
+    secret = getattr(s, f"{name}_api_secret", "") or ""
+    fast = getattr(s, "fast_orders", True)
+    if name in ("bybit", "gate"):
+        return cls(key, secret, stream=getattr(s, "ws_books", False),
+                   ws_url=getattr(s, f"{name}_ws_url", "") or None, fast=fast)
+    return cls(key, secret, fast=fast)
+
+
+def make_sim(name: str, s: Any) -> SimExchange:
+    """Симулятор с параметрами SIM_* из Settings; стакан — синтетика или SIM_REPLAY."""
+    replay = getattr(s, "sim_replay", "") or ""
+    return SimExchange(
+        name=name,
+        symbols=list(getattr(s, "symbols", [])),
+        mid=getattr(s, "sim_mid", 100.0),
+        spread_bps=getattr(s, "sim_spread_bps", 5.0),
+        vol_bps=getattr(s, "sim_vol_bps", 2.0),
+        latency_ms=getattr(s, "sim_latency_ms", 0.0),
+        jitter_ms=getattr(s, "sim_jitter_ms", 0.0),
+        partial_rate=getattr(s, "sim_partial_rate", 0.0),
+        error_rate=getattr(s, "sim_error_rate", 0.0),
+        replay=load_replay(replay) if replay else None,
+    )
+
+
+class ClientRegistry:
+    """
+    Долгоживущие клиенты бирж для веб-приложения: каждый открывается один раз
+    (load_markets + HTTP-сессия) и дальше общий для всех обработчиков.
+    Параллельные get() одного клиента ждут одно открытие; неудачное открытие
+    не запоминается — следующий get() пробует снова.
+    """
+
+    def __init__(self, settings: Any,
+                 factory: Callable[[str, Any], BaseExchange] = make_client) -> None:
+        self.settings = settings
+        self.factory = factory
+        self._clients: Dict[str, BaseExchange] = {}
+        self._opening: Dict[str, asyncio.Future] = {}
+
+    def peek(self, name: str) -> Optional[BaseExchange]:
+        return self._clients.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._clients)
+
+    async def get(self, name: str) -> BaseExchange:
+        ex = self._clients.get(name)
+        if ex is not None:
+            return ex
+        fut = self._opening.get(name)
+        if fut is None:
+            fut = asyncio.ensure_future(self._open(name))
+            self._opening[name] = fut
+            fut.add_done_callback(lambda _: self._opening.pop(name, None))
+        return await asyncio.shield(fut)
+
+    async def _open(self, name: str) -> BaseExchange:
+        ex = self.factory(name, self.settings)
+        try:
+            await ex.__aenter__()
+        except BaseException:
+            await ex.close()
+            raise
+        self._clients[name] = ex
+        return ex
+
+    async def start(self, names: Iterable[str]) -> None:
+        """Прогрев: открывает клиентов заранее, ошибки только логируются."""
+        names = list(names)
+        res = await asyncio.gather(*(self.get(n) for n in names), return_exceptions=True)
+        for n, r in zip(names, res):
+            if isinstance(r, BaseException):
+                log.warning(f"client {n} warm-up failed: {r}")
+
+    async def close(self) -> None:
+        for fut in list(self._opening.values()):
+            fut.cancel()
+        clients, self._clients = list(self._clients.values()), {}
+        for ex in clients:
+            try:
+                await ex.close()
+            except Exception as e:
+                log.warning(f"client {ex.name} close error {e}")
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import orjson
+from aiohttp import WSMsgType, web
+
+from .stream import BybitBookStream, GateBookStream
+
+
+class StandInServer:
+    """
+    Локальная замена публичного WS биржи (bybit | gate) для офлайн-тестов:
+    принимает подписки на стаканы, отвечает на пинги и по команде рассылает
+    снапшоты/дельты в формате биржи. drop() рвёт все соединения.
+    """
+
+    def __init__(self, venue: str, host: str = "127.0.0.1", port: int = 0) -> None:
+        if venue not in ("bybit", "gate"):
+            raise ValueError(f"unknown venue {venue}")
+        self.venue = venue
+        self.host = host
+        self.port = port
+        self.subscribed: Set[str] = set()  # ws-символы
+        self.subscribe_count = 0
+        self._clients: Set[web.WebSocketResponse] = set()
+        self._seq: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def ws_symbol(self, symbol: str) -> str:
+        if self.venue == "bybit":
+            return BybitBookStream.ws_symbol(symbol)
+        return GateBookStream.ws_symbol(symbol)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/ws", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.url
+
+    async def stop(self) -> None:
+        await self.drop()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def drop(self) -> None:
+        for ws in list(self._clients):
+            await ws.close()
+        self._clients.clear()
+        self.subscribed.clear()
+
+    async def wait_subscribed(self, symbol: str, count: int = 1, timeout: float = 5.0) -> None:
+        ws_sym = self.ws_symbol(symbol)
+        deadline = time.monotonic() + timeout
+        while ws_sym not in self.subscribed or self.subscribe_count < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no subscription for {symbol}")
+            await asyncio.sleep(0.01)
+
+    # --- рассылка ---
+    async def snapshot(self, symbol: str, bids: List[List[float]], asks: List[List[float]]) -> None:
+        ws_sym = self.ws_symbol(symbol)
+        self._seq[ws_sym] = self._seq.get(ws_sym, 1000) + 1
+        await self._broadcast(self._encode(ws_sym, bids, asks, True, self._seq[ws_sym]))
+
+    async def delta(self, symbol: str, bids: List[List[float]], asks: List[List[float]],
+                    gap: bool = False) -> None:
+        """gap=True пропускает один id апдейта — клиент должен заметить рассинхрон."""
+        ws_sym = self.ws_symbol(symbol)
+        seq = self._seq.get(ws_sym, 1000)
+        if not gap:
+            seq += 1
+        elif self.venue == "gate":
+            seq += 2
+        # у Bybit id дельт только монотонны, поэтому "дырку" там изображаем повтором id
+        self._seq[ws_sym] = seq
+        await self._broadcast(self._encode(ws_sym, bids, asks, False, seq))
+
+    def _encode(self, ws_sym: str, bids, asks, full: bool, seq: int) -> Dict[str, Any]:
+        b = [[str(p), str(q)] for p, q in bids]
+        a = [[str(p), str(q)] for p, q in asks]
+        ts = int(time.time() * 1000)
+        if self.venue == "bybit":
+            return {
+                "topic": f"orderbook.{BybitBookStream.level}.{ws_sym}",
+                "type": "snapshot" if full else "delta",
+                "ts": ts,
+                "data": {"s": ws_sym, "b": b, "a": a, "u": seq, "seq": seq},
+            }
+        res: Dict[str, Any] = {"t": ts, "s": f"ob.{ws_sym}.{GateBookStream.level}", "u": seq,
+                               "b": b, "a": a}
+        if full:
+            res["full"] = True
+        else:
+            res["U"] = seq
+        return {"time": ts // 1000, "channel": "spot.obu", "event": "update", "result": res}
+
+    async def _broadcast(self, payload: Dict[str, Any]) -> None:
+        data = orjson.dumps(payload).decode()
+        for ws in list(self._clients):
+            if not ws.closed:
+                await ws.send_str(data)
+
+    # --- приём ---
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._clients.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                await self._on_client(ws, orjson.loads(msg.data))
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    async def _on_client(self, ws: web.WebSocketResponse, msg: Dict[str, Any]) -> None:
+        if self.venue == "bybit":
+            op = msg.get("op")
+            if op == "ping":
+                await ws.send_str(orjson.dumps({"op": "pong", "success": True}).decode())
+                return
+            names = [a.rsplit(".", 1)[-1] for a in msg.get("args", [])]
+            ack = {"op": op, "success": True}
+        else:
+            if msg.get("channel") == "spot.ping":
+                await ws.send_str(orjson.dumps({"channel": "spot.pong"}).decode())
+                return
+            op = msg.get("event")
+            names = [p.split(".")[1] for p in msg.get("payload", [])]
+            ack = {"channel": "spot.obu", "event": op, "result": {"status": "success"}}
+        if op == "subscribe":
+            self.subscribed.update(names)
+            self.subscribe_count += 1
+        elif op == "unsubscribe":
+            self.subscribed.difference_update(names)
+        await ws.send_str(orjson.dumps(ack).decode())
@@ -3,14 +3,18 @@ from datetime import datetime
 from typing import List
 from aiohttp import ClientSession # type: ignore
 
-from exchanges.bithumb import BithumbClient
+from exchanges.base import BaseExchange
+from exchanges.venues import make_client
 from engine.executor import Executor
+from engine.hedges import FILLED, hedges
+from engine.quotes import quotes
 from storage.journal_csv import append_trade
+from utils.trace import tracer
 from .news import fetch_and_parse
 from .strategy import decide_on_news
 
 
-def choose_symbol_on_bithumb(bh: BithumbClient, base: str, preferred_quote: str) -> str:
+def choose_symbol_on_bithumb(bh: BaseExchange, base: str, preferred_quote: str) -> str:
     """
     Возвращает реальный торговый символ на Bithumb:
     1) пытаемся {BASE}/{preferred_quote}
@@ -24,13 +28,18 @@ def choose_symbol_on_bithumb(bh: BithumbClient, base: str, preferred_quote: str)
     if want in bh._markets:
         return want
 
-    for s, m in bh._markets.items():
-        if (m.get("base") or "").upper() == base:
-            return s
+    sym = bh.rules_index().by_base.get(base)
+    if sym is not None:
+        return sym
 
     raise RuntimeError(f"{bh.name} has no market for base {base}")
 
 
+def _count_filled(metrics_state, h) -> None:
+    if h is not None and h.state == FILLED:
+        metrics_state.success_trades += 1
+
+
 async def run_hft(settings, metrics_state) -> None:
     """
     Фоновая задача: опрашивает NEWS_SOURCE_URL, на позитивной новости
@@ -43,36 +52,55 @@ async def run_hft(settings, metrics_state) -> None:
     quote = getattr(settings, "hft_quote", "KRW").upper()
     whitelist: List[str] = [t.upper() for t in getattr(settings, "hft_tickers_whitelist", [])]
 
-    async with BithumbClient(settings.bithumb_api_key, settings.bithumb_api_secret) as bh, \
-               ClientSession() as http:
+    # HFT_VENUE=sim — тот же цикл на симуляторе, без сети к бирже
+    venue = getattr(settings, "hft_venue", "bithumb") or "bithumb"
+    async with make_client(venue, settings) as bh, ClientSession() as http:
 
         execu = Executor(bh, bh, dry_run=settings.dry_run)
 
         while True:
+            # трасса итерации: новости -> сигнал -> символ -> стакан -> ордер -> журнал
+            tr = tracer.start("hft")
             try:
                 news = await fetch_and_parse(http, url)
+                tr.mark("news")
                 signal = decide_on_news(news, whitelist)
+                tr.mark("signal")
 
                 if not signal:
+                    tr.outcome = "no_signal"
+                    tracer.finish(tr)
                     await asyncio.sleep(settings.hft_poll_sec)
                     continue
 
                 base = signal["ticker"].upper()
+                tr.key = base
                 sym = choose_symbol_on_bithumb(bh, base, quote)
+                tr.mark("rules")
 
-                ob = await bh.get_orderbook(sym)
+                # поллинг не должен съесть бюджет, нужный под ордер
+                if getattr(bh, "limiter", None) is not None:
+                    await bh.limiter.wait_below(getattr(settings, "rate_soft_usage", 0.8))
+                tr.mark("rate_wait")
+                ob = await quotes.get(bh, sym)
                 bid = float(ob["bids"][0][0])
                 ask = float(ob["asks"][0][0])
+                tr.mark("fetch:" + bh.name)
 
                 quote = getattr(settings, "hft_quote", "KRW")
                 budget = float(getattr(settings, "hft_budget_quote", 100000.0))
                 amount = bh.normalize_amount(sym, budget / ask)
+                tr.mark("normalize")
 
                 if amount <= 0:
+                    tr.outcome = "amount"
+                    tracer.finish(tr)
                     await asyncio.sleep(settings.hft_poll_sec)
                     continue
 
-                await execu.market_hedge(sym, amount)
+                res = await execu.market_hedge(sym, amount)
+                tr.mark("execute")
+                tr.outcome = res.get("state") or res.get("status") or "sent"
 
                 pnl = (bid - ask) * amount
                 append_trade({
@@ -86,11 +114,18 @@ async def run_hft(settings, metrics_state) -> None:
                     "fee_sell": 0,
                     "pnl": pnl,
                 })
+                tr.mark("journal")
 
                 metrics_state.total_trades += 1
-                metrics_state.success_trades += 1
+                # успех — dry-run или обе ноги исполнены (опоздавшая — когда дойдёт)
+                if "id" in res:
+                    hedges.watch(res["id"], lambda h: _count_filled(metrics_state, h))
+                else:
+                    metrics_state.success_trades += 1
 
             except Exception as e:
+                tr.outcome = "error"
                 metrics_state.last_error = f"hft: {e}"
+            tracer.finish(tr)
 
             await asyncio.sleep(settings.hft_poll_sec)
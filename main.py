@@ -1,113 +1,249 @@
 import os
 import asyncio
+import math
 import uvloop
 import logging
 import signal
-from datetime import datetime
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Dict, List, Optional, Sequence
+
+import numpy as np
 
 from config import load_settings
 from utils.log import setup_logging
-from exchanges.bybit import BybitClient
-from exchanges.gate import GateClient
-from engine.signals import calc_spread, SpreadInput
-from engine.executor import Executor
-from engine.risk import AntiFlood, DailyLimitUsd
-from storage.journal_csv import append_trade
-from web.metrics import State, run_http
+from exchanges.base import BaseExchange
+from exchanges.connections import pools
+from exchanges.markets import markets_store
+from exchanges.ratelimit import configure_share, wait_below
+from exchanges.venues import make_client
+from engine.batch import SpreadBatch, ema_fold
+from engine.executor import leg_stats
+from engine.decision import evaluate_books, evaluate_symbol
+from engine.hedges import hedges
+from engine.events import EventDriver
+from engine.feeder import fetch_books
+from engine.inventory import inventory
+from engine.matrix import best_pairs, fx_rates, top_of_books
+from engine.quotes import quotes
+from engine.scheduler import PollScheduler
+from engine.risk import AntiFlood, DailyLimitUsd, RiskEngine, SharedRiskEngine
+from engine.shards import Shard, Supervisor
+from storage.books_bin import BookRecorder
+from utils.prom import cycle_seconds, spread_bps
+from utils.trace import NULL, Trace, current as current_trace, tracer
+from web.metrics import State, build_supervisor_app, run_http
 from hft_bithumb.runner import run_hft
 
 
-async def trade_once(bybit: BybitClient, gate: GateClient, s, st: State,
-                     af: AntiFlood, limit: DailyLimitUsd) -> None:
-    for sym in s.symbols:
-        try:
-            ob_a = await bybit.get_orderbook(sym)
-            ob_b = await gate.get_orderbook(sym)
-            a_bid, a_ask = float(ob_a["bids"][0][0]), float(ob_a["asks"][0][0])
-            b_bid, b_ask = float(ob_b["bids"][0][0]), float(ob_b["asks"][0][0])
-
-            r1, r2 = calc_spread(SpreadInput(
-                bid_a=a_bid, ask_a=a_ask,
-                bid_b=b_bid, ask_b=b_ask,
-                taker_fee_bps=10,
-                slippage_bps=s.slippage_bps,
-            ))
-
-            st.avg_spread_bps = (st.avg_spread_bps * 0.9) + (max(r1.spread_bps, r2.spread_bps) * 0.1)
-
-            target = None
-            if r1.spread_bps >= s.spread_min_bps:
-                target = ("buy_a_sell_b", bybit, gate, a_ask, b_bid)
-            elif r2.spread_bps >= s.spread_min_bps:
-                target = ("buy_b_sell_a", gate, bybit, b_ask, a_bid)
-
-            if not target:
-                if s.dry_run and getattr(s, "demo_mode", False):
-                    target = ("buy_a_sell_b", bybit, gate, a_ask, a_ask * 1.0003)
-                else:
-                    continue
-
+async def refresh_fx(venues: Sequence[BaseExchange], st: State) -> bool:
+    try:
+        for ex in venues:
+            await fx_rates.refresh(ex)
+    except Exception as e:
+        st.last_error = str(e)
+        logging.getLogger("root").warning(f"fx error {e}")
+        return False
+    return True
 
-            usd = min(s.max_order_usd, s.daily_limit_usd)
-            if not limit.can_spend(usd):
-                continue
 
-            dir_name, ex_buy, ex_sell, px_buy, px_sell = target
+async def _decide(tr: Trace, decision: Awaitable[None]) -> None:
+    # решение по символу под своей трассой: стадии evaluate_symbol пишутся в неё
+    tr.mark("queue")
+    token = current_trace.set(tr)
+    try:
+        await decision
+    except BaseException:
+        tr.outcome = "error"
+        raise
+    finally:
+        current_trace.reset(token)
+        tracer.finish(tr)
 
-            min_cost_buy = ex_buy.min_notional(sym) or 0.0
-            min_cost_sell = ex_sell.min_notional(sym) or 0.0
-            usd_base = max(usd, min_cost_buy, min_cost_sell, s.min_notional)
 
+def _fetch_failed(traces: Optional[Dict[str, Trace]], sym: str) -> None:
+    if traces is not None:
+        tr = traces.pop(sym, NULL)
+        tr.outcome = "fetch_error"
+        tracer.finish(tr)
 
-            raw_amount = usd_base / px_buy
 
-            amt_buy  = ex_buy.normalize_amount(sym,  raw_amount)
-            amt_sell = ex_sell.normalize_amount(sym, raw_amount)
+async def _trade_batch(venues: Sequence[BaseExchange], s, st: State,
+                       af: AntiFlood, limit: DailyLimitUsd, symbols: Sequence[str],
+                       traces: Optional[Dict[str, Trace]] = None) -> None:
+    # батч-режим: собираем верх всех стаканов, спреды считаем одним проходом NumPy,
+    # дальше идут только символы, прошедшие порог
+    log = logging.getLogger("root")
+    cyc = current_trace.get()
+    fxs = [fx_rates.to_usdt(ex) for ex in venues]
+    rows = []
+    async for sym, books, err in fetch_books(venues, symbols, s.fetch_concurrency,
+                                             partial=len(venues) > 2, traces=traces):
+        if err is not None:
+            st.last_error = str(err)
+            log.warning(f"trade loop error {err}")
+            _fetch_failed(traces, sym)
+            continue
+        rows.append((sym, books))
+    cyc.mark("fetch")
+    if not rows:
+        return
 
-            amount = min(amt_buy, amt_sell)
-            if amount <= 0:
-                continue
+    demo = s.dry_run and getattr(s, "demo_mode", False)
+    tops = [top_of_books(books, fxs) for _, books in rows]
+    if len(venues) == 2:
+        batch = SpreadBatch(len(rows))
+        for bids, asks in tops:
+            batch.add(bids[0], asks[0], bids[1], asks[1])
+        fee = max(venues[0].taker_fee_bps, venues[1].taker_fee_bps)
+        s1, s2, idx, direction = batch.compute(fee, s.slippage_bps, s.spread_min_bps)
+        best = np.maximum(s1, s2)
+        st.avg_spread_bps = ema_fold(st.avg_spread_bps, best)
+        st.last_spread.update(zip((sym for sym, _ in rows), best.tolist()))
+        for v in best.tolist():
+            if math.isfinite(v):  # -inf — пустая сторона стакана
+                spread_bps.observe(v)
+        todo = [(k, 0, 1, float(s1[k]), float(s2[k])) for k in range(len(rows))] if demo else \
+               [(k, 0, 1, float(s1[k]), float(s2[k])) for k in idx.tolist()]
+    else:
+        bids = np.array([t[0] for t in tops])
+        asks = np.array([t[1] for t in tops])
+        fees = np.array([ex.taker_fee_bps for ex in venues])
+        buy, sell, spread = best_pairs(bids, asks, fees, s.slippage_bps)
+        st.avg_spread_bps = ema_fold(st.avg_spread_bps, spread)
+        st.last_spread.update(zip((sym for sym, _ in rows), spread.tolist()))
+        for v in spread.tolist():
+            if math.isfinite(v):  # -inf — у символа меньше двух живых бирж
+                spread_bps.observe(v)
+        keep = np.isfinite(spread) if demo else spread >= s.spread_min_bps
+        todo = [(k, int(buy[k]), int(sell[k]), float(spread[k]), float("-inf"))
+                for k in np.flatnonzero(keep).tolist()]
+    cyc.mark("batch_spread")
+    if traces is not None:
+        # символы ниже порога дальше не идут — их трасса только из запросов стаканов
+        picked = {rows[k][0] for k, *_ in todo}
+        for sym, _ in rows:
+            if sym not in picked:
+                tr = traces.pop(sym, NULL)
+                tr.outcome = "below"
+                tracer.finish(tr)
 
+    for k, i, j, sp1, sp2 in todo:
+        sym, books = rows[k]
+        tr = traces.pop(sym, NULL) if traces is not None else NULL
+        try:
+            await _decide(tr, evaluate_symbol(sym, books[i], books[j], venues[i], venues[j],
+                                              s, st, af, limit, spreads=(sp1, sp2),
+                                              fx_a=fxs[i], fx_b=fxs[j], named=len(venues) > 2))
+        except Exception as e:
+            st.last_error = str(e)
+            log.warning(f"trade loop error {e}")
 
-            execu = Executor(ex_buy, ex_sell, dry_run=s.dry_run)
 
-            t0 = asyncio.get_event_loop().time()
-            await execu.market_hedge(sym, amount)
-            t1 = asyncio.get_event_loop().time()
-            st.avg_execution_ms = st.avg_execution_ms * 0.8 + (t1 - t0) * 1000.0 * 0.2
+async def trade_once(venues: Sequence[BaseExchange], s, st: State,
+                     af: AntiFlood, limit: DailyLimitUsd,
+                     symbols: Optional[Sequence[str]] = None) -> None:
+    # symbols — подмножество s.symbols (адаптивный опрос); по умолчанию все
+    symbols = s.symbols if symbols is None else symbols
+    t0 = time.perf_counter()
+    # трасса цикла (ожидание бюджета, курсы, символы) и по трассе на решение по символу
+    cyc = tracer.start("cycle")
+    token = current_trace.set(cyc)
+    try:
+        # бюджет запросов почти выбран — ждём, пока ведро наполнится, а не ловим 429
+        lims = [ex.limiter for ex in venues if getattr(ex, "limiter", None) is not None]
+        if lims:
+            st.rate_wait_ms = await wait_below(lims, getattr(s, "rate_soft_usage", 0.8)) * 1000.0
+        cyc.mark("rate_wait")
+        if not await refresh_fx(venues, st):
+            cyc.outcome = "fx_error"
+            return
+        cyc.mark("fx")
 
+        traces = {sym: tracer.start("decision", sym) for sym in symbols} if tracer.enabled else None
+        if getattr(s, "batch_eval", False):
+            await _trade_batch(venues, s, st, af, limit, symbols, traces)
+        else:
+            # все ноги всех символов тянем параллельно, спред считаем по мере готовности
+            concurrency = getattr(s, "fetch_concurrency", 8)
+            async for sym, books, err in fetch_books(venues, symbols, concurrency,
+                                                     partial=len(venues) > 2, traces=traces):
+                try:
+                    if err is not None:
+                        _fetch_failed(traces, sym)
+                        raise err
+                    tr = traces.pop(sym, NULL) if traces is not None else NULL
+                    await _decide(tr, evaluate_books(sym, books, venues, s, st, af, limit))
+                except Exception as e:
+                    st.last_error = str(e)
+                    logging.getLogger("root").warning(f"trade loop error {e}")
+        cyc.mark("symbols")
+    finally:
+        current_trace.reset(token)
+        tracer.finish(cyc)
+    st.last_cycle_ms = (time.perf_counter() - t0) * 1000.0
+    cycle_seconds.observe(st.last_cycle_ms / 1000.0)
+    st.avg_cycle_ms = st.avg_cycle_ms * 0.8 + st.last_cycle_ms * 0.2
 
-            pnl = (px_sell - px_buy) * amount
-            append_trade({
-                "ts": datetime.utcnow().isoformat(),
-                "symbol": sym,
-                "direction": dir_name,
-                "amount": amount,
-                "price_buy": px_buy,
-                "price_sell": px_sell,
-                "fee_buy": 0,
-                "fee_sell": 0,
-                "pnl": pnl,
-            })
 
-            st.total_trades += 1
-            st.success_trades += 1
-            limit.add(usd)
+async def run_events(venues: Sequence[BaseExchange], s, st: State, af: AntiFlood,
+                     limit: DailyLimitUsd, stop: asyncio.Event) -> None:
+    """
+    Событийный режим: решения по апдейтам WS-стаканов, без опроса по таймеру.
+    Здесь остаётся только обновление курсов раз в секунду.
+    """
+    log = logging.getLogger("root")
 
+    async def evaluate(sym: str, books: List[Any], tick_ns: int) -> None:
+        try:
+            # трасса от тика: queue — ожидание пересчёта после апдейта стакана
+            await _decide(tracer.start("event", sym, t0=tick_ns),
+                          evaluate_books(sym, books, venues, s, st, af, limit, tick_ns=tick_ns))
         except Exception as e:
             st.last_error = str(e)
-            logging.getLogger("root").warning(f"trade loop error {e}")
+            log.warning(f"trade event error {sym} {e}")
 
-async def main() -> None:
-    s = load_settings()
-    setup_logging(s.log_level)
-    log = logging.getLogger("root")
-    log.info("start")
+    await refresh_fx(venues, st)
+    driver = EventDriver(venues, s.symbols, evaluate, latency=st.tick_to_decision,
+                         paused=lambda: s.stop_trading)
+    if driver.attach() == 0:
+        log.warning("event_driven: no venue streams (WS_BOOKS=false?), nothing will trigger")
+    try:
+        while not stop.is_set():
+            await refresh_fx(venues, st)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await driver.close()
+
+
+async def run_adaptive(venues: Sequence[BaseExchange], s, st: State, af: AntiFlood,
+                       limit: DailyLimitUsd, stop: asyncio.Event) -> None:
+    """
+    Опрос по расписанию engine/scheduler.py: у каждого символа свой период
+    по близости спреда к порогу и его волатильности, в сумме — не больше
+    POLL_BUDGET_RPS запросов стакана в секунду на все биржи.
+    """
+    sched = PollScheduler(s.symbols, budget=s.poll_budget_rps / max(len(venues), 1),
+                          spread_min_bps=s.spread_min_bps,
+                          min_interval=s.poll_min_ms / 1000.0, max_interval=s.poll_max_ms / 1000.0)
+    st.poller = sched
+    while not stop.is_set():
+        due = sched.due()
+        if due and not s.stop_trading:
+            await trade_once(venues, s, st, af, limit, symbols=due)
+            for sym in due:
+                sched.observe(sym, st.last_spread.get(sym))
+            sched.rebalance()
+        try:
+            await asyncio.wait_for(stop.wait(), max(sched.next_in(), 0.005))
+        except asyncio.TimeoutError:
+            pass
 
-    st = State()
-    af = AntiFlood(seconds=getattr(s, "antiflood_seconds", 30))
-    limit = DailyLimitUsd(limit_usd=s.daily_limit_usd)
 
+def _stop_event() -> asyncio.Event:
     stop = asyncio.Event()
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
@@ -115,24 +251,123 @@ async def main() -> None:
             loop.add_signal_handler(sig, stop.set)
         except NotImplementedError:
             pass
+    return stop
 
+
+async def run_supervisor(s) -> None:
+    """
+    SHARDS=N: этот процесс не торгует — запускает шарды (engine/shards.py),
+    перезапускает упавшие и отдаёт сводные метрики на METRICS_PORT.
+    """
+    log = logging.getLogger("root")
+    sup = Supervisor(s)
+    log.info(f"supervisor: {len(sup.groups)} shards for {len(s.symbols)} symbols")
+    stop = _stop_event()
     metrics_port = int(os.getenv("METRICS_PORT", getattr(s, "metrics_port", 8000)))
-    http_task = asyncio.create_task(run_http(st, port=metrics_port, settings=s))
+    http_task = asyncio.create_task(run_http(State(), port=metrics_port,
+                                             app=build_supervisor_app(sup)))
+    try:
+        await sup.run(stop)
+    finally:
+        http_task.cancel()
+        await asyncio.gather(http_task, return_exceptions=True)
+        log.info("supervisor stopped")
+
+
+async def main(shard: Optional[Shard] = None) -> None:
+    # шард получает настройки и свою долю символов от супервизора
+    s = shard.settings if shard is not None else load_settings()
+    setup_logging(s.log_level)
+    log = logging.getLogger("root")
+    if shard is None and s.shards > 1 and len(s.symbols) > 1:
+        await run_supervisor(s)
+        return
+    share = 1.0
+    if shard is not None:
+        s.symbols = shard.symbols
+        # лимиты запросов и бюджет опроса — на IP/аккаунт, шард берёт свою долю
+        share = 1.0 / shard.count
+        s.poll_budget_rps *= share
+        configure_share(share)
+    log.info("start" if shard is None else f"start shard {shard.index}: {','.join(s.symbols)}")
+
+    quotes.configure(max_age=s.quote_max_age_ms / 1000.0, max_stale=s.quote_max_stale_ms / 1000.0)
+    markets_store.configure(root=s.markets_dir, ttl=float(s.markets_ttl_sec))
+    pools.configure(min_warm=s.warm_connections, heartbeat=s.heartbeat_sec)
+    leg_stats.configure(floor_ms=s.leg_timeout_floor_ms, cap_ms=s.leg_timeout_cap_ms,
+                        mult=s.leg_timeout_mult)
+    tracer.configure(keep=s.trace_keep, slow_ms=s.trace_slow_ms, enabled=s.trace_enabled)
+
+    st = State()
+    af = AntiFlood(seconds=getattr(s, "antiflood_seconds", 30))
+    risk_kw = dict(
+        max_symbol_usd=s.risk_max_symbol_usd,
+        max_venue_usd=s.risk_max_venue_usd,
+        cooldown_s=getattr(s, "antiflood_seconds", 30),
+        max_orders=s.risk_max_orders,
+        window_s=s.risk_window_sec,
+    )
+    if shard is not None:
+        # дневной бюджет общий на все шарды, остальные лимиты — по своим символам
+        limit = SharedRiskEngine(shard.budget, **risk_kw)
+    else:
+        limit = RiskEngine(daily_usd=s.daily_limit_usd, **risk_kw)
+    st.risk = limit
+
+    rec = rec_task = None
+    if s.record_books:
+        # у шарда свой каталог: индексы бирж/символов в meta.json у процессов разные
+        root = s.record_dir if shard is None else os.path.join(s.record_dir, f"shard{shard.index}")
+        rec = BookRecorder(root=root, depth=s.record_depth, flush_sec=s.record_flush_sec)
+        quotes.configure(recorder=rec)
+        st.recorder = rec
+        rec_task = asyncio.create_task(rec.run())
+
+    stop = _stop_event()
+
+    if shard is None:
+        metrics_port = int(os.getenv("METRICS_PORT", getattr(s, "metrics_port", 8000)))
+        http_task = asyncio.create_task(run_http(st, port=metrics_port, settings=s))
+    else:
+        # HTTP у супервизора; шард шлёт ему снимки метрик
+        http_task = asyncio.create_task(shard.run_reports(st, s.shard_report_sec,
+                                                          s.loop_lag_interval_ms / 1000.0))
 
     hft_task = None
-    if getattr(s, "hft_enabled", False):
+    if getattr(s, "hft_enabled", False) and (shard is None or shard.index == 0):
         hft_task = asyncio.create_task(run_hft(s, st))
 
-    async with BybitClient(s.bybit_api_key, s.bybit_api_secret) as bybit, \
-               GateClient(s.gate_api_key, s.gate_api_secret) as gate:
+    async with AsyncExitStack() as stack:
+        venues = [await stack.enter_async_context(make_client(n, s)) for n in s.venues]
+        for ex in venues:
+            if hasattr(ex, "watch"):
+                ex.watch(ex.venue_symbol(sym) for sym in s.symbols)
+            if rec is not None:
+                rec.attach(ex)
+        # балансы нужны только под живые ордера; дальше — сверка в фоне
+        inv_task = None
+        if not s.dry_run and s.inventory_check:
+            inventory.configure(reconcile_sec=s.inventory_reconcile_sec, quote_share=share)
+            await inventory.load(venues)
+            inv_task = asyncio.create_task(inventory.run(venues))
         try:
+            if s.event_driven:
+                await run_events(venues, s, st, af, limit, stop)
+            elif s.adaptive_poll:
+                await run_adaptive(venues, s, st, af, limit, stop)
             while not stop.is_set():
                 if s.stop_trading:
                     await asyncio.sleep(1.0)
                     continue
-                await trade_once(bybit, gate, s, st, af, limit)
+                await trade_once(venues, s, st, af, limit)
                 await asyncio.sleep(1.0)
         finally:
+            await hedges.drain()  # не бросаем развороты на полпути
+            if inv_task:
+                inv_task.cancel()
+            if rec is not None:
+                rec_task.cancel()
+                await rec.close()  # дописать последний блок
             if hft_task:
                 hft_task.cancel()
                 try:
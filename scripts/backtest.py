@@ -0,0 +1,87 @@
+# scripts/backtest.py
+# Прогон записанных стаканов (RECORD_BOOKS) через путь решения trade_once на
+# виртуальном времени (engine/backtest.py). Одна точка — журнал и PnL; списки
+# --spread-min/--slippage — сетка, точки считаются в пуле процессов.
+#   PYTHONPATH=. python scripts/backtest.py --root storage/books --days 2024-05-01
+#   PYTHONPATH=. python scripts/backtest.py --spread-min 10,20,30 --slippage 5,10 --workers 4
+#   PYTHONPATH=. python scripts/backtest.py --synth 86400   # сутки синтетики, 2 биржи x 5 символов
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import List
+
+import orjson
+
+from engine.backtest import backtest_settings, replay, sweep
+from exchanges.sim import SimExchange
+from storage.books_bin import BookRecorder
+from storage.journal_csv import HEADER
+
+
+def _ints(v: str) -> List[int]:
+    return [int(x) for x in v.split(",") if x]
+
+
+def synth(root: str, seconds: int, symbols: int = 5) -> None:
+    # две биржи с независимым блужданием цены, по стакану на символ в секунду
+    syms = [f"S{i}/USDT" for i in range(symbols)]
+    venues = [SimExchange(n, symbols=syms, vol_bps=3.0, level_qty=5.0) for n in ("sim_a", "sim_b")]
+    rec = BookRecorder(root=root, max_chunks=1 << 16)
+    t0 = (time.time_ns() // 1_000_000_000) * 1_000_000_000
+    for t in range(seconds):
+        for ex in venues:
+            for sym in syms:
+                rec.record(ex.name, sym, ex._next_book(sym), ts_ns=t0 + t * 1_000_000_000)
+    asyncio.run(rec.close())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="storage/books")
+    ap.add_argument("--days", default="", help="2024-05-01,2024-05-02 (по умолчанию все)")
+    ap.add_argument("--step-ms", type=int, default=1000, help="период решений; 0 — на каждый стакан")
+    ap.add_argument("--spread-min", type=_ints, default=None)
+    ap.add_argument("--slippage", type=_ints, default=None)
+    ap.add_argument("--workers", type=int, default=0)
+    ap.add_argument("--journal", default="", help="CSV журнала (одна точка)")
+    ap.add_argument("--synth", type=int, default=0, help="записать N секунд синтетики во временный каталог")
+    a = ap.parse_args()
+    days = [d for d in a.days.split(",") if d] or None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = a.root
+        if a.synth:
+            root = tmp
+            t0 = time.perf_counter()
+            synth(root, a.synth)
+            print(f"synth: {a.synth} s recorded in {time.perf_counter() - t0:.1f} s")
+
+        spread_min, slippage = a.spread_min or [], a.slippage or []
+        if len(spread_min) > 1 or len(slippage) > 1:
+            base = backtest_settings()
+            t0 = time.perf_counter()
+            res = sweep(root, spread_min or [base.spread_min_bps], slippage or [base.slippage_bps],
+                        days=days, step_ms=a.step_ms, workers=a.workers or None)
+            for r in res:
+                print(orjson.dumps({k: r[k] for k in ("params", "trades", "pnl", "speedup")}).decode())
+            print(f"sweep: {len(res)} points in {time.perf_counter() - t0:.1f} s")
+            return
+
+        over = {}
+        if spread_min:
+            over["spread_min_bps"] = spread_min[0]
+        if slippage:
+            over["slippage_bps"] = slippage[0]
+        res = asyncio.run(replay(root, backtest_settings(**over), days, a.step_ms))
+        journal = res.pop("journal")
+        if a.journal:
+            with open(a.journal, "w", encoding="utf-8") as f:
+                f.write(HEADER)
+                for row in journal:
+                    f.write(",".join(str(row.get(c, 0)) for c in HEADER.strip().split(",")) + "\n")
+        print(orjson.dumps(res, option=orjson.OPT_INDENT_2).decode())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# scripts/bench_batch_spread.py
+# Поштучный calc_spread (как в evaluate_symbol) против батча SpreadBatch.
+#   PYTHONPATH=. python scripts/bench_batch_spread.py --symbols 10 100 500 2000
+import argparse
+import time
+
+import numpy as np
+
+from engine.batch import SpreadBatch
+from engine.signals import calc_spread, SpreadInput
+
+
+def per_symbol(rows, fee, slip, thr):
+    out = []
+    for i, (ba, aa, bb, ab) in enumerate(rows):
+        r1, r2 = calc_spread(SpreadInput(bid_a=ba, ask_a=aa, bid_b=bb, ask_b=ab,
+                                         taker_fee_bps=fee, slippage_bps=slip))
+        if r1.spread_bps >= thr or r2.spread_bps >= thr:
+            out.append(i)
+    return out
+
+
+def batched(batch, rows, fee, slip, thr):
+    batch.reset()
+    for ba, aa, bb, ab in rows:
+        batch.add(ba, aa, bb, ab)
+    return batch.compute(fee, slip, thr)[2]
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500, 2000])
+    p.add_argument("--repeat", type=int, default=50)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(1)
+    fee, slip, thr = 10, 10, 30
+    print(f"{'symbols':>8} {'calc_spread us':>15} {'batch us':>10} {'compute us':>11} {'x':>6}")
+    for n in args.symbols:
+        mid = rng.uniform(1, 1000, n)
+        rows = [(m * 0.9995, m * 1.0005, m * (1 + d) * 0.9995, m * (1 + d) * 1.0005)
+                for m, d in zip(mid, rng.normal(0, 0.003, n))]
+        batch = SpreadBatch(n)
+        assert per_symbol(rows, fee, slip, thr) == list(batched(batch, rows, fee, slip, thr))
+
+        t_loop = timeit(lambda: per_symbol(rows, fee, slip, thr), args.repeat)
+        t_batch = timeit(lambda: batched(batch, rows, fee, slip, thr), args.repeat)
+        t_comp = timeit(lambda: batch.compute(fee, slip, thr), args.repeat)
+        print(f"{n:>8} {t_loop:>15.1f} {t_batch:>10.1f} {t_comp:>11.1f} {t_loop / t_batch:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
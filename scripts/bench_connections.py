@@ -0,0 +1,52 @@
+# scripts/bench_connections.py
+# Первый ордер после простоя: холодный пул (DNS + TCP [+ TLS] на каждый ордер)
+# против прогретого ConnectionManager (exchanges/connections.py). По умолчанию
+# бьёт в локальный RestStandIn — там нет TLS и DNS, поэтому разница — нижняя
+# граница; с --url https://api.bybit.com видно реальную цену рукопожатия
+# (ордер без ключей отклонят, но время до ответа честное).
+#   PYTHONPATH=. python scripts/bench_connections.py --rounds 20
+import argparse
+import asyncio
+import statistics
+import time
+
+from exchanges.connections import ConnectionManager
+from exchanges.rest_standin import RestStandIn
+
+PATH = "/v5/market/time"
+
+
+async def first_request_ms(url: str, prewarm: bool) -> float:
+    m = ConnectionManager("bybit", url, PATH, min_warm=2)
+    try:
+        if prewarm:
+            await m.warm()
+        t0 = time.perf_counter()
+        await m.request("GET", PATH)
+        return (time.perf_counter() - t0) * 1000.0
+    finally:
+        await m.close()
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--url", default="")
+    a = ap.parse_args()
+    srv = None
+    url = a.url
+    if not url:
+        srv = RestStandIn("bybit")
+        url = await srv.start()
+    try:
+        for prewarm in (False, True):
+            xs = [await first_request_ms(url, prewarm) for _ in range(a.rounds)]
+            name = "warm" if prewarm else "cold"
+            print(f"{name}: median {statistics.median(xs):.2f} ms  max {max(xs):.2f} ms")
+    finally:
+        if srv is not None:
+            await srv.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
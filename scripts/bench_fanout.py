@@ -0,0 +1,83 @@
+# scripts/bench_fanout.py
+# Сравнение последовательного опроса стаканов (как было в trade_once) с
+# параллельным fan-out. Биржи — фейки с настраиваемой задержкой, сеть не нужна.
+#   PYTHONPATH=. python scripts/bench_fanout.py --symbols 30 --latency-ms 80 --jitter-ms 20
+import argparse
+import asyncio
+import random
+import time
+
+from config import Settings
+from engine.risk import AntiFlood, DailyLimitUsd
+from engine.signals import calc_spread, SpreadInput
+from exchanges.base import BaseExchange
+from main import trade_once
+from web.metrics import State
+
+
+class FakeExchange(BaseExchange):
+    def __init__(self, name: str, latency: float, jitter: float, mid: float = 100.0) -> None:
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.mid = mid
+
+    async def get_orderbook(self, symbol):
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        return {"bids": [[self.mid - 0.05, 1.0]], "asks": [[self.mid + 0.05, 1.0]]}
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {"id": "1"}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.0001
+    def price_step(self, symbol): return 0.01
+    def min_notional(self, symbol): return 0.0
+
+
+async def serial_cycle(a, b, s) -> None:
+    for sym in s.symbols:
+        ob_a = await a.get_orderbook(sym)
+        ob_b = await b.get_orderbook(sym)
+        calc_spread(SpreadInput(
+            bid_a=ob_a["bids"][0][0], ask_a=ob_a["asks"][0][0],
+            bid_b=ob_b["bids"][0][0], ask_b=ob_b["asks"][0][0],
+            taker_fee_bps=10, slippage_bps=s.slippage_bps,
+        ))
+
+
+async def run(args) -> None:
+    s = Settings(_env_file=None, symbols=[f"C{i}/USDT" for i in range(args.symbols)],
+                 dry_run=True, demo_mode=False, fetch_concurrency=args.concurrency)
+    a = FakeExchange("bybit", args.latency_ms / 1000, args.jitter_ms / 1000)
+    b = FakeExchange("gate", args.latency_ms / 1000, args.jitter_ms / 1000)
+    st = State()
+
+    serial, fanout = [], []
+    for _ in range(args.cycles):
+        t0 = time.perf_counter()
+        await serial_cycle(a, b, s)
+        serial.append((time.perf_counter() - t0) * 1000)
+
+        await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1e9))
+        fanout.append(st.last_cycle_ms)
+
+    avg_s, avg_f = sum(serial) / len(serial), sum(fanout) / len(fanout)
+    print(f"symbols={args.symbols} latency={args.latency_ms}ms concurrency={args.concurrency}")
+    print(f"serial : {avg_s:8.1f} ms/cycle")
+    print(f"fan-out: {avg_f:8.1f} ms/cycle  (x{avg_s / avg_f:.1f})")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--symbols", type=int, default=30)
+    p.add_argument("--latency-ms", type=float, default=80.0)
+    p.add_argument("--jitter-ms", type=float, default=20.0)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--cycles", type=int, default=3)
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
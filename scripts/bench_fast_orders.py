@@ -0,0 +1,103 @@
+# scripts/bench_fast_orders.py
+# Накладные расходы клиента на один рыночный ордер: прямой подписанный REST
+# (exchanges/fastrest.py) против ccxt create_order. Оба пути бьют в локальный
+# RestStandIn, запущенный в отдельном процессе, так что CPU в этом процессе —
+# только клиентская сторона. Bithumb: у ccxt старый API 1.0, сравнивать не с чем.
+#   PYTHONPATH=. python scripts/bench_fast_orders.py --orders 300
+import argparse
+import asyncio
+import multiprocessing as mp
+import time
+
+from exchanges.bithumb import BithumbClient
+from exchanges.bybit import BybitClient
+from exchanges.gate import GateClient
+from exchanges.rest_standin import RestStandIn
+
+MARKET = {
+    "id": "BTCUSDT", "symbol": "BTC/USDT", "base": "BTC", "quote": "USDT",
+    "baseId": "BTC", "quoteId": "USDT", "type": "spot", "spot": True, "active": True,
+    "precision": {"amount": 0.000001, "price": 0.01},
+    "limits": {"amount": {"min": 0.000001}, "cost": {"min": 1.0}},
+}
+
+
+def serve(venue: str, q) -> None:
+    async def run():
+        srv = RestStandIn(venue)
+        q.put(await srv.start())
+        await asyncio.Event().wait()
+    asyncio.run(run())
+
+
+def client(venue: str, url: str):
+    if venue == "bithumb":
+        ex = BithumbClient("key", "secret", rest_url=url)
+        ex._markets = {"BTC/KRW": {"id": "BTC_KRW", "limits": {}}}
+        ex.remember_ask("BTC/KRW", {"asks": [[70_000_000.0, 1.0]]})
+        return ex, "BTC/KRW"
+    cls = BybitClient if venue == "bybit" else GateClient
+    ex = cls("key", "secret", rest_url=url)
+    mid = "BTCUSDT" if venue == "bybit" else "BTC_USDT"
+    ex.x.set_markets([{**MARKET, "id": mid, "info": {}}])
+    ex._markets = ex.x.markets
+    ex.remember_ask("BTC/USDT", {"asks": [[50_000.0, 1.0]]})
+    # ccxt — в тот же stand-in
+    api = ex.x.urls["api"]
+    for k, v in api.items():
+        if isinstance(v, dict):
+            api[k] = {kk: url + "/api/v4" for kk in v}
+        else:
+            api[k] = url
+    ex.x.options["enableUnifiedMargin"] = False
+    ex.x.options["enableUnifiedAccount"] = True
+    ex.x.options["createMarketBuyOrderRequiresPrice"] = False
+    return ex, "BTC/USDT"
+
+
+async def measure(place, n: int):
+    for _ in range(10):  # прогрев соединения
+        await place()
+    wall, cpu0 = [], time.process_time()
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await place()
+        wall.append((time.perf_counter() - t0) * 1e6)
+    cpu = (time.process_time() - cpu0) / n * 1e6
+    wall.sort()
+    return wall[len(wall) // 2], wall[int(len(wall) * 0.99)], cpu
+
+
+async def bench(venue: str, url: str, n: int) -> None:
+    ex, sym = client(venue, url)
+    ex.limiter.rate = ex.limiter.burst = 1e9  # лимиты не мерим
+    ex.limiter.tokens = 1e9
+    try:
+        fast = await measure(lambda: ex.fast.create_market(sym, ex.market_id(sym), "sell", 0.001), n)
+        print(f"{venue:8s} fast : p50 {fast[0]:7.0f} us  p99 {fast[1]:7.0f} us  client cpu {fast[2]:6.0f} us/order")
+        if venue != "bithumb":
+            slow = await measure(lambda: ex.x.create_order(sym, "market", "sell", 0.001), n)
+            print(f"{venue:8s} ccxt : p50 {slow[0]:7.0f} us  p99 {slow[1]:7.0f} us  client cpu {slow[2]:6.0f} us/order"
+                  f"  (cpu x{slow[2] / fast[2]:.1f})")
+    finally:
+        await ex.close()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--orders", type=int, default=300)
+    p.add_argument("--venues", default="bybit,gate,bithumb")
+    args = p.parse_args()
+    for venue in args.venues.split(","):
+        q = mp.Queue()
+        proc = mp.Process(target=serve, args=(venue, q), daemon=True)
+        proc.start()
+        try:
+            asyncio.run(bench(venue, q.get(timeout=10), args.orders))
+        finally:
+            proc.terminate()
+            proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# scripts/bench_inventory.py
+# Предторговая проверка балансов: Inventory.can_hedge по памяти против
+# запроса баланса на каждую сделку (симулятор с задержкой REST).
+#   PYTHONPATH=. python scripts/bench_inventory.py --latency-ms 30
+import argparse
+import asyncio
+import time
+
+from engine.inventory import Inventory
+from exchanges.sim import SimExchange
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--n", type=int, default=100_000)
+    a = ap.parse_args()
+
+    kw = dict(symbols=["BTC/USDT"], latency_ms=a.latency_ms, balances={"USDT": 1e6, "BTC": 10.0})
+    buy, sell = SimExchange("sim_a", **kw), SimExchange("sim_b", **kw)
+    inv = Inventory()
+    await inv.load([buy, sell])
+
+    t0 = time.perf_counter()
+    for _ in range(a.n):
+        inv.can_hedge(buy, "BTC/USDT", sell, "BTC/USDT", 0.01, 100.0)
+    mem_us = (time.perf_counter() - t0) / a.n * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(10):
+        await asyncio.gather(buy.get_balance(), sell.get_balance())
+    rest_ms = (time.perf_counter() - t0) / 10 * 1000.0
+    print(f"in-memory can_hedge: {mem_us:.2f} µs; REST balances per trade: {rest_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+# scripts/bench_markets_startup.py
+# Время старта клиента (__aenter__) с холодным и тёплым снапшотом маркетов.
+# По умолчанию fetch_markets подменён синтетикой с задержкой (сеть не нужна);
+# --live — настоящий load_markets биржи.
+#   PYTHONPATH=. python scripts/bench_markets_startup.py --venue bybit --markets 2500 --fetch-ms 1500
+import argparse
+import asyncio
+import tempfile
+import time
+
+from exchanges.markets import markets_store
+from exchanges.venues import CLIENTS
+
+
+def synthetic(n: int):
+    return [{
+        "id": f"C{i}USDT", "symbol": f"C{i}/USDT", "base": f"C{i}", "quote": "USDT",
+        "baseId": f"C{i}", "quoteId": "USDT", "type": "spot", "spot": True, "active": True,
+        "precision": {"amount": 0.001, "price": 0.0001},
+        "limits": {"amount": {"min": 0.001}, "cost": {"min": 5.0}},
+        "info": {"symbol": f"C{i}USDT", "status": "Trading", "filters": ["x" * 200]},
+    } for i in range(n)]
+
+
+def make(args):
+    ex = CLIENTS[args.venue]("", "")
+    if not args.live:
+        async def fetch_markets(params={}):
+            await asyncio.sleep(args.fetch_ms / 1000)
+            return synthetic(args.markets)
+
+        async def fetch_currencies(params={}):
+            return {}
+
+        ex.x.fetch_markets = fetch_markets
+        ex.x.fetch_currencies = fetch_currencies
+    return ex
+
+
+async def start_ms(args) -> float:
+    ex = make(args)
+    t0 = time.perf_counter()
+    await ex.__aenter__()
+    dt = (time.perf_counter() - t0) * 1000
+    await ex.close()
+    return dt
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as root:
+        markets_store.configure(root=root, ttl=3600.0)
+        cold = await start_ms(args)
+        size = markets_store.path(args.venue).stat().st_size
+        warm = [await start_ms(args) for _ in range(args.runs)]
+    print(f"venue={args.venue} live={args.live} snapshot={size / 1024:.0f} KB")
+    print(f"cold start: {cold:8.1f} ms")
+    print(f"warm start: {sorted(warm)[len(warm) // 2]:8.1f} ms (p50 of {args.runs})")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--venue", default="bybit", choices=sorted(CLIENTS))
+    p.add_argument("--markets", type=int, default=2500)
+    p.add_argument("--fetch-ms", type=float, default=1500.0)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--live", action="store_true")
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# scripts/bench_prom.py
+# Стоимость записи в метрики Prometheus (utils/prom.py) на горячем пути:
+# observe готовой серии, observe с поиском серии по меткам и render всего
+# реестра. Выход с кодом 1, если observe дороже бюджета (--budget-ns).
+#   PYTHONPATH=. python scripts/bench_prom.py --n 500000 --budget-ns 1000
+import argparse
+import random
+import sys
+import time
+
+from utils.prom import Registry
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500_000)
+    ap.add_argument("--budget-ns", type=int, default=1000)
+    a = ap.parse_args()
+
+    reg = Registry()
+    fam = reg.histogram("bench_seconds", "bench", ["venue"])
+    child = fam.labels("bybit")
+    xs = [random.lognormvariate(-5, 1.5) for _ in range(4096)]
+
+    t0 = time.perf_counter_ns()
+    for i in range(a.n):
+        child.observe(xs[i & 4095])
+    observe_ns = (time.perf_counter_ns() - t0) / a.n
+
+    t0 = time.perf_counter_ns()
+    for i in range(a.n):
+        fam.labels("bybit").observe(xs[i & 4095])
+    labels_ns = (time.perf_counter_ns() - t0) / a.n
+
+    for v in ("gate", "bithumb", "sim_a", "sim_b"):
+        fam.labels(v).observe(0.01)
+    t0 = time.perf_counter_ns()
+    lines = reg.render()
+    render_us = (time.perf_counter_ns() - t0) / 1000.0
+
+    print(f"observe: {observe_ns:.0f} ns  labels+observe: {labels_ns:.0f} ns  "
+          f"render ({len(lines)} lines): {render_us:.0f} us")
+    if observe_ns > a.budget_ns:
+        print(f"over budget {a.budget_ns} ns")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# scripts/bench_recorder.py
+# Стоимость записи стакана в storage/books_bin.py на event loop (record:
+# копирование верхних уровней в блок NumPy) и скорость чтения через memmap.
+#   PYTHONPATH=. python scripts/bench_recorder.py --n 200000 --depth 5
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+
+from exchanges.sim import SimExchange
+from storage.books_bin import BookRecorder, open_books
+
+
+async def run(a: argparse.Namespace) -> None:
+    syms = [f"S{i}/USDT" for i in range(a.symbols)]
+    ex = SimExchange("sim_a", symbols=syms, depth=20)
+    books = [ex.book(sym) for sym in syms]
+    with tempfile.TemporaryDirectory() as root:
+        rec = BookRecorder(root=root, depth=a.depth, max_chunks=64)
+        t0 = time.perf_counter_ns()
+        for i in range(a.n):
+            rec.record("sim_a", syms[i % a.symbols], books[i % a.symbols])
+        record_ns = (time.perf_counter_ns() - t0) / a.n
+        t0 = time.perf_counter()
+        await rec.close()
+        close_ms = (time.perf_counter() - t0) * 1000.0
+
+        t0 = time.perf_counter()
+        days = open_books(root)
+        mids = [float(np.nanmean((d.bid_px[:, 0] + d.ask_px[:, 0]) / 2.0)) for d in days]
+        read_ms = (time.perf_counter() - t0) * 1000.0
+        rows = sum(len(d) for d in days)
+        size = sum(f.stat().st_size for d in days for f in d.path.glob("*.bin"))
+        print(f"record: {record_ns / 1000.0:.2f} us/book  flush+close: {close_ms:.0f} ms  "
+              f"rows: {rows} ({size / max(rows, 1):.0f} B/row)  dropped: {rec.dropped}  "
+              f"memmap scan: {read_ms:.1f} ms (mid {mids[0]:.2f})")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--symbols", type=int, default=50)
+    ap.add_argument("--depth", type=int, default=5)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
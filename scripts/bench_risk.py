@@ -0,0 +1,45 @@
+# scripts/bench_risk.py
+# Стоимость предторговой проверки RiskEngine (engine/risk.py): check на
+# успешном пути и полный цикл check + commit + release. Выход с кодом 1, если
+# check дороже бюджета (--budget-ns) — годится как гейт в CI.
+#   PYTHONPATH=. python scripts/bench_risk.py --n 200000 --budget-ns 2000
+import argparse
+import sys
+import time
+
+from engine.risk import RiskEngine
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--budget-ns", type=int, default=2000)
+    a = ap.parse_args()
+
+    syms = [f"S{i}/USDT" for i in range(a.symbols)]
+    r = RiskEngine(1e18, max_symbol_usd=1e9, max_venue_usd=1e12, cooldown_s=0.0,
+                   max_orders=1_000_000_000, window_s=1.0)
+    for s in syms:  # экспозиция и окно не пустые — как в работе
+        r.commit(s, "bybit", "gate", 100.0)
+
+    t0 = time.perf_counter_ns()
+    for i in range(a.n):
+        r.check(syms[i % a.symbols], "bybit", "gate", 100.0)
+    check_ns = (time.perf_counter_ns() - t0) / a.n
+
+    t0 = time.perf_counter_ns()
+    for i in range(a.n):
+        s = syms[i % a.symbols]
+        if r.check(s, "bybit", "gate", 100.0) is None:
+            r.release(r.commit(s, "bybit", "gate", 100.0))
+    cycle_ns = (time.perf_counter_ns() - t0) / a.n
+
+    print(f"check: {check_ns:.0f} ns  check+commit+release: {cycle_ns:.0f} ns  "
+          f"(budget {a.budget_ns} ns)")
+    if check_ns > a.budget_ns:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# scripts/bench_rules.py
+# normalize_symbol + lot_size/price_step/min_notional: прежний линейный проход по
+# маркетам и разбор вложенных dict'ов против индекса TradingRules.
+#   PYTHONPATH=. python scripts/bench_rules.py --markets 2500 --calls 20000
+import argparse
+import random
+import time
+from typing import Any, Dict
+
+from exchanges.gate import GateClient
+
+
+def synthetic(n: int) -> Dict[str, Any]:
+    return {f"C{i}/USDT": {
+        "base": f"C{i}", "precision": {"amount": 0.001, "price": 4},
+        "limits": {"amount": {"min": 0.01}, "cost": {"min": 5.0}},
+    } for i in range(n)}
+
+
+class Legacy:
+    """Копия прежней логики клиентов (до индекса) для сравнения."""
+
+    def __init__(self, markets: Dict[str, Any]) -> None:
+        self._markets = markets
+
+    def normalize_symbol(self, common: str) -> str:
+        if "/" in common:
+            return common
+        key = common.upper().replace("-", "").replace("_", "").replace(":", "").replace("/", "")
+        for s in self._markets.keys():
+            if s.replace("/", "").upper() == key:
+                return s
+        return common
+
+    def _m(self, symbol: str) -> Dict[str, Any]:
+        m = self._markets.get(self.normalize_symbol(symbol))
+        if not m:
+            raise RuntimeError(symbol)
+        return m
+
+    def lot_size(self, symbol: str) -> float:
+        m = self._m(symbol)
+        step = m.get("limits", {}).get("amount", {}).get("min") or m.get("precision", {}).get("amount")
+        return float(step or 0.000001)
+
+    def price_step(self, symbol: str) -> float:
+        p = self._m(symbol).get("precision", {}).get("price")
+        return 10 ** (-p) if isinstance(p, int) else float(p or 0.01)
+
+    def min_notional(self, symbol: str) -> float:
+        return float(self._m(symbol).get("limits", {}).get("cost", {}).get("min") or 0.0)
+
+
+def per_call_us(ex, symbols) -> float:
+    t0 = time.perf_counter()
+    for sym in symbols:
+        ex.normalize_symbol(sym)
+        ex.lot_size(sym)
+        ex.price_step(sym)
+        ex.min_notional(sym)
+    return (time.perf_counter() - t0) / len(symbols) * 1e6
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--markets", type=int, default=2500)
+    p.add_argument("--calls", type=int, default=20000)
+    args = p.parse_args()
+
+    markets = synthetic(args.markets)
+    rnd = random.Random(1)
+    slash = [f"C{rnd.randrange(args.markets)}/USDT" for _ in range(args.calls)]
+    plain = [s.replace("/", "") for s in slash[: max(1, args.calls // 20)]]
+
+    legacy = Legacy(markets)
+    ex = GateClient("", "")
+    ex._markets = markets
+    t0 = time.perf_counter()
+    ex.rules_index()
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"markets={args.markets} index build {build_ms:.1f} ms (once per markets load)")
+    for name, syms in (("BTC/USDT form", slash), ("BTCUSDT form ", plain)):
+        old, new = per_call_us(legacy, syms), per_call_us(ex, syms)
+        print(f"{name}: legacy {old:9.2f} us  index {new:6.2f} us  (x{old / new:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# scripts/bench_sim_loop.py
+# Полный цикл trade_once -> Executor.market_hedge на двух симулированных биржах
+# (exchanges/sim.py) без сети: пропускная способность цикла и задержка хеджа
+# при заданной задержке/джиттере биржи. Журнал сделок пишется во временный файл.
+#   PYTHONPATH=. python scripts/bench_sim_loop.py --symbols 50 --cycles 50 --latency-ms 5
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from config import Settings
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.sim import SimExchange
+from main import trade_once
+from storage import journal_csv
+from web.metrics import State
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbols", type=int, default=50)
+    ap.add_argument("--cycles", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--jitter-ms", type=float, default=2.0)
+    ap.add_argument("--partial-rate", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    a = ap.parse_args()
+
+    syms = [f"S{i}/USDT" for i in range(a.symbols)]
+    kw = dict(symbols=syms, vol_bps=20.0, latency_ms=a.latency_ms, jitter_ms=a.jitter_ms,
+              partial_rate=a.partial_rate, error_rate=a.error_rate)
+    venues = [SimExchange("sim_a", mid=100.0, **kw), SimExchange("sim_b", mid=100.3, **kw)]
+    s = Settings(_env_file=None, symbols=syms, dry_run=False, demo_mode=False,
+                 fetch_concurrency=16, daily_limit_usd=1e12)
+    st = State()
+    af, limit = AntiFlood(), DailyLimitUsd(1e12)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_csv.CSV_PATH = Path(tmp) / "trades.csv"
+        cycles = []
+        t0 = time.perf_counter()
+        for _ in range(a.cycles):
+            c0 = time.perf_counter()
+            await trade_once(venues, s, st, af, limit)
+            cycles.append((time.perf_counter() - c0) * 1000.0)
+        total = time.perf_counter() - t0
+
+    books = a.cycles * a.symbols
+    print(f"{a.cycles} cycles x {a.symbols} symbols, venue latency {a.latency_ms}±{a.jitter_ms} ms")
+    print(f"cycle: median {statistics.median(cycles):.1f} ms  max {max(cycles):.1f} ms")
+    print(f"throughput: {books / total:.0f} symbol-evals/s")
+    print(f"trades: {st.total_trades}  hedge avg {st.avg_execution_ms:.1f} ms  "
+          f"orders a/b: {len(venues[0].orders)}/{len(venues[1].orders)}  "
+          f"errors: {venues[0].errors + venues[1].errors}  last_error: {st.last_error!r}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
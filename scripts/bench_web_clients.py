@@ -0,0 +1,100 @@
+# scripts/bench_web_clients.py
+# Задержка /simulate_news?mode=smart: раньше каждый запрос открывал свои клиенты
+# Bithumb/Gate/Bybit (load_markets + новая HTTP-сессия), теперь они общие в
+# ClientRegistry приложения. Клиенты — фейки с задержками, сеть не нужна.
+#   PYTHONPATH=. python scripts/bench_web_clients.py --requests 20 --open-ms 800 --book-ms 60
+import argparse
+import asyncio
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import storage.journal_csv as jc
+import storage.positions_csv as pc
+from config import Settings
+from engine.quotes import quotes
+from exchanges.base import BaseExchange
+from exchanges.venues import ClientRegistry
+from web.metrics import State, build_app
+
+
+class FakeClient(BaseExchange):
+    def __init__(self, name: str, open_s: float, book_s: float) -> None:
+        self.name = name
+        self.open_s = open_s
+        self.book_s = book_s
+        self._markets = {"BTC/KRW": {"limits": {"amount": {"min": 0.0001}}}}
+
+    async def __aenter__(self) -> "FakeClient":
+        await asyncio.sleep(self.open_s)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        pass
+
+    async def get_orderbook(self, symbol):
+        await asyncio.sleep(self.book_s)
+        return {"bids": [[158_780_000.0, 1.0]], "asks": [[158_800_000.0, 1.0]]}
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {"id": "1"}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.0001
+    def price_step(self, symbol): return 1.0
+    def min_notional(self, symbol): return 0.0
+
+
+async def per_request(open_s: float, book_s: float) -> None:
+    # как было: три клиента на запрос, каждый открывается и закрывается
+    for name in ("bithumb", "gate", "bybit"):
+        async with FakeClient(name, open_s, book_s) as ex:
+            await ex.get_orderbook("BTC/KRW")
+
+
+async def run(args) -> None:
+    jc.CSV_PATH = jc.Path("/tmp/bench_trades.csv")
+    pc.FILE = pc.Path("/tmp/bench_positions.csv")
+    open_s, book_s = args.open_ms / 1000, args.book_ms / 1000
+    s = Settings(_env_file=None, dry_run=True, bithumb_api_key="k", bithumb_api_secret="x")
+
+    before = []
+    for _ in range(args.requests):
+        t0 = time.perf_counter()
+        await per_request(open_s, book_s)
+        before.append((time.perf_counter() - t0) * 1000)
+
+    reg = ClientRegistry(s, factory=lambda name, _: FakeClient(name, open_s, book_s))
+    st = State()
+    quotes.configure(max_age=0.0)  # каждый запрос реально читает стакан
+    async with TestClient(TestServer(build_app(st, settings=s, clients=reg))) as client:
+        after = []
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            r = await client.get("/simulate_news?ticker=BTC&quote=KRW&budget=5000000&mode=smart")
+            await r.read()
+            after.append((time.perf_counter() - t0) * 1000)
+
+    def p50(xs):
+        return sorted(xs)[len(xs) // 2]
+
+    print(f"requests={args.requests} open={args.open_ms}ms book={args.book_ms}ms")
+    print(f"per-request clients: p50 {p50(before):8.1f} ms  max {max(before):8.1f} ms")
+    print(f"shared registry    : p50 {p50(after):8.1f} ms  max {max(after):8.1f} ms"
+          f"  (first {after[0]:.1f} ms)")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=20)
+    p.add_argument("--open-ms", type=float, default=800.0)
+    p.add_argument("--book-ms", type=float, default=60.0)
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import orjson
+
+from exchanges.book import L2Book
+
+log = logging.getLogger("books_bin")
+
+DAY_NS = 86_400 * 1_000_000_000
+
+# колонка: (имя, dtype, код array, по уровню стакана). Файл на колонку, записи
+# фиксированной ширины: строка k — k-й элемент каждого файла. Цены f8 (KRW-цены
+# не влезают в f4), объёмы f4. Порядок байт — little-endian, как у x86/ARM.
+COLUMNS: Tuple[Tuple[str, str, str, bool], ...] = (
+    ("ts_ns", "<i8", "q", False),   # время получения, unix ns (UTC)
+    ("venue", "<u2", "H", False),   # индекс в meta.json["venues"]
+    ("symbol", "<u2", "H", False),  # индекс в meta.json["symbols"] (символ биржи)
+    ("bid_px", "<f8", "d", True),
+    ("bid_qty", "<f4", "f", True),
+    ("ask_px", "<f8", "d", True),
+    ("ask_qty", "<f4", "f", True),
+)
+assert sys.byteorder == "little", "books_bin пишет машинный порядок байт"
+
+NAN = float("nan")
+
+
+def row_widths(depth: int) -> Dict[str, int]:
+    """Байт на строку в файле каждой колонки."""
+    return {n: np.dtype(dt).itemsize * (depth if lv else 1) for n, dt, _, lv in COLUMNS}
+
+
+def day_name(day: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(day * 86_400))
+
+
+class _Chunk:
+    # колонки — array.array: append без NumPy-скаляров, tofile пишет буфер как есть
+    __slots__ = ("ts_ns", "venue", "symbol", "bid_px", "bid_qty", "ask_px", "ask_qty", "n", "day")
+
+    def __init__(self) -> None:
+        for name, _, code, _ in COLUMNS:
+            setattr(self, name, array(code))
+        self.n = 0
+        self.day = 0
+
+    def clear(self) -> None:
+        for name, _, _, _ in COLUMNS:
+            del getattr(self, name)[:]
+        self.n = 0
+
+
+class BookRecorder:
+    """
+    Запись верхних depth уровней каждого полученного стакана в колоночный
+    бинарный формат: каталог на сутки UTC (root/YYYY-MM-DD), файл на колонку,
+    только дописывание. record() дописывает уровни в колонки текущего блока
+    (array.array, ~5 мкс на стакан); блок из chunk_rows строк (или раз в
+    flush_sec) уходит в фоновый поток записи — event loop файлов не касается. Если поток отстал на max_chunks блоков,
+    новые стаканы отбрасываются и считаются в dropped.
+    """
+
+    def __init__(self, root: str = "storage/books", depth: int = 5, chunk_rows: int = 4096,
+                 flush_sec: float = 1.0, max_chunks: int = 8) -> None:
+        self.root = Path(root)
+        self.depth = depth
+        self.chunk_rows = chunk_rows
+        self.flush_sec = flush_sec
+        self.max_chunks = max_chunks
+        # индексы имён — свои у каждого дня и только дописываются (см. _open_day)
+        self.venues: Dict[str, int] = {}
+        self.symbols: Dict[str, int] = {}
+        self._day: Optional[int] = None
+        self._trimmed: Set[int] = set()  # дни, выровненные потоком записи в этом процессе
+        self.rows = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._cur: Optional[_Chunk] = None
+        self._free: Deque[_Chunk] = deque()
+        self._allocated = 0
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="books-rec")
+
+    # --- горячий путь (event loop) ---
+    def _id(self, names: Dict[str, int], name: str) -> int:
+        i = names.get(name)
+        if i is None:
+            i = names[name] = len(names)
+        return i
+
+    def _open_day(self, day: int) -> None:
+        # после рестарта в тот же день индексы берём из meta.json: строки на диске
+        # уже ссылаются на них, новые имена только дописываются в конец
+        self._day = day
+        self.venues, self.symbols = {}, {}
+        mp = self.root / day_name(day) / "meta.json"
+        if not mp.exists():
+            return
+        try:
+            meta = orjson.loads(mp.read_bytes())
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            log.error(f"book recorder meta read failed: {e}")
+            return
+        self.venues = {n: i for i, n in enumerate(meta["venues"])}
+        self.symbols = {n: i for i, n in enumerate(meta["symbols"])}
+
+    def _take(self, day: int) -> Optional[_Chunk]:
+        if self._free:
+            c = self._free.popleft()
+        elif self._allocated < self.max_chunks:
+            c = _Chunk()
+            self._allocated += 1
+        else:
+            return None
+        c.day = day
+        self._cur = c
+        return c
+
+    def _levels(self, px: array, qty: array, levels: Sequence[Any]) -> None:
+        n = min(len(levels), self.depth)
+        for j in range(n):
+            lvl = levels[j]
+            px.append(lvl[0])
+            qty.append(lvl[1])
+        for _ in range(self.depth - n):  # мелкий стакан — пустые уровни
+            px.append(NAN)
+            qty.append(0.0)
+
+    def record(self, venue: str, symbol: str, ob: Any, ts_ns: Optional[int] = None) -> None:
+        ts = time.time_ns() if ts_ns is None else ts_ns
+        day = ts // DAY_NS
+        c = self._cur
+        if c is not None and c.day != day and c.n:
+            self.flush()  # сутки сменились — блок не пересекает границу файла
+            c = None
+        if day != self._day:
+            self._open_day(day)  # раз в сутки: одно чтение meta.json
+        if c is None:
+            c = self._take(day)
+            if c is None:
+                self.dropped += 1
+                return
+        if isinstance(ob, L2Book):
+            bids, asks = ob.bids.top(self.depth), ob.asks.top(self.depth)
+        else:
+            bids, asks = ob["bids"], ob["asks"]
+        c.ts_ns.append(ts)
+        c.venue.append(self._id(self.venues, venue))
+        c.symbol.append(self._id(self.symbols, symbol))
+        self._levels(c.bid_px, c.bid_qty, bids)
+        self._levels(c.ask_px, c.ask_qty, asks)
+        c.n += 1
+        self.rows += 1
+        if c.n == self.chunk_rows:
+            self.flush()
+
+    def attach(self, ex: Any) -> bool:
+        """Тики WS-стрима биржи: каждый применённый апдейт стакана — запись."""
+        stream = getattr(ex, "stream", None)
+        if stream is None:
+            return False
+
+        def on_update(venue_symbol: str, rx_ns: int) -> None:
+            ob = stream.get(venue_symbol)
+            if ob is not None:
+                self.record(ex.name, venue_symbol, ob)
+
+        stream.listeners.append(on_update)
+        return True
+
+    def flush(self) -> None:
+        """Текущий блок — в поток записи; вызывается и из event loop, без ожидания."""
+        c, self._cur = self._cur, None
+        if c is None:
+            return
+        if not c.n:
+            self._free.append(c)
+            return
+        self._pool.submit(self._write, c, list(self.venues), list(self.symbols))
+
+    # --- поток записи ---
+    def _write(self, c: _Chunk, venues: List[str], symbols: List[str]) -> None:
+        try:
+            path = self.root / day_name(c.day)
+            path.mkdir(parents=True, exist_ok=True)
+            meta = {"depth": self.depth, "venues": venues, "symbols": symbols,
+                    "columns": [[n, dt, lv] for n, dt, _, lv in COLUMNS]}
+            mp = path / "meta.json"
+            if mp.exists() and orjson.loads(mp.read_bytes()).get("depth") != self.depth:
+                raise ValueError(f"{path}: recorded with another depth")
+            tmp = mp.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(orjson.dumps(meta))
+            os.replace(tmp, mp)
+            if c.day not in self._trimmed:
+                self._trim(path)
+                self._trimmed.add(c.day)
+            for name, _, _, _ in COLUMNS:
+                with open(path / f"{name}.bin", "ab") as f:
+                    getattr(c, name).tofile(f)
+            self.written += c.n
+        except Exception as e:
+            self.errors += 1
+            log.error(f"book recorder write failed: {e}")
+        finally:
+            c.clear()
+            self._free.append(c)
+
+    def _trim(self, path: Path) -> None:
+        # падение посреди записи оставляет колонки разной длины; дописывать после
+        # такого хвоста — сдвинуть все следующие строки, поэтому до первой записи
+        # дня в процессе файлы обрезаются до общего числа целых строк
+        widths = row_widths(self.depth)
+        files = {n: path / f"{n}.bin" for n in widths}
+        sizes = {n: f.stat().st_size if f.exists() else 0 for n, f in files.items()}
+        rows = min(sizes[n] // widths[n] for n in widths)
+        for n, f in files.items():
+            if sizes[n] != rows * widths[n]:
+                log.warning(f"book recorder: {f} trimmed to {rows} rows")
+                os.truncate(f, rows * widths[n])
+
+    async def run(self) -> None:
+        """Фон: неполный блок уходит на диск не реже раза в flush_sec."""
+        while True:
+            await asyncio.sleep(self.flush_sec)
+            self.flush()
+
+    async def close(self) -> None:
+        self.flush()
+        await asyncio.to_thread(self._pool.shutdown, True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"rows": self.rows, "written": self.written, "dropped": self.dropped,
+                "errors": self.errors, "venues": len(self.venues), "symbols": len(self.symbols)}
+
+
+class BookFrame:
+    """
+    Один день записи: колонки — np.memmap файлов без копирования
+    (bid_px[k, j] — цена j-го уровня k-й записи). Строк — по самой короткой
+    колонке: недописанный при падении хвост не читается.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        meta = orjson.loads((self.path / "meta.json").read_bytes())
+        self.depth: int = meta["depth"]
+        self.venues: List[str] = meta["venues"]
+        self.symbols: List[str] = meta["symbols"]
+        widths = row_widths(self.depth)
+        sizes = {n: (self.path / f"{n}.bin").stat().st_size if (self.path / f"{n}.bin").exists()
+                 else 0 for n, _, _, _ in COLUMNS}
+        self.rows = min(sizes[n] // widths[n] for n in widths)
+        self.cols: Dict[str, np.ndarray] = {}
+        for name, dt, _, per_level in COLUMNS:
+            shape = (self.rows, self.depth) if per_level else (self.rows,)
+            if self.rows:
+                self.cols[name] = np.memmap(self.path / f"{name}.bin", dtype=dt, mode="r", shape=shape)
+            else:
+                self.cols[name] = np.empty(shape, dtype=dt)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        cols = self.__dict__.get("cols")
+        if cols is not None and name in cols:
+            return cols[name]
+        raise AttributeError(name)
+
+    def mask(self, venue: Optional[str] = None, symbol: Optional[str] = None) -> np.ndarray:
+        """Булева маска записей биржи/символа (неизвестное имя — пустая выборка)."""
+        m = np.ones(self.rows, dtype=bool)
+        for col, names, name in (("venue", self.venues, venue), ("symbol", self.symbols, symbol)):
+            if name is None:
+                continue
+            if name not in names:
+                return np.zeros(self.rows, dtype=bool)
+            m &= self.cols[col] == names.index(name)
+        return m
+
+
+def open_books(root: str = "storage/books", days: Optional[Sequence[str]] = None) -> List[BookFrame]:
+    """Дни записи по порядку (days — ['2024-05-01', ...], по умолчанию все)."""
+    base = Path(root)
+    if not base.exists():
+        return []
+    names = sorted(p.name for p in base.iterdir() if (p / "meta.json").exists())
+    if days is not None:
+        names = [n for n in names if n in set(days)]
+    return [BookFrame(base / n) for n in names]
@@ -53,7 +53,9 @@ def read_last_trades(limit: int = 50) -> List[Dict[str, Any]]:
     return rows[::-1]
 
 def pnl_summary(limit: int | None = None):
-    rows = read_last_trades(limit=limit or 10_000)
+    return summarize(read_last_trades(limit=limit or 10_000))
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
     total = 0.0
     by_symbol = defaultdict(float)
     for r in rows:
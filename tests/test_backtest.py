@@ -0,0 +1,49 @@
+from engine.backtest import backtest_settings, replay, sweep
+from storage.books_bin import DAY_NS, BookRecorder
+
+T0 = 19_800 * DAY_NS  # 2024-03-18 00:00 UTC
+S = 1_000_000_000
+
+
+async def _record(root, seconds=60, cross_from=5):
+    # gate стоит на 100, bybit с cross_from-й секунды уходит на 101 — спред ~60 б.п. после комиссий
+    rec = BookRecorder(root=str(root), depth=3)
+    for t in range(seconds):
+        rec.record("gate", "BTC/USDT", {"bids": [[100.0, 5.0], [99.9, 5.0]],
+                                        "asks": [[100.1, 5.0], [100.2, 5.0]]}, ts_ns=T0 + t * S)
+        px = 101.0 if t >= cross_from else 100.0
+        rec.record("bybit", "BTC/USDT", {"bids": [[px, 5.0], [px - 0.1, 5.0]],
+                                         "asks": [[px + 0.1, 5.0], [px + 0.2, 5.0]]},
+                   ts_ns=T0 + t * S + S // 2)
+    await rec.close()
+
+
+async def test_replay_uses_virtual_clock_for_cooldown(tmp_path):
+    await _record(tmp_path)
+    res = await replay(str(tmp_path), backtest_settings(spread_min_bps=30, slippage_bps=10,
+                                                        antiflood_seconds=30))
+    assert res["rows"] == 120 and res["virtual_s"] == 59.5
+    # кулдаун символа 30 с виртуального времени: сделки на 6-й и 36-й секунде, без sleep
+    assert res["trades"] == 2
+    assert [r["ts"] for r in res["journal"]] == ["2024-03-18T00:00:06", "2024-03-18T00:00:36"]
+    assert {r["direction"] for r in res["journal"]} == {"buy_b_sell_a"}  # a — bybit по алфавиту
+    assert res["pnl"]["count"] == 2 and res["pnl"]["total"] > 0
+    assert res["risk_rejects"].get("cooldown", 0) > 0
+    assert res["elapsed_s"] < 5.0
+
+
+async def test_per_update_step_and_threshold(tmp_path):
+    await _record(tmp_path, seconds=10)
+    res = await replay(str(tmp_path), backtest_settings(spread_min_bps=30), step_ms=0)
+    assert res["trades"] == 1 and res["journal"][0]["ts"] == "2024-03-18T00:00:05.500000"
+    res = await replay(str(tmp_path), backtest_settings(spread_min_bps=500), step_ms=0)
+    assert res["trades"] == 0 and res["decisions"] == 19
+
+
+async def test_sweep_runs_points_in_process_pool(tmp_path):
+    await _record(tmp_path)
+    res = sweep(str(tmp_path), [30, 500], [10, 80], base={"antiflood_seconds": 30}, workers=2)
+    assert [r["params"]["spread_min_bps"] for r in res] == [30, 30, 500, 500]
+    assert [r["params"]["slippage_bps"] for r in res] == [10, 80, 10, 80]
+    assert [r["trades"] for r in res] == [2, 0, 0, 0]
+    assert all("journal" not in r for r in res)
@@ -0,0 +1,123 @@
+import numpy as np
+
+from engine.batch import SpreadBatch, batch_spreads, ema_fold
+from engine.signals import calc_spread, SpreadInput
+
+
+def test_batch_matches_calc_spread():
+    rng = np.random.default_rng(0)
+    mid = rng.uniform(1, 100, 50)
+    shift = 1 + rng.normal(0, 0.005, 50)
+    bid_a, ask_a = mid * 0.999, mid * 1.001
+    bid_b, ask_b = mid * shift * 0.999, mid * shift * 1.001
+
+    s1, s2, idx, direction = batch_spreads(bid_a, ask_a, bid_b, ask_b, 10, 10, 30)
+
+    want = []
+    for i in range(50):
+        r1, r2 = calc_spread(SpreadInput(bid_a=bid_a[i], ask_a=ask_a[i], bid_b=bid_b[i],
+                                         ask_b=ask_b[i], taker_fee_bps=10, slippage_bps=10))
+        assert abs(r1.spread_bps - s1[i]) < 1e-9 and abs(r2.spread_bps - s2[i]) < 1e-9
+        if r1.spread_bps >= 30:
+            want.append((i, 0))
+        elif r2.spread_bps >= 30:
+            want.append((i, 1))
+    assert list(zip(idx.tolist(), direction.tolist())) == want
+    assert want  # в выборке есть actionable строки
+
+
+def test_empty_side_is_never_actionable_and_buffer_grows():
+    b = SpreadBatch(1)
+    b.add(0.0, 101.0, 103.0, 104.0)
+    b.add(100.0, 101.0, 103.0, 104.0)
+    s1, s2, idx, _ = b.compute(10, 10, -1e9)
+    assert b.capacity == 2
+    assert s2[0] == -np.inf
+    assert idx.tolist() == [0, 1]  # s1 первой строки валиден
+
+
+def test_ema_fold_equals_sequential():
+    vals = np.array([1.0, 5.0, -np.inf, 3.0])
+    avg = 2.0
+    for v in (1.0, 5.0, 3.0):
+        avg = avg * 0.9 + v * 0.1
+    assert abs(ema_fold(2.0, vals) - avg) < 1e-12
+
+
+async def test_trade_batch_uses_venue_taker_fee(monkeypatch):
+    import engine.feeder as feeder
+    from config import Settings
+    from engine.quotes import QuoteCache
+    from engine.risk import AntiFlood, DailyLimitUsd
+    from exchanges.sim import SimExchange
+    from main import trade_once
+    from web.metrics import State
+
+    monkeypatch.setattr(feeder, "quotes", QuoteCache())
+    a = SimExchange("fee_a", symbols=["X/USDT"], vol_bps=0, fee_bps=10)
+    b = SimExchange("fee_b", symbols=["X/USDT"], vol_bps=0, fee_bps=40)
+    s = Settings(_env_file=None, symbols=["X/USDT"], batch_eval=True, dry_run=True, demo_mode=False)
+    st = State()
+    await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1e9))
+
+    oa, ob = a.book("X/USDT"), b.book("X/USDT")
+    r1, r2 = calc_spread(SpreadInput(bid_a=oa["bids"][0][0], ask_a=oa["asks"][0][0],
+                                     bid_b=ob["bids"][0][0], ask_b=ob["asks"][0][0],
+                                     taker_fee_bps=40, slippage_bps=s.slippage_bps))
+    assert abs(st.last_spread["X/USDT"] - max(r1.spread_bps, r2.spread_bps)) < 1e-9
+
+
+async def test_taker_fee_decides_on_batch_and_per_symbol_paths(monkeypatch, tmp_path):
+    import engine.feeder as feeder
+    import storage.journal_csv as jc
+    from config import Settings
+    from engine.quotes import QuoteCache
+    from engine.risk import AntiFlood, DailyLimitUsd
+    from exchanges.sim import SimExchange
+    from main import trade_once
+    from web.metrics import State
+
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    # верх стакана ~48 б.п. до комиссий: с 10 б.п. спред выше порога 20, с 40 — ниже
+    for batch in (True, False):
+        for fee, trades in ((10, 1), (40, 0)):
+            monkeypatch.setattr(feeder, "quotes", QuoteCache())
+            a = SimExchange("fee_a", symbols=["X/USDT"], mid=100.0, spread_bps=2.0, vol_bps=0, fee_bps=10)
+            b = SimExchange("fee_b", symbols=["X/USDT"], mid=100.5, spread_bps=2.0, vol_bps=0, fee_bps=fee)
+            s = Settings(_env_file=None, symbols=["X/USDT"], batch_eval=batch, dry_run=True,
+                         demo_mode=False, spread_min_bps=20, depth_aware=False)
+            st = State()
+            await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1e9))
+            assert st.total_trades == trades, (batch, fee)
+
+
+async def test_trade_batch_skips_empty_side_in_spread_histogram(monkeypatch, tmp_path):
+    import math
+
+    import engine.feeder as feeder
+    import storage.journal_csv as jc
+    from config import Settings
+    from engine.quotes import QuoteCache
+    from engine.risk import AntiFlood, DailyLimitUsd
+    from exchanges.sim import SimExchange
+    from main import trade_once
+    from utils.prom import spread_bps
+    from web.metrics import State
+
+    monkeypatch.setattr(feeder, "quotes", QuoteCache())
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    a = SimExchange("inf_a", symbols=["X/USDT", "Y/USDT"], vol_bps=0)
+    b = SimExchange("inf_b", symbols=["X/USDT", "Y/USDT"], vol_bps=0)
+    real = b.get_orderbook
+
+    async def empty(symbol):
+        ob = await real(symbol)
+        return {**ob, "bids": [], "asks": []} if symbol == "Y/USDT" else ob
+
+    monkeypatch.setattr(b, "get_orderbook", empty)
+    s = Settings(_env_file=None, symbols=["X/USDT", "Y/USDT"], batch_eval=True, dry_run=True,
+                 demo_mode=False)
+    count = spread_bps.count
+    await trade_once([a, b], s, State(), AntiFlood(), DailyLimitUsd(1e9))
+    assert math.isfinite(spread_bps.sum)
+    assert spread_bps.count == count + 1  # у Y/USDT на inf_b пустой стакан — не наблюдается
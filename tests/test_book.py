@@ -0,0 +1,58 @@
+import zlib
+
+import pytest
+
+from exchanges.base import best_bid_ask
+from exchanges.book import BookDesync, L2Book
+
+
+def make_book() -> L2Book:
+    book = L2Book("BTC/USDT")
+    book.snapshot([["100", "1"], ["99", "2"], ["98", "3"]],
+                  [["101", "1"], ["102", "2"]], seq=10)
+    return book
+
+
+def test_snapshot_and_deltas_keep_sides_sorted():
+    book = make_book()
+    book.apply([["100", "0"], ["99.5", "4"]], [["100.5", "1"], ["102", "0"]], seq=11)
+
+    assert book.best_bid_ask() == (99.5, 100.5)
+    assert book["bids"] == [[99.5, 4.0], [99.0, 2.0], [98.0, 3.0]]
+    assert book["asks"] == [[100.5, 1.0], [101.0, 1.0]]
+    assert best_bid_ask(book) == (99.5, 100.5)
+
+
+def test_cumulative_depth():
+    book = make_book()
+    assert book.cum_depth("bids", 2) == (3.0, 100 * 1 + 99 * 2)
+    assert book.cum_depth("asks", 10) == (3.0, 101 + 204)
+    book.apply([["100", "0"]], [], seq=11)
+    assert book.cum_depth("bids", 1) == (2.0, 198.0)
+
+
+def test_sequence_gap_raises_and_unsyncs():
+    book = make_book()
+    with pytest.raises(BookDesync):
+        book.apply([["97", "1"]], [], seq=13, prev_seq=12)
+    assert not book.synced
+    # пока не пришёл новый снапшот — дельты игнорируются
+    book.apply([["97", "1"]], [], seq=14)
+    assert book.seq == 10
+
+
+def test_checksum_matches_exchange_string():
+    book = make_book()
+    payload = "100:1:101:1:99:2:102:2:98:3"
+    crc = zlib.crc32(payload.encode())
+    expected = crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    book.verify(expected)
+    with pytest.raises(BookDesync):
+        book.verify(expected + 1)
+    assert not book.synced
+
+
+def test_from_ccxt_dict():
+    book = L2Book.from_ccxt({"symbol": "X", "bids": [[1.0, 2.0]], "asks": [[1.1, 3.0]], "nonce": 5})
+    assert book.best_bid_ask() == (1.0, 1.1) and book.seq == 5
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from engine.quotes import QuoteCache
+from exchanges.book import L2Book
+from exchanges.sim import SimExchange
+from storage.books_bin import DAY_NS, BookRecorder, open_books
+
+T0 = 19_800 * DAY_NS  # 2024-03-18 00:00 UTC
+
+
+async def test_roundtrip_via_memmap(tmp_path):
+    rec = BookRecorder(root=str(tmp_path), depth=3, chunk_rows=2)
+    rec.record("bybit", "BTC/USDT", {"bids": [[100.0, 1.0], [99.5, 2.0]],
+                                      "asks": [[100.5, 0.5], [101.0, 1.5], [102.0, 3.0], [103.0, 1.0]]},
+               ts_ns=T0 + 1)
+    rec.record("gate", "BTC/USDT", {"bids": [[100.1, 0.25]], "asks": [[100.2, 0.75]]}, ts_ns=T0 + 2)
+    book = L2Book("ETH/USDT", depth=25)
+    book.snapshot([["10", "1"], ["9", "2"]], [["11", "3"]], seq=1)
+    rec.record("gate", "ETH/USDT", book, ts_ns=T0 + 3)
+    await rec.close()
+
+    [day] = open_books(str(tmp_path))
+    assert day.path.name == "2024-03-18" and len(day) == 3
+    assert isinstance(day.bid_px, np.memmap) and day.bid_px.shape == (3, 3)
+    assert day.ts_ns.tolist() == [T0 + 1, T0 + 2, T0 + 3]
+    assert day.ask_px[0].tolist() == [100.5, 101.0, 102.0]  # глубже depth не пишется
+    assert np.isnan(day.bid_px[1, 1:]).all() and day.bid_qty[1].tolist() == [0.25, 0.0, 0.0]
+    assert day.bid_px[2, :2].tolist() == [10.0, 9.0]
+    gate_btc = day.mask(venue="gate", symbol="BTC/USDT")
+    assert gate_btc.tolist() == [False, True, False]
+    assert not day.mask(venue="nope").any()
+    assert rec.stats()["written"] == 3
+
+
+async def test_rotates_per_utc_day_and_ignores_torn_tail(tmp_path):
+    rec = BookRecorder(root=str(tmp_path), depth=1)
+    ob = {"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]]}
+    rec.record("a", "X/USDT", ob, ts_ns=T0 - 1)
+    rec.record("a", "X/USDT", ob, ts_ns=T0)
+    rec.record("a", "X/USDT", ob, ts_ns=T0 + 5)
+    await rec.close()
+    days = open_books(str(tmp_path))
+    assert [d.path.name for d in days] == ["2024-03-17", "2024-03-18"]
+    assert [len(d) for d in days] == [1, 2]
+
+    with open(days[1].path / "bid_px.bin", "ab") as f:
+        f.write(b"\x00" * 3)  # запись оборвалась посреди строки
+    assert len(open_books(str(tmp_path), days=["2024-03-18"])[0]) == 2
+
+
+async def test_restart_same_day_keeps_name_ids(tmp_path):
+    ob = {"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]]}
+    rec = BookRecorder(root=str(tmp_path), depth=1)
+    rec.record("gate", "BTC/USDT", ob, ts_ns=T0 + 1)
+    await rec.close()
+    rec = BookRecorder(root=str(tmp_path), depth=1)  # рестарт процесса в те же сутки
+    rec.record("bybit", "ETH/USDT", ob, ts_ns=T0 + 2)
+    rec.record("gate", "BTC/USDT", ob, ts_ns=T0 + 3)
+    await rec.close()
+    [day] = open_books(str(tmp_path))
+    assert day.venues == ["gate", "bybit"] and day.symbols == ["BTC/USDT", "ETH/USDT"]
+    assert [day.venues[v] for v in day.venue.tolist()] == ["gate", "bybit", "gate"]
+    assert [day.symbols[x] for x in day.symbol.tolist()] == ["BTC/USDT", "ETH/USDT", "BTC/USDT"]
+
+
+async def test_reopen_after_partial_write_realigns_columns(tmp_path):
+    ob = {"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]]}
+    rec = BookRecorder(root=str(tmp_path), depth=1)
+    rec.record("gate", "BTC/USDT", ob, ts_ns=T0 + 1)
+    rec.record("gate", "BTC/USDT", ob, ts_ns=T0 + 2)
+    await rec.close()
+    path = tmp_path / "2024-03-18"
+    # падение посреди блока: ts_ns и venue дописаны целиком, bid_px — наполовину
+    for name, tail in (("ts_ns", np.array([T0 + 3], "<i8")), ("venue", np.array([0], "<u2")),
+                       ("bid_px", b"\x00" * 4)):
+        with open(path / f"{name}.bin", "ab") as f:
+            f.write(tail if isinstance(tail, bytes) else tail.tobytes())
+
+    rec = BookRecorder(root=str(tmp_path), depth=1)  # рестарт в те же сутки
+    rec.record("gate", "BTC/USDT", {"bids": [[5.0, 1.0]], "asks": [[6.0, 1.0]]}, ts_ns=T0 + 4)
+    await rec.close()
+    [day] = open_books(str(tmp_path))
+    assert len(day) == 3
+    assert day.ts_ns.tolist() == [T0 + 1, T0 + 2, T0 + 4]
+    assert day.bid_px[:, 0].tolist() == [1.0, 1.0, 5.0]
+    assert (path / "venue.bin").stat().st_size == 3 * 2
+
+async def test_quote_cache_records_rest_fetches(tmp_path):
+    rec = BookRecorder(root=str(tmp_path), depth=5)
+    cache = QuoteCache(max_age=0.0)
+    cache.configure(recorder=rec)
+    ex = SimExchange("sim_rec", symbols=["BTC/USDT"], latency_ms=0.0, jitter_ms=0.0)
+    for _ in range(3):
+        ob = await cache.get(ex, "BTC/USDT")
+    await rec.close()
+    [day] = open_books(str(tmp_path))
+    assert len(day) == 3 and day.venues == ["sim_rec"]
+    assert day.bid_px[-1, 0] == pytest.approx(ob["bids"][0][0])
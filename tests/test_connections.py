@@ -0,0 +1,60 @@
+import asyncio
+
+from exchanges.bybit import BybitClient
+from exchanges.connections import ConnectionManager, pools
+from exchanges.rest_standin import RestStandIn
+
+
+async def test_warm_keeps_min_connections_open():
+    srv = RestStandIn("bybit")
+    m = ConnectionManager("bybit", await srv.start(), "/v5/market/time", min_warm=2)
+    try:
+        await m.warm()
+        assert (m.opened, m.heartbeats, srv.heartbeats) == (2, 2, 2)
+        # два параллельных запроса уходят по уже открытым соединениям
+        res = await asyncio.gather(*(m.request("GET", "/v5/market/time") for _ in range(2)))
+        assert [warm for _, _, warm in res] == [True, True]
+        await m.warm()  # heartbeat переиспользует пул, новых соединений нет
+        assert m.opened == 2
+    finally:
+        await m.close()
+        await srv.stop()
+    assert m.stats()["warm_sent"] == 2 and m.stats()["cold_sent"] == 0
+
+
+async def test_order_reports_cold_then_warm():
+    srv = RestStandIn("bybit")
+    url = await srv.start()
+    ex = BybitClient("key", "secret", rest_url=url)
+    ex._markets = {"BTC/USDT": {"id": "BTCUSDT", "precision": {"amount": 0.0001}, "limits": {}}}
+    try:
+        first = await ex.create_market_order("BTC/USDT", "sell", 0.001)
+        second = await ex.create_market_order("BTC/USDT", "sell", 0.001)
+    finally:
+        await ex.close()
+        await srv.stop()
+    assert (first["conn"], second["conn"]) == ("cold", "warm")
+    assert pools.stats()["bybit"]["cold_sent"] >= 1
+
+
+async def test_client_prewarms_on_enter(monkeypatch):
+    srv = RestStandIn("bybit")
+    url = await srv.start()
+    ex = BybitClient("key", "secret", rest_url=url)
+
+    async def no_markets(x):
+        x._markets = {"BTC/USDT": {"id": "BTCUSDT", "precision": {"amount": 0.0001}, "limits": {}}}
+
+    monkeypatch.setattr("exchanges.bybit.markets_store.open", no_markets)
+    try:
+        async with ex:
+            for _ in range(100):
+                if srv.heartbeats >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            order = await ex.create_market_order("BTC/USDT", "sell", 0.001)
+        assert srv.heartbeats >= 2
+        assert order["conn"] == "warm"
+        assert ex.fast.conns._task is None  # heartbeat остановлен при выходе
+    finally:
+        await srv.stop()
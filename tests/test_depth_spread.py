@@ -0,0 +1,64 @@
+from engine.signals import calc_depth_spread
+from exchanges.book import L2Book
+
+# a дешевле b, но у a мелкий первый уровень
+A = {"bids": [[99.0, 1.0]], "asks": [[100.0, 0.5], [101.0, 5.0]]}
+B = {"bids": [[101.0, 0.5], [100.2, 5.0]], "asks": [[102.0, 1.0]]}
+
+
+def test_top_of_book_level_is_fully_executable():
+    r1, r2 = calc_depth_spread(A, B, notional=50.0, taker_fee_bps=0, spread_min_bps=50)
+    assert abs(r1.amount - 0.5) < 1e-12
+    assert abs(r1.vwap_buy - 100.0) < 1e-9 and abs(r1.vwap_sell - 101.0) < 1e-9
+    assert abs(r1.spread_bps - 100.0) < 1e-9 and r1.ok
+    assert not r2.ok
+
+
+def test_walking_levels_kills_spread():
+    r1, _ = calc_depth_spread(A, B, notional=300.0, taker_fee_bps=0, spread_min_bps=50)
+    assert r1.vwap_buy > 100.0 and r1.vwap_sell < 101.0
+    assert r1.spread_bps < 50 and not r1.ok
+
+
+def test_max_amount_is_where_average_spread_hits_threshold():
+    r1, _ = calc_depth_spread(A, B, notional=50.0, taker_fee_bps=0, spread_min_bps=50)
+    # на q > 0.5: (50.5 + 100.2(q-0.5)) = 1.005 * (50 + 101(q-0.5))
+    q = r1.max_amount
+    cost = 50.0 + 101.0 * (q - 0.5)
+    proceeds = 50.5 + 100.2 * (q - 0.5)
+    assert q > 0.5
+    assert abs(proceeds - 1.005 * cost) < 1e-9
+    assert abs(r1.max_notional - cost) < 1e-9
+
+
+def test_not_covered_when_book_too_thin():
+    r1, _ = calc_depth_spread(A, B, notional=10_000.0, taker_fee_bps=0, spread_min_bps=-1000)
+    assert not r1.ok
+
+
+def test_accepts_l2book():
+    a, b = L2Book.from_ccxt(A), L2Book.from_ccxt(B)
+    r1, _ = calc_depth_spread(a, b, notional=50.0, taker_fee_bps=0, spread_min_bps=50)
+    assert r1.ok
+
+
+async def test_evaluate_symbol_depth_gate_includes_slippage():
+    from config import Settings
+    from engine.risk import AntiFlood, DailyLimitUsd
+    from exchanges.sim import SimExchange
+    from engine.decision import evaluate_symbol
+    from web.metrics import State
+
+    # верх: 60 б.п. сырых — проходит и со слиппеджем; VWAP на 100$ — 55 б.п.:
+    # после двух комиссий 35, со слиппеджем 25 < 30
+    a = {"bids": [[99.0, 5.0]], "asks": [[100.0, 0.5], [100.1, 5.0]]}
+    b = {"bids": [[100.6, 5.0]], "asks": [[101.0, 5.0]]}
+    trades = {}
+    for slip in (0, 10):
+        ex_a, ex_b = SimExchange("sim_a", symbols=["X/USDT"]), SimExchange("sim_b", symbols=["X/USDT"])
+        s = Settings(_env_file=None, spread_min_bps=30, slippage_bps=slip, dry_run=True, demo_mode=False)
+        st = State()
+        st.journal = lambda row: None
+        await evaluate_symbol("X/USDT", a, b, ex_a, ex_b, s, st, AntiFlood(), DailyLimitUsd(1e9))
+        trades[slip] = st.total_trades
+    assert trades == {0: 1, 10: 0}
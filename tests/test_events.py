@@ -0,0 +1,101 @@
+import asyncio
+
+import storage.journal_csv as jc
+from config import Settings
+from engine.decision import evaluate_books
+from engine.events import EventDriver
+from engine.quotes import QuoteCache
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.base import BaseExchange
+from exchanges.stream import BybitBookStream, GateBookStream
+from exchanges.ws_standin import StandInServer
+from web.metrics import State
+
+
+class StreamVenue(BaseExchange):
+    def __init__(self, name, stream):
+        self.name, self.stream = name, stream
+
+    async def get_orderbook(self, symbol):
+        raise RuntimeError("REST must not be used while the stream is synced")
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {"id": "1"}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.0001
+    def price_step(self, symbol): return 0.01
+    def min_notional(self, symbol): return 0.0
+
+
+async def test_update_reevaluates_only_its_symbol():
+    seen = []
+    done = asyncio.Event()
+
+    async def evaluate(sym, books, tick_ns):
+        seen.append(sym)
+        await done.wait()
+
+    a = StreamVenue("a", BybitBookStream(url="ws://unused"))
+    b = StreamVenue("b", GateBookStream(url="ws://unused"))
+    drv = EventDriver([a, b], ["BTC/USDT", "ETH/USDT"], evaluate, cache=QuoteCache())
+    assert drv.attach() == 2
+    for ex in (a, b):
+        ex.stream.subscribe(["BTC/USDT", "ETH/USDT"])
+        ex.stream._ws = type("WS", (), {"closed": False})()
+
+    a.stream._snapshot("BTC/USDT", [[100, 1]], [[101, 1]], 1, None)
+    b.stream._snapshot("BTC/USDT", [[102, 1]], [[103, 1]], 1, None)
+    await asyncio.sleep(0)
+    # пока символ считается, новые тики схлопываются в один повторный пересчёт
+    a.stream._delta("BTC/USDT", [[100, 2]], [], 2, None)
+    a.stream._delta("BTC/USDT", [[100, 3]], [], 3, None)
+    done.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert seen == ["BTC/USDT", "BTC/USDT"]
+    assert drv.ticks == 4
+    assert drv.latency.count == 2
+    await drv.close()
+
+
+async def test_stream_tick_dispatches_trade(tmp_path, monkeypatch):
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    srv_a, srv_b = StandInServer("bybit"), StandInServer("gate")
+    a = StreamVenue("bybit", BybitBookStream(url=await srv_a.start()))
+    b = StreamVenue("gate", GateBookStream(url=await srv_b.start()))
+    s = Settings(symbols=["BTC/USDT"], spread_min_bps=30, slippage_bps=0,
+                 depth_aware=False, dry_run=True, demo_mode=False)
+    st = State()
+    limit = DailyLimitUsd(limit_usd=s.daily_limit_usd)
+
+    async def evaluate(sym, books, tick_ns):
+        await evaluate_books(sym, books, [a, b], s, st, AntiFlood(0), limit, tick_ns=tick_ns)
+
+    drv = EventDriver([a, b], s.symbols, evaluate, latency=st.tick_to_decision)
+    drv.attach()
+    for ex in (a, b):
+        ex.stream.subscribe(s.symbols)
+        ex.stream.start()
+    try:
+        await srv_a.wait_subscribed("BTC/USDT")
+        await srv_b.wait_subscribed("BTC/USDT")
+        await srv_a.snapshot("BTC/USDT", [[100, 5]], [[100.1, 5]])
+        await srv_b.snapshot("BTC/USDT", [[100, 5]], [[100.1, 5]])
+        # на Gate bid уходит выше ask Bybit — этот апдейт и должен дать сделку
+        await srv_b.delta("BTC/USDT", [[101, 5]], [[101.1, 5]])
+        for _ in range(500):
+            if st.total_trades:
+                break
+            await asyncio.sleep(0.01)
+        assert st.total_trades == 1
+        assert st.tick_to_dispatch.count == 1
+        assert 0 < st.tick_to_dispatch.last_us < 1_000_000
+        assert st.tick_to_decision.count >= 1
+    finally:
+        await drv.close()
+        for ex in (a, b):
+            await ex.stream.stop()
+        await srv_a.stop()
+        await srv_b.stop()
@@ -0,0 +1,101 @@
+import ccxt.async_support as ccxt
+import pytest
+
+from exchanges.bithumb import BithumbClient
+from exchanges.bybit import BybitClient
+from exchanges.gate import GateClient
+from exchanges.rest_standin import RestStandIn
+
+MARKETS = {
+    "bybit": ("BTC/USDT", "BTCUSDT", 50_000.0),
+    "gate": ("BTC/USDT", "BTC_USDT", 50_000.0),
+    "bithumb": ("BTC/KRW", "BTC_KRW", 70_000_000.0),
+}
+CLIENTS = {"bybit": BybitClient, "gate": GateClient, "bithumb": BithumbClient}
+
+
+def _client(venue, url, secret="secret"):
+    sym, mid, ask = MARKETS[venue]
+    ex = CLIENTS[venue]("key", secret, rest_url=url)
+    ex._markets = {sym: {"id": mid, "base": "BTC", "precision": {"amount": 0.0001}, "limits": {}}}
+    ex.remember_ask(sym, {"asks": [[ask, 1.0]]})
+    return ex
+
+
+@pytest.mark.parametrize("venue", ["bybit", "gate", "bithumb"])
+async def test_signed_orders_and_cancel(venue):
+    srv = RestStandIn(venue)
+    ex = _client(venue, await srv.start())
+    sym, mid, ask = MARKETS[venue]
+    try:
+        buy = await ex.create_market_order(sym, "buy", 0.00123)
+        sell = await ex.create_market_order(sym, "sell", 0.00123)
+        await ex.cancel_order(sell["id"], sym)
+    finally:
+        await ex.close()
+        await srv.stop()
+
+    assert srv.rejected == 0
+    assert buy["id"] and sell["id"] != buy["id"]
+    assert srv.cancels == [sell["id"]]
+    b, s = srv.orders
+    if venue == "bybit":
+        assert (b["symbol"], b["side"], b["qty"], b["marketUnit"]) == (mid, "Buy", "0.0012", "baseCoin")
+        assert s["side"] == "Sell"
+    elif venue == "gate":
+        # рыночная покупка на Gate — сумма в USDT по последнему ask
+        assert (b["currency_pair"], b["amount"]) == (mid, "60")
+        assert (s["side"], s["amount"]) == ("sell", "0.0012")
+    else:
+        assert (b["market"], b["side"], b["ord_type"], b["price"]) == ("KRW-BTC", "bid", "price", "84000")
+        assert (s["side"], s["ord_type"], s["volume"]) == ("ask", "market", "0.0012")
+
+
+async def test_falls_back_to_ccxt_before_sending():
+    ex = GateClient("key", "secret", rest_url="http://127.0.0.1:9")
+    ex._markets = {"BTC/USDT": {"id": "BTC_USDT", "limits": {}}}  # ask неизвестен
+    sent = []
+
+    async def create_order(symbol, type, side, amount, price=None, params={}):
+        sent.append((symbol, side, amount))
+        return {"id": "ccxt-1"}
+
+    ex.x.create_order = create_order
+    res = await ex.create_market_order("BTC/USDT", "buy", 0.001)
+    assert res["id"] == "ccxt-1" and sent == [("BTC/USDT", "buy", 0.001)]
+    assert ex.fast.sent == 0
+    await ex.close()
+
+
+async def test_exchange_error_is_not_retried_via_ccxt():
+    srv = RestStandIn("bybit")
+    ex = _client("bybit", await srv.start(), secret="wrong")
+
+    async def create_order(*a, **k):
+        raise AssertionError("must not fall back after sending")
+
+    ex.x.create_order = create_order
+    try:
+        with pytest.raises(ccxt.ExchangeError):
+            await ex.create_market_order("BTC/USDT", "buy", 0.001)
+    finally:
+        await ex.close()
+        await srv.stop()
+    assert srv.rejected == 1
+
+
+@pytest.mark.parametrize("status, raw", [(502, b"<html>502 Bad Gateway</html>"),
+                                         (429, b"<html>Too Many Requests</html>"),
+                                         (200, b"<html>maintenance</html>")])
+async def test_non_json_reply_is_exchange_error(status, raw, monkeypatch):
+    ex = _client("bybit", "http://127.0.0.1:9")
+
+    async def request(method, path, data=None, headers=None):
+        return status, raw, True
+
+    monkeypatch.setattr(ex.fast.conns, "request", request)
+    try:
+        with pytest.raises(ccxt.ExchangeError, match=f"bybit {status}.*<html>"):
+            await ex.create_market_order("BTC/USDT", "sell", 0.001)
+    finally:
+        await ex.close()
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from engine.executor import Executor, LegStats
+from engine.hedges import FAILED, FILLED, LATE, STUCK, UNWOUND, HedgeBook
+from exchanges.sim import SimExchange
+from exchanges.venues import ClientRegistry
+
+
+@pytest.fixture
+def book(monkeypatch):
+    hb = HedgeBook()
+    monkeypatch.setattr("engine.executor.hedges", hb)
+    monkeypatch.setattr("engine.executor.leg_stats", LegStats())
+    return hb
+
+
+def _pair(**kw):
+    return (SimExchange("sim_a", symbols=["BTC/USDT"], **kw),
+            SimExchange("sim_b", symbols=["BTC/USDT"], **kw))
+
+
+async def test_both_legs_fill(book):
+    a, b = _pair()
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    assert res["state"] == FILLED
+    assert book.get(res["id"]).history[-1][0] == FILLED
+    assert book.stats() == {"active": 0, "done": {FILLED: 1}}
+
+
+async def test_failed_leg_is_unwound_in_background(book):
+    a, b = _pair()
+    b.error_rate = 1.0
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    assert "error" in res["sell"] and res["state"] == "unwinding"
+    await book.drain()
+    h = book.get(res["id"])
+    assert h.state == UNWOUND
+    assert [o["side"] for o in a.orders] == ["buy", "sell"]  # разворот покупки
+
+
+def _unwind_errors(monkeypatch, ex, *errors):
+    # первый ордер биржи (нога хеджа) проходит, развороты получают errors по очереди
+    real, calls = ex.create_market_order, []
+
+    async def order(symbol, side, amount):
+        calls.append(side)
+        if len(calls) > 1 and len(calls) - 2 < len(errors):
+            raise errors[len(calls) - 2]
+        return await real(symbol, side, amount)
+
+    monkeypatch.setattr(ex, "create_market_order", order)
+    return calls
+
+
+async def test_unwind_retries_only_errors_before_send(book, monkeypatch):
+    import ccxt.async_support as ccxt
+
+    a, b = _pair()
+    b.error_rate = 1.0
+    calls = _unwind_errors(monkeypatch, a, ccxt.RateLimitExceeded("429"))
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    await book.drain()
+    assert book.get(res["id"]).state == UNWOUND and calls == ["buy", "sell", "sell"]
+
+    # ответ потерян по сети — ордер мог исполниться: без повтора, в STUCK
+    calls = _unwind_errors(monkeypatch, a, ccxt.NetworkError("reset"))
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    await book.drain()
+    h = book.get(res["id"])
+    assert h.state == STUCK and h.unwind == {"error": "reset"} and calls == ["buy", "sell"]
+
+
+async def test_both_legs_rejected(book):
+    a, b = _pair(error_rate=1.0)
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    assert res["state"] == FAILED and not a.orders and not b.orders
+
+
+async def test_late_leg_settles_without_blocking(book):
+    a, b = _pair()
+    b.latency_ms = 200.0
+    ex = Executor(a, b, dry_run=False, leg_timeout=0.02)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    res = await ex.market_hedge("BTC/USDT", 0.01)
+    assert loop.time() - t0 < 0.15  # не ждём медленную ногу
+    assert res["state"] == LATE and book.list("active")[0]["id"] == res["id"]
+    await book.drain()
+    assert book.get(res["id"]).state == FILLED  # опоздавший ордер учтён, а не развёрнут
+
+
+async def test_each_leg_waits_its_own_timeout(book, monkeypatch):
+    a, b = _pair()
+    a.latency_ms = 100.0
+    b.latency_ms = 50.0
+    timeouts = {("sim_a", "buy"): 0.02, ("sim_b", "sell"): 1.0}
+    monkeypatch.setattr("engine.executor.leg_stats.timeout_for", lambda v, side: timeouts[(v, side)])
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    # покупка не уложилась в свои 20 мс, хотя продажа ждала дольше
+    assert res["state"] == LATE and res["buy"] == {"error": "buy_timeout"} and "error" not in res["sell"]
+    await book.drain()
+    assert book.get(res["id"]).state == FILLED
+
+async def test_leg_without_answer_is_stuck(book):
+    a, b = _pair()
+    b.latency_ms = 1000.0
+    ex = Executor(a, b, dry_run=False, leg_timeout=0.01, settle_timeout=0.05)
+    res = await ex.market_hedge("BTC/USDT", 0.01)
+    await book.drain()
+    h = book.get(res["id"])
+    assert h.state == STUCK and h.sell == {"error": "sell_timeout"}
+    assert [s for s, _ in h.history] == ["sent", LATE, STUCK]
+
+
+async def test_hedges_endpoint(aiohttp_client, book, monkeypatch):
+    from web.metrics import State, build_app
+    monkeypatch.setattr("web.metrics.hedges", book)
+    a, b = _pair()
+    res = await Executor(a, b, dry_run=False).market_hedge("BTC/USDT", 0.01)
+
+    client = await aiohttp_client(build_app(State(), clients=ClientRegistry(None, factory=lambda name, _: SimExchange(name))))
+    r = await client.get("/hedges")
+    js = await r.json()
+    assert js["ok"] and js["items"][0]["state"] == FILLED and js["stats"]["active"] == 0
+    r = await client.get(f"/hedges?id={res['id']}")
+    assert (await r.json())["item"]["buy_venue"] == "sim_a"
+    r = await client.get("/hedges?id=999")
+    assert r.status == 404
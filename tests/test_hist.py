@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from engine.executor import Executor, LegStats
+from exchanges.sim import SimExchange
+from utils.hist import Histogram
+
+
+def test_histogram_quantiles_within_bucket_error():
+    rng = random.Random(7)
+    xs = [rng.lognormvariate(1.5, 0.8) for _ in range(20_000)]
+    h = Histogram()
+    for x in xs:
+        h.add(x)
+    xs.sort()
+    for q in (0.5, 0.9, 0.99):
+        assert h.quantile(q) == pytest.approx(xs[int(q * len(xs)) - 1], rel=0.05)
+    assert h.max == xs[-1] and h.count == len(xs)
+    assert len(h.counts) < 600  # память не растёт с числом замеров
+
+
+def test_histogram_clamps_out_of_range():
+    h = Histogram(lo=1.0, hi=100.0)
+    for v in (0.0, 0.5, 1e6):
+        h.add(v)
+    assert h.counts[0] == 2 and h.counts[-1] == 1
+    assert h.snapshot()["max"] == 1e6
+
+
+async def test_executor_records_legs_timeouts_and_unwinds(monkeypatch):
+    stats = LegStats()
+    monkeypatch.setattr("engine.executor.leg_stats", stats)
+    fast = SimExchange("sim_fast", symbols=["BTC/USDT"], latency_ms=1.0)
+    slow = SimExchange("sim_slow", symbols=["BTC/USDT"], latency_ms=1.0)
+
+    await Executor(fast, slow, dry_run=False).market_hedge("BTC/USDT", 0.01)
+    snap = stats.snapshot()["legs"]
+    assert snap["sim_fast:buy"]["count"] == 1 and snap["sim_slow:sell"]["count"] == 1
+    assert 0 < snap["sim_fast:buy"]["p50_ms"] <= snap["sim_fast:buy"]["max_ms"]
+
+    # медленная продажа не укладывается в таймаут ноги
+    slow.latency_ms = 200.0
+    ex = Executor(fast, slow, dry_run=False, leg_timeout=0.05)
+    res = await ex.market_hedge("BTC/USDT", 0.01)
+    assert res["sell"] == {"error": "sell_timeout"}
+    assert stats.snapshot()["legs"]["sim_slow:sell"]["timeouts"] == 1
+
+
+def test_adaptive_timeout_follows_observed_p99():
+    stats = LegStats(floor_ms=100.0, cap_ms=5000.0, mult=3.0, min_samples=20)
+    assert stats.timeout_for("bybit", "buy") == 5.0  # замеров нет — потолок
+    for _ in range(100):
+        stats.ack("bybit", "buy", 40.0)
+    assert stats.timeout_for("bybit", "buy") == pytest.approx(0.12, rel=0.05)
+    for _ in range(100):
+        stats.ack("gate", "sell", 5.0)
+    assert stats.timeout_for("gate", "sell") == 0.1  # не ниже floor
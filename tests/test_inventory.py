@@ -0,0 +1,131 @@
+import pytest
+
+from config import Settings
+from engine.inventory import Inventory, inventory
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.sim import SimExchange
+from main import trade_once
+from web.metrics import State
+
+
+def _sims(usdt=1000.0, btc=1.0):
+    a = SimExchange("sim_a", symbols=["BTC/USDT"], mid=100.0, vol_bps=0,
+                    balances={"USDT": usdt, "BTC": btc})
+    b = SimExchange("sim_b", symbols=["BTC/USDT"], mid=101.0, vol_bps=0,
+                    balances={"USDT": usdt, "BTC": btc})
+    return a, b
+
+
+async def test_fills_move_balances_and_reconcile_agrees():
+    a, b = _sims()
+    inv = Inventory()
+    await inv.load([a, b])
+    assert inv.free("sim_a", "USDT") == 1000.0
+
+    o = await a.create_market_order("BTC/USDT", "buy", 0.5)
+    inv.on_fill(a, "BTC/USDT", "buy", 0.5, o)
+    assert inv.free("sim_a", "BTC") == pytest.approx(1.5)
+    assert inv.free("sim_a", "USDT") == pytest.approx(a.balances["USDT"])
+
+    await inv.load([a])
+    assert inv.drift["sim_a"] == pytest.approx(0.0, abs=1e-9)
+
+    # fast-path ответ без filled/cost — по запрошенному объёму и последнему ask
+    inv.on_fill(b, "BTC/USDT", "sell", 0.25, {"id": "1"})
+    assert inv.free("sim_b", "BTC") == pytest.approx(0.75)
+
+
+def test_can_hedge_checks_quote_and_base():
+    a, b = _sims(usdt=50.0, btc=0.1)
+    inv = Inventory()
+    inv.balances = {"sim_a": {"USDT": 50.0, "BTC": 0.1}, "sim_b": {"USDT": 50.0, "BTC": 0.1}}
+    assert inv.can_hedge(a, "BTC/USDT", b, "BTC/USDT", 0.2, 100.0) is False  # на sim_b 0.1 BTC
+    assert inv.can_hedge(a, "BTC/USDT", b, "BTC/USDT", 0.05, 100.0) is True
+    assert inv.can_hedge(a, "BTC/USDT", b, "BTC/USDT", 0.05, 2000.0) is False  # не хватает USDT
+    assert inv.blocked == 2
+    # биржа без загруженных балансов не блокирует
+    other = SimExchange("sim_c", symbols=["BTC/USDT"])
+    assert inv.can_hedge(other, "BTC/USDT", other, "BTC/USDT", 100.0, 100.0) is True
+
+
+async def test_shard_share_of_quote_balance():
+    a, b = _sims(usdt=1000.0, btc=1.0)
+    inv = Inventory()
+    inv.configure(quote_share=0.5)  # SHARDS=2: USDT общий, база — только у своего шарда
+    await inv.load([a, b])
+    assert inv.spendable("sim_a", "USDT") == pytest.approx(500.0)
+    assert inv.can_hedge(a, "BTC/USDT", b, "BTC/USDT", 0.9, 100.0) is True
+    assert inv.can_hedge(a, "BTC/USDT", b, "BTC/USDT", 6.0, 100.0) is False  # 600 > 500
+    # свои траты после сверки (400 + комиссия) — целиком из своей доли
+    inv.on_fill(a, "BTC/USDT", "buy", 4.0, {"filled": 4.0, "cost": 400.0})
+    assert inv.spendable("sim_a", "USDT") == pytest.approx(100.0 - 400.0 * a.taker_fee_bps / 1e4)
+    assert inv.free("sim_a", "USDT") - inv.spendable("sim_a", "USDT") == pytest.approx(500.0)
+
+async def test_reconcile_skips_stale_snapshot():
+    a, _ = _sims()
+    inv = Inventory()
+    await inv.load([a])
+    real = a.get_free_balance
+
+    async def slow_balance():
+        snap = await real()
+        # исполнение приходит, пока запрос баланса в пути
+        inv.on_fill(a, "BTC/USDT", "sell", 0.1, {"filled": 0.1, "cost": 10.0})
+        return snap
+
+    a.get_free_balance = slow_balance
+    await inv.load([a])
+    assert inv.free("sim_a", "BTC") == pytest.approx(0.9)
+
+
+async def test_reconcile_skips_while_order_in_flight():
+    a, _ = _sims()
+    inv = Inventory()
+    await inv.load([a])
+    inv.order_sent(a)
+    o = await a.create_market_order("BTC/USDT", "sell", 0.1)  # биржа исполнила, ответ ещё в пути
+    await inv.load([a])  # снапшот уже без 0.1 BTC — применять его нельзя
+    inv.on_fill(a, "BTC/USDT", "sell", 0.1, o)
+    inv.order_done(a)
+    assert inv.free("sim_a", "BTC") == pytest.approx(0.9)  # не 0.8
+    assert inv.stats()["skipped"] == 1
+    await inv.load([a])
+    assert inv.drift["sim_a"] == pytest.approx(0.0, abs=1e-9)
+
+
+async def test_ccxt_client_reports_free_not_total():
+    from exchanges.bybit import BybitClient
+
+    ex = BybitClient("", "", fast=False)
+
+    async def fetch_balance(params={}):
+        return {"free": {"USDT": 60.0, "BTC": None}, "used": {"USDT": 40.0},
+                "total": {"USDT": 100.0}}
+
+    ex.x.fetch_balance = fetch_balance
+    inv = Inventory()
+    try:
+        await inv.load([ex])
+        assert inv.free("bybit", "USDT") == 60.0  # 40 заняты в ордере
+    finally:
+        await ex.x.close()
+
+
+async def test_trade_once_respects_inventory():
+    a, b = _sims(btc=0.0)  # продавать на sim_b нечего
+    s = Settings(_env_file=None, symbols=["BTC/USDT"], dry_run=False, demo_mode=False)
+    st = State()
+    await inventory.load([a, b])
+    try:
+        await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1000))
+        assert st.total_trades == 0 and not a.orders and not b.orders
+
+        b.balances["BTC"] = 5.0
+        await inventory.load([b])
+        await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1000))
+        assert st.total_trades == 1
+        # память сдвинулась по исполнениям без запроса баланса
+        assert inventory.free("sim_b", "BTC") == pytest.approx(b.balances["BTC"])
+        assert inventory.free("sim_a", "BTC") == pytest.approx(a.balances["BTC"])
+    finally:
+        inventory.balances.clear()
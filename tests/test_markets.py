@@ -0,0 +1,68 @@
+import asyncio
+
+from exchanges.bybit import BybitClient
+from exchanges.markets import MarketsStore, markets_store
+
+
+def _markets(n):
+    return [{
+        "id": f"C{i}USDT", "symbol": f"C{i}/USDT", "base": f"C{i}", "quote": "USDT",
+        "baseId": f"C{i}", "quoteId": "USDT", "type": "spot", "spot": True, "active": True,
+        "precision": {"amount": 0.001, "price": 0.01},
+        "limits": {"amount": {"min": 0.001}, "cost": {"min": 5.0}},
+    } for i in range(n)]
+
+
+def _client(calls, n=3):
+    ex = BybitClient("", "")
+
+    async def fetch_markets(params={}):
+        calls.append(n)
+        return _markets(n)
+
+    async def fetch_currencies(params={}):
+        return {}
+
+    ex.x.fetch_markets = fetch_markets
+    ex.x.fetch_currencies = fetch_currencies
+    return ex
+
+
+async def test_cold_start_fetches_and_warm_start_reads_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(markets_store, "root", tmp_path)
+    monkeypatch.setattr(markets_store, "ttl", 3600.0)
+
+    calls = []
+    async with _client(calls) as ex:
+        assert ex.min_notional("C1/USDT") == 5.0
+    assert calls == [3]
+    assert (tmp_path / "bybit.json").exists()
+
+    async with _client(calls) as ex:
+        assert ex.lot_size("C2/USDT") == 0.001
+        # индексы ccxt восстановлены: id <-> symbol
+        assert ex.x.market_id("C1/USDT") == "C1USDT"
+        assert ex.x.safe_market("C2USDT")["symbol"] == "C2/USDT"
+    assert calls == [3]  # второй старт — без запроса маркетов
+
+
+async def test_stale_snapshot_refreshes_in_background(tmp_path):
+    now = [1000.0]
+    store = MarketsStore(root=str(tmp_path), ttl=60, clock=lambda: now[0])
+    calls = []
+    old = _client(calls, n=2)
+    await store.fetch(old)
+    await old.x.close()
+
+    now[0] += 120  # снапшот протух
+    ex = _client(calls, n=5)
+    await store.open(ex)
+    assert len(ex._markets) == 2  # стартовали со старого снапшота сразу
+    for _ in range(100):
+        if len(ex._markets) == 5:
+            break
+        await asyncio.sleep(0.01)
+    assert len(ex._markets) == 5
+    assert len(store.load("bybit")[1]) == 5
+    await store.close(ex)
+    await ex.x.close()
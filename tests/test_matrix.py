@@ -0,0 +1,77 @@
+import numpy as np
+
+import storage.journal_csv as jc
+from config import Settings
+from engine.matrix import best_pair, best_pairs, fx_rates
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.base import BaseExchange
+from main import trade_once
+from web.metrics import State
+
+
+def test_best_pair_picks_cheapest_ask_and_richest_bid():
+    i, j, s = best_pair([100, 103, 99], [101, 104, 100], [0, 0, 0])
+    assert (i, j) == (2, 1)
+    assert abs(s - 300.0) < 1e-9
+
+
+def test_best_pair_avoids_same_venue():
+    # у биржи 0 и лучший bid, и лучший ask: 104->101 хуже, чем 106->105
+    i, j, s = best_pair([105, 100, 101], [104, 106, 107], [0, 0, 0])
+    assert (i, j) == (1, 0)
+    assert best_pair([1.0], [2.0], [0])[0] == -1
+
+
+def test_best_pairs_matches_scalar_version():
+    rng = np.random.default_rng(3)
+    bids = rng.uniform(99, 101, (200, 4))
+    asks = bids + rng.uniform(-1.0, 1.5, (200, 4))
+    bids[5, 2] = 0.0  # нет котировки
+    fees = np.array([10, 10, 25, 5])
+    buy, sell, spread = best_pairs(bids, asks, fees, 10)
+    for k in range(200):
+        i, j, s = best_pair(bids[k], asks[k], fees, 10)
+        assert (buy[k], sell[k]) == (i, j)
+        assert abs(spread[k] - s) < 1e-9
+
+
+class Venue(BaseExchange):
+    def __init__(self, name, bid, ask, quote="USDT"):
+        self.name, self.bid, self.ask, self.quote_ccy = name, bid, ask, quote
+        self.taker_fee_bps = 0.0
+
+    async def get_orderbook(self, symbol):
+        if symbol == "USDT/KRW":
+            return {"bids": [[1399.0, 1e6]], "asks": [[1401.0, 1e6]]}
+        return {"bids": [[self.bid, 10.0]], "asks": [[self.ask, 10.0]]}
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {"id": "1"}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.0001
+    def price_step(self, symbol): return 0.01
+    def min_notional(self, symbol): return 0.0
+
+
+async def test_trade_once_over_three_venues_with_krw(tmp_path, monkeypatch):
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    fx_rates._rates.clear()
+    venues = [
+        Venue("m1", 100.0, 100.1),
+        Venue("m2", 100.0, 100.1),
+        Venue("mk", 1400.0 * 101.0, 1400.0 * 101.1, quote="KRW"),  # ~101 USDT
+    ]
+    s = Settings(_env_file=None, symbols=["BTC/USDT"], dry_run=True, demo_mode=False,
+                 spread_min_bps=30, slippage_bps=0, max_order_usd=50)
+    st = State()
+
+    for batch in (False, True):
+        s.batch_eval = batch
+        await trade_once(venues, s, st, AntiFlood(), DailyLimitUsd(1000))
+
+    rows = jc.read_last_trades(10)
+    assert st.total_trades == 2 and len(rows) == 2
+    assert {r["direction"] for r in rows} == {"buy_m1_sell_mk"}
+    assert abs(rows[0]["price_sell"] - 101.0) < 1e-9
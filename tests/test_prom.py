@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from config import Settings
+from engine.hedges import hedges
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.sim import SimExchange
+from exchanges.venues import ClientRegistry
+from utils.prom import Registry
+
+
+def test_histogram_buckets_are_cumulative_in_text_format():
+    reg = Registry()
+    h = reg.histogram("t_seconds", "test", ["venue"], buckets=(0.01, 0.1, 1.0))
+    child = h.labels('a"b')
+    for v in (0.005, 0.01, 0.05, 0.5, 3.0):
+        child.observe(v)
+    text = "\n".join(reg.render())
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{venue="a\\"b",le="0.01"} 2' in text  # le включает границу
+    assert 't_seconds_bucket{venue="a\\"b",le="0.1"} 3' in text
+    assert 't_seconds_bucket{venue="a\\"b",le="+Inf"} 5' in text
+    assert 't_seconds_count{venue="a\\"b"} 5' in text
+    assert child.sum == pytest.approx(3.565)
+    with pytest.raises(ValueError):
+        reg.counter("t_seconds", "dup")
+
+
+async def test_metrics_endpoint_serves_prometheus_and_json(aiohttp_client):
+    from web.metrics import State, build_app
+
+    s = Settings(_env_file=None, loop_lag_interval_ms=5)
+    client = await aiohttp_client(build_app(State(), settings=s, clients=ClientRegistry(None, factory=lambda name, _: SimExchange(name))))
+    await asyncio.sleep(0.05)
+    await client.get("/pnl")
+    r = await client.get("/metrics")
+    assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = await r.text()
+    assert "arb_trades_total 0" in text
+    assert 'arb_http_request_seconds_bucket{path="/pnl",le="+Inf"}' in text
+    assert "arb_event_loop_lag_seconds_count" in text
+    data = await (await client.get("/metrics?format=json")).json()
+    assert data["total_trades"] == 0 and "loop_lag_ms" in data
+
+
+async def test_success_counts_only_filled_hedges(tmp_path, monkeypatch):
+    import storage.journal_csv as jc
+    from engine.decision import evaluate_symbol
+    from web.metrics import State
+
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    a = SimExchange("sim_pa", symbols=["BTC/USDT"], mid=100.0, vol_bps=0)
+    b = SimExchange("sim_pb", symbols=["BTC/USDT"], mid=101.0, vol_bps=0)
+    s = Settings(_env_file=None, symbols=["BTC/USDT"], dry_run=False, demo_mode=False)
+    st, limit = State(), DailyLimitUsd(1e6)
+    ob_a, ob_b = await a.get_orderbook("BTC/USDT"), await b.get_orderbook("BTC/USDT")
+
+    await evaluate_symbol("BTC/USDT", ob_a, ob_b, a, b, s, st, AntiFlood(), limit)
+    await hedges.drain()
+    assert (st.total_trades, st.success_trades) == (1, 1)
+
+    b.error_rate = 1.0  # продажа отклонена — покупку разворачиваем, это не успех
+    await evaluate_symbol("BTC/USDT", ob_a, ob_b, a, b, s, st, AntiFlood(), limit)
+    await hedges.drain()
+    assert (st.total_trades, st.success_trades) == (2, 1)
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from engine.quotes import QuoteCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+class CountingExchange:
+    name = "x"
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+
+    async def get_orderbook(self, symbol):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("down")
+        return {"bids": [[float(self.calls), 1.0]], "asks": [[self.calls + 1.0, 1.0]]}
+
+
+async def test_concurrent_readers_share_one_fetch():
+    ex = CountingExchange()
+    cache = QuoteCache(max_age=1.0)
+
+    books = await asyncio.gather(*(cache.get(ex, "BTC/USDT") for _ in range(5)))
+
+    assert ex.calls == 1
+    assert all(b is books[0] for b in books)
+    assert cache.stats()["coalesced"] == 4
+
+
+async def test_fresh_hit_then_refetch_after_max_age():
+    ex, clock = CountingExchange(), Clock()
+    cache = QuoteCache(max_age=0.5, clock=clock)
+
+    await cache.get(ex, "BTC/USDT")
+    clock.t = 0.4
+    await cache.get(ex, "BTC/USDT")
+    assert ex.calls == 1
+
+    clock.t = 0.6
+    ob = await cache.get(ex, "BTC/USDT")
+    assert ex.calls == 2 and ob["bids"][0][0] == 2.0
+
+
+async def test_stale_fallback_is_bounded():
+    ex, clock = CountingExchange(), Clock()
+    cache = QuoteCache(max_age=0.5, max_stale=2.0, clock=clock)
+    await cache.get(ex, "BTC/USDT")
+    ex.fail = True
+
+    clock.t = 1.0
+    ob = await cache.get(ex, "BTC/USDT")
+    assert ob["bids"][0][0] == 1.0 and cache.stale == 1
+
+    clock.t = 5.0
+    with pytest.raises(RuntimeError):
+        await cache.get(ex, "BTC/USDT")
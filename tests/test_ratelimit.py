@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from exchanges.ratelimit import RateLimiter, wait_below
+
+
+async def test_orders_jump_ahead_of_queued_book_polls():
+    lim = RateLimiter("x", rate=50.0, burst=2.0)
+    order = []
+
+    async def call(endpoint, tag):
+        await lim.acquire(endpoint)
+        order.append(tag)
+
+    await call("fetch_order_book", "b0")
+    await call("fetch_order_book", "b1")  # ведро пустое
+    polls = [asyncio.create_task(call("fetch_order_book", f"b{i}")) for i in range(2, 7)]
+    await asyncio.sleep(0)
+    o = asyncio.create_task(call("create_order", "order"))
+    await asyncio.gather(o, *polls)
+    # ордер получил первый освободившийся токен, хотя стаканы ждали раньше
+    assert order[2] == "order"
+    assert order[3:] == ["b2", "b3", "b4", "b5", "b6"]
+    assert lim.granted == [1, 0, 7]
+
+
+async def test_weights_and_usage():
+    lim = RateLimiter("x", rate=10.0, burst=10.0, weights={"fetch_balance": 4.0})
+    assert lim.usage() == 0.0
+    await lim.acquire("fetch_balance")
+    await lim.acquire("load_markets")  # вес 5 по умолчанию
+    assert 0.85 < lim.usage() <= 0.9
+    t0 = time.monotonic()
+    waited = await wait_below([lim], soft=0.5)
+    assert 0.3 < waited < 0.6
+    assert lim.usage() <= 0.52
+    assert time.monotonic() - t0 < 1.0
+
+
+async def test_cancelled_waiter_releases_its_place():
+    lim = RateLimiter("x", rate=20.0, burst=1.0)
+    await lim.acquire("fetch_ticker")
+    slow = asyncio.create_task(lim.acquire("fetch_ticker"))
+    await asyncio.sleep(0)
+    slow.cancel()
+    await asyncio.gather(slow, return_exceptions=True)
+    await asyncio.wait_for(lim.acquire("fetch_ticker"), 1.0)
+    assert lim.stats()["queued"] == 0
+
+
+def test_shard_share_scales_venue_budget():
+    from exchanges import ratelimit
+
+    saved = dict(ratelimit.limiters)
+    ratelimit.limiters.clear()
+    try:
+        gate = ratelimit.limiter_for("gate")
+        ratelimit.configure_share(0.5)  # SHARDS=2: уже созданный лимитер тоже пересчитан
+        assert (gate.rate, gate.burst) == (7.5, 15.0) and gate.tokens <= 15.0
+        assert ratelimit.limiter_for("bybit").rate == 10.0
+    finally:
+        ratelimit.configure_share(1.0)
+        ratelimit.limiters.clear()
+        ratelimit.limiters.update(saved)
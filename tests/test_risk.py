@@ -0,0 +1,56 @@
+from engine.risk import NS, AntiFlood, DailyLimitUsd, RiskEngine
+
+
+class Clock:
+    def __init__(self, ns: int = 0) -> None:
+        self.ns = ns
+
+    def __call__(self) -> int:
+        return self.ns
+
+
+def test_antiflood_on_monotonic_clock():
+    c = Clock()
+    af = AntiFlood(seconds=2, clock_ns=c)
+    assert af.allow("BTC/USDT") and not af.allow("BTC/USDT")
+    c.ns += 2 * NS
+    assert af.allow("BTC/USDT")
+
+
+def test_daily_budget_rolls_over_at_utc_midnight():
+    c = Clock()
+    wall = 86_400 * 100 - 10.0  # за 10 с до полуночи UTC
+    lim = DailyLimitUsd(100.0, clock_ns=c, wall=lambda: wall)
+    lim.add(90.0)
+    assert not lim.can_spend(20.0)
+    c.ns += 9 * NS
+    assert not lim.can_spend(20.0)
+    c.ns += 1 * NS
+    assert lim.can_spend(100.0) and lim.spent == 0.0
+
+
+def test_exposure_cooldown_and_release():
+    c = Clock()
+    r = RiskEngine(1e6, max_symbol_usd=150.0, max_venue_usd=250.0, cooldown_s=1.0, clock_ns=c)
+    t1 = r.commit("BTC/USDT", "a", "b", 100.0)
+    assert r.check("BTC/USDT", "a", "b", 10.0) == "cooldown"
+    c.ns += NS
+    assert r.check("BTC/USDT", "a", "b", 100.0) == "symbol_exposure"
+    r.commit("ETH/USDT", "a", "c", 100.0)
+    assert r.check("SOL/USDT", "a", "d", 100.0) == "venue_exposure"  # на a уже 200
+    r.release(t1)
+    assert r.check("SOL/USDT", "a", "d", 100.0) is None
+    assert r.stats()["exposure_venue"] == {"a": 100.0, "c": 100.0}
+    assert r.rejects == {"cooldown": 1, "symbol_exposure": 1, "venue_exposure": 1}
+
+
+def test_sliding_order_window_and_daily_budget():
+    c = Clock()
+    r = RiskEngine(250.0, max_orders=4, window_s=1.0, clock_ns=c)
+    r.commit("A/USDT", "x", "y", 100.0)
+    c.ns += NS // 2
+    r.commit("B/USDT", "x", "y", 100.0)
+    assert r.check("C/USDT", "x", "y", 10.0) == "order_rate"  # 4 ордера в окне
+    c.ns += NS // 2  # первые два вышли из окна
+    assert r.check("C/USDT", "x", "y", 10.0) is None
+    assert r.check("C/USDT", "x", "y", 100.0) == "daily_budget"
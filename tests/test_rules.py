@@ -0,0 +1,49 @@
+from exchanges.bithumb import BithumbClient
+from exchanges.gate import GateClient
+from exchanges.rules import RulesIndex
+from web.metrics import choose_symbol_on_bithumb
+
+MARKETS = {
+    "BTC/USDT": {"base": "BTC", "precision": {"amount": 0.0001, "price": 2},
+                 "limits": {"amount": {"min": None}, "cost": {"min": 3.0}}},
+    "ETH/USDT": {"base": "ETH", "precision": {"amount": 0.001, "price": 0.05},
+                 "limits": {"amount": {"min": 0.01}, "cost": {}}},
+    "BTC/USDT:USDT": {"base": "BTC", "precision": {}, "limits": {}},
+}
+
+
+def test_rules_match_market_fields():
+    idx = RulesIndex(MARKETS)
+    btc, eth = idx.get("BTC/USDT"), idx.get("ETH/USDT")
+    assert (btc.lot, btc.tick, btc.min_cost, btc.min_amount) == (0.0001, 0.01, 3.0, 0.0)
+    assert (eth.lot, eth.tick, eth.min_cost, eth.min_amount) == (0.01, 0.05, 0.0, 0.01)
+    assert idx.get("BTC/USDT:USDT").lot == 0.000001
+
+
+def test_aliases_resolve_in_constant_time():
+    idx = RulesIndex(MARKETS)
+    for form in ("BTCUSDT", "btc-usdt", "BTC_USDT", "BTC/USDT"):
+        assert idx.resolve(form) == "BTC/USDT"
+        assert idx.get(form) is idx.rules["BTC/USDT"]
+    assert idx.resolve("DOGEUSDT") is None
+
+
+def test_client_rebuilds_index_when_markets_swapped():
+    ex = GateClient("", "")
+    ex._markets = MARKETS
+    assert ex.normalize_symbol("ETH_USDT") == "ETH/USDT"
+    assert ex.min_notional("BTCUSDT") == 3.0
+    ex._markets = {"SOL/USDT": {"base": "SOL", "limits": {"cost": {"min": 1.0}}}}
+    assert ex.min_notional("SOL-USDT") == 1.0
+    try:
+        ex.lot_size("BTC/USDT")
+        raise AssertionError("expected RuntimeError")
+    except RuntimeError:
+        pass
+
+
+def test_choose_symbol_by_base():
+    bh = BithumbClient("", "")
+    bh._markets = {"XRP/BTC": {"base": "XRP"}, "ETH/KRW": {"base": "ETH"}}
+    assert choose_symbol_on_bithumb(bh, "eth", "KRW") == "ETH/KRW"
+    assert choose_symbol_on_bithumb(bh, "xrp", "KRW") == "XRP/BTC"
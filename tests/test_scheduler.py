@@ -0,0 +1,79 @@
+import pytest
+
+from engine.scheduler import PollScheduler
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _sched(n=10, budget=5.0, clock=None):
+    return PollScheduler([f"S{i}/USDT" for i in range(n)], budget=budget, spread_min_bps=30,
+                         min_interval=0.2, max_interval=10.0, clock=clock or Clock())
+
+
+def test_hot_symbols_polled_more_often_within_budget():
+    sch = _sched()
+    for _ in range(20):
+        sch.observe("S0/USDT", 29.0)   # у порога
+        sch.observe("S1/USDT", 5.0)    # далеко, но волатилен
+        sch.observe("S1/USDT", 25.0)
+        for i in range(2, 10):
+            sch.observe(f"S{i}/USDT", -40.0)  # холодные и спокойные
+    sch.rebalance()
+    iv = {s: st.interval for s, st in sch.stats.items()}
+    assert iv["S0/USDT"] < iv["S1/USDT"] < iv["S5/USDT"] == pytest.approx(10.0)
+    assert sum(1 / v for v in iv.values()) == pytest.approx(5.0)  # бюджет выбран целиком
+
+    sch.budget = 50.0  # бюджета с запасом — горячий упирается в min_interval
+    sch.rebalance()
+    assert sch.stats["S0/USDT"].interval == pytest.approx(0.2)
+    assert sum(1 / st.interval for st in sch.stats.values()) <= 50.0 + 1e-9
+
+
+def test_budget_below_floor_is_split_evenly():
+    sch = _sched(n=100, budget=2.0)
+    assert all(st.interval == pytest.approx(50.0) for st in sch.stats.values())
+
+
+def test_due_follows_intervals():
+    c = Clock()
+    sch = _sched(n=3, budget=1.0, clock=c)
+    assert sorted(sch.due()) == ["S0/USDT", "S1/USDT", "S2/USDT"]  # все сразу
+    assert sch.due() == []
+    for _ in range(10):
+        sch.observe("S0/USDT", 30.0)
+        sch.observe("S1/USDT", -100.0)
+        sch.observe("S2/USDT", -100.0)
+    sch.rebalance()
+    c.t = sch.stats["S0/USDT"].interval
+    assert sch.due() == ["S0/USDT"]
+    assert sch.next_in() == pytest.approx(sch.stats["S0/USDT"].interval)
+    assert sch.snapshot()["planned_polls_per_s"] <= 1.0 + 1e-9
+
+
+async def test_run_adaptive_polls_within_budget():
+    import asyncio
+
+    from config import Settings
+    from engine.risk import AntiFlood, DailyLimitUsd
+    from exchanges.sim import SimExchange
+    from main import run_adaptive
+    from web.metrics import State
+
+    syms = ["A/USDT", "B/USDT", "C/USDT"]
+    a = SimExchange("sim_a", symbols=syms, vol_bps=0)
+    b = SimExchange("sim_b", symbols=syms, vol_bps=0)
+    s = Settings(_env_file=None, symbols=syms, poll_budget_rps=20, poll_min_ms=50, poll_max_ms=1000)
+    st, stop = State(), asyncio.Event()
+    task = asyncio.create_task(run_adaptive([a, b], s, st, AntiFlood(), DailyLimitUsd(1e9), stop))
+    await asyncio.sleep(0.5)
+    stop.set()
+    await task
+    polls = sum(x.polls for x in st.poller.stats.values())
+    assert 3 <= polls <= 3 + 10 * 0.5 + 3  # старт + бюджет 10 опросов символа/с
+    assert set(st.last_spread) == set(syms)
@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+
+from engine.risk import SharedBudget, SharedRiskEngine
+from engine.shards import Supervisor, split_symbols
+from utils.prom import Registry
+
+
+def test_split_symbols_round_robin():
+    syms = ["A", "B", "C", "D", "E"]
+    assert split_symbols(syms, 2) == [["A", "C", "E"], ["B", "D"]]
+    assert split_symbols(syms, 10) == [[s] for s in syms]  # шардов не больше символов
+    assert split_symbols(syms, 0) == [syms]
+
+
+def _spend(budget, n):
+    risk = SharedRiskEngine(budget)
+    for i in range(n):
+        if risk.check(f"S{i}", "a", "b", 10.0) is None:
+            risk.commit(f"S{i}", "a", "b", 10.0)
+
+
+def test_shared_budget_across_processes():
+    ctx = multiprocessing.get_context("spawn")
+    budget = SharedBudget(1000.0, ctx)
+    procs = [ctx.Process(target=_spend, args=(budget, 30)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert [p.exitcode for p in procs] == [0, 0, 0]
+    risk = SharedRiskEngine(budget)
+    assert risk.stats()["daily_spent_usd"] == 900.0  # списания всех процессов
+    assert risk.check("X", "a", "b", 150.0) == "daily_budget"
+    assert risk.check("X", "a", "b", 100.0) is None
+
+
+def test_registry_merge_sums_counters_and_histograms():
+    shards = []
+    for k in range(2):
+        reg = Registry()
+        reg.histogram("lat_seconds", "l", ["venue"], buckets=(0.1, 1.0)).labels("gate").observe(0.05 * (k + 1))
+        reg.counter("req_total", "r").inc(3)
+        reg.gauge("lag_seconds", "g").set(0.5 * k)
+        shards.append(reg.dump())
+    agg = Registry()
+    for k, d in enumerate(shards):
+        agg.merge(d, str(k))
+    text = "\n".join(agg.render())
+    assert 'lat_seconds_bucket{venue="gate",le="0.1"} 2' in text
+    assert 'lat_seconds_count{venue="gate"} 2' in text
+    assert "req_total 6" in text
+    assert 'lag_seconds{shard="0"} 0' in text and 'lag_seconds{shard="1"} 0.5' in text
+
+
+async def test_supervisor_runs_shards_with_shared_limit(aiohttp_client):
+    from config import Settings
+    from web.metrics import build_supervisor_app
+
+    # демо-сделка на каждом символе, бюджет — на две сделки по 100 на все шарды
+    s = Settings(_env_file=None, venues=["sim_a", "sim_b"], symbols=["A/USDT", "B/USDT", "C/USDT", "D/USDT"],
+                 shards=2, dry_run=True, demo_mode=True, daily_limit_usd=250.0, sim_latency_ms=0,
+                 sim_jitter_ms=0, shard_report_sec=0.1, record_books=False, hft_enabled=False)
+    sup = Supervisor(s)
+    assert sup.groups == [["A/USDT", "C/USDT"], ["B/USDT", "D/USDT"]]
+    stop = asyncio.Event()
+    task = asyncio.create_task(sup.run(stop))
+    client = await aiohttp_client(build_supervisor_app(sup))
+    for _ in range(200):
+        await asyncio.sleep(0.1)
+        if len(sup.last) == 2 and sup.snapshot()["total_trades"] >= 2:
+            break
+    await asyncio.sleep(0.3)
+    data = await (await client.get("/metrics?format=json")).json()
+    text = await (await client.get("/metrics")).text()
+    stop.set()
+    await task
+
+    assert [x["symbols"] for x in data["shards"]] == sup.groups
+    assert all(x["alive"] for x in data["shards"])
+    assert data["total_trades"] == 2 and data["risk"]["daily_spent_usd"] == 200.0
+    assert 'arb_risk_rejects_total{reason="daily_budget"}' in text
+    assert "arb_trades_total 2" in text and 'arb_shard_up{shard="1"} 1' in text
+    assert "arb_cycle_seconds_count" in text
+    assert not any(p.is_alive() for p in sup.procs)
@@ -0,0 +1,60 @@
+import ccxt.async_support as ccxt
+import pytest
+
+from config import Settings
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.sim import SimExchange
+from exchanges.venues import make_client
+from main import trade_once
+from web.metrics import State
+
+
+async def test_market_order_walks_book_and_settles():
+    ex = SimExchange(symbols=["BTC/USDT"], mid=100.0, vol_bps=0, level_qty=1.0,
+                     balances={"USDT": 1000.0, "BTC": 0.0})
+    ob = await ex.get_orderbook("BTC/USDT")
+    a0, a1 = ob["asks"][0][0], ob["asks"][1][0]
+
+    o = await ex.create_market_order("BTC/USDT", "buy", 1.5)
+    assert o["status"] == "closed" and o["filled"] == pytest.approx(1.5)
+    assert o["cost"] == pytest.approx(a0 + 0.5 * a1)
+    assert ex.balances["BTC"] == pytest.approx(1.5)
+    assert ex.balances["USDT"] == pytest.approx(1000.0 - o["cost"] - o["fee"]["cost"])
+    # съеденный уровень ушёл из стакана до следующего обновления
+    assert ex.book("BTC/USDT")["asks"][0] == [a1, pytest.approx(0.5)]
+
+    with pytest.raises(ccxt.InsufficientFunds):
+        await ex.create_market_order("BTC/USDT", "sell", 5.0)
+
+
+async def test_partial_fills_and_injected_errors():
+    ex = SimExchange(symbols=["ETH/USDT"], partial_rate=1.0, seed=1)
+    o = await ex.create_market_order("ETH/USDT", "sell", 1.0)
+    assert o["status"] == "canceled" and 0 < o["filled"] < 1.0
+    assert o["remaining"] == pytest.approx(1.0 - o["filled"])
+
+    bad = SimExchange(symbols=["ETH/USDT"], error_rate=1.0)
+    with pytest.raises(ccxt.NetworkError):
+        await bad.get_orderbook("ETH/USDT")
+    assert bad.stats()["errors"] == 1
+
+
+def test_selectable_from_settings():
+    s = Settings(_env_file=None, venues="sim_a,sim_b", symbols=["BTC/USDT"], sim_latency_ms=1.0)
+    a, b = (make_client(n, s) for n in s.venues)
+    assert isinstance(a, SimExchange) and (a.name, b.name) == ("sim_a", "sim_b")
+    assert a.latency_ms == 1.0 and a.lot_size("BTC/USDT") == 0.0001
+
+
+async def test_trade_once_hedges_on_simulated_venues():
+    a = SimExchange("sim_a", symbols=["BTC/USDT"], mid=100.0, vol_bps=0)
+    b = SimExchange("sim_b", symbols=["BTC/USDT"], mid=101.0, vol_bps=0)
+    s = Settings(_env_file=None, symbols=["BTC/USDT"], dry_run=False, demo_mode=False)
+    st = State()
+
+    await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1000))
+
+    assert st.total_trades == 1
+    assert [o["side"] for o in a.orders] == ["buy"]
+    assert [o["side"] for o in b.orders] == ["sell"]
+    assert a.orders[0]["filled"] == pytest.approx(b.orders[0]["filled"])
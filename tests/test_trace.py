@@ -0,0 +1,62 @@
+import storage.journal_csv as jc
+from config import Settings
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.sim import SimExchange
+from exchanges.venues import ClientRegistry
+from utils.trace import NULL, Trace, Tracer
+
+
+def test_tracer_sums_stages_and_keeps_slowest():
+    tracer = Tracer(keep=3, slow_ms=5.0)
+    for i, ms in enumerate((1, 9, 3, 7, 20)):
+        tr = Trace("decision", f"S{i}", t0=0)  # t0=0: total — всё время процесса, выше порога
+        tr.add("fetch:a", 0, ms * 1_000_000)
+        tr.add("rules", 0, 100_000)
+        tr.add("rules", 0, 100_000)  # повтор стадии суммируется в одно наблюдение
+        tracer.finish(tr)
+    stages = tracer.snapshot()["decision"]
+    assert stages["fetch:a"]["count"] == 5 and stages["rules"]["count"] == 5
+    assert abs(stages["rules"]["max"] - 0.2) < 1e-9
+    assert len(tracer.slowest()) == 3  # кольцо на keep решений
+
+
+def test_slow_buffer_uses_p90_and_disabled_tracer_is_free():
+    tracer = Tracer(keep=100)
+    for _ in range(200):
+        tracer.finish(tracer.start("cycle"))
+    assert len(tracer.slow) < 100  # после разгона — только хвост выше p90
+    off = Tracer(enabled=False)
+    tr = off.start("cycle")
+    tr.mark("fx")
+    off.finish(tr)
+    assert tr is NULL and not off.stages and not NULL.spans
+
+
+async def test_trade_once_traces_every_stage(tmp_path, monkeypatch, aiohttp_client):
+    from main import trade_once
+    from web.metrics import State, build_app
+
+    tracer = Tracer(keep=10, slow_ms=0.0)
+    monkeypatch.setattr("main.tracer", tracer)
+    monkeypatch.setattr("web.metrics.tracer", tracer)
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    syms = ["BTC/USDT", "ETH/USDT"]
+    a = SimExchange("sim_ta", symbols=syms, latency_ms=1.0, jitter_ms=0)
+    b = SimExchange("sim_tb", symbols=syms, latency_ms=1.0, jitter_ms=0)
+    s = Settings(_env_file=None, symbols=syms, dry_run=True, demo_mode=True)
+    await trade_once([a, b], s, State(), AntiFlood(), DailyLimitUsd(1e9))
+
+    stages = tracer.snapshot()
+    assert {"rate_wait", "fx", "symbols", "total"} <= set(stages["cycle"])
+    for stage in ("fetch:sim_ta", "fetch:sim_tb", "queue", "spread", "rules", "risk", "normalize",
+                  "execute", "journal", "total"):
+        assert stages["decision"][stage]["count"] == 2, stage
+    assert stages["decision"]["fetch:sim_ta"]["p50"] >= 0.5  # задержка симулятора, мс
+
+    client = await aiohttp_client(build_app(State(), clients=ClientRegistry(None, factory=lambda name, _: SimExchange(name))))
+    data = await (await client.get("/trace?kind=decision&limit=5")).json()
+    assert set(data["stages"]) == {"decision"}
+    top = data["slowest"]
+    assert top and top[0]["total_ms"] >= top[-1]["total_ms"]
+    assert top[0]["outcome"] == "dry" and top[0]["key"] in syms
+    assert top[0]["spans"][0]["stage"].startswith("fetch:")
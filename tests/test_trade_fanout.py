@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import engine.feeder as feeder
+from config import Settings
+from engine.feeder import fetch_books
+from engine.quotes import QuoteCache
+from engine.risk import AntiFlood, DailyLimitUsd
+from exchanges.base import BaseExchange
+from main import trade_once
+from web.metrics import State
+
+
+@pytest.fixture
+def fresh_quotes(monkeypatch):
+    # общий кэш стаканов процесса хранит книги других тестов под теми же именами бирж
+    cache = QuoteCache()
+    monkeypatch.setattr(feeder, "quotes", cache)
+    return cache
+
+
+class SlowExchange(BaseExchange):
+    def __init__(self, name: str, latency: float) -> None:
+        self.name = name
+        self.latency = latency
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def get_orderbook(self, symbol):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+            if symbol == "BAD/USDT":
+                raise RuntimeError("boom")
+            return {"bids": [[100.0, 1.0]], "asks": [[100.1, 1.0]]}
+        finally:
+            self.inflight -= 1
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.001
+    def price_step(self, symbol): return 0.01
+    def min_notional(self, symbol): return 0.0
+
+
+async def test_fetch_books_caps_concurrency_per_venue(fresh_quotes):
+    a, b = SlowExchange("a", 0.02), SlowExchange("b", 0.02)
+    syms = [f"S{i}/USDT" for i in range(10)] + ["BAD/USDT"]
+
+    got = {}
+    async for sym, books, err in fetch_books([a, b], syms, concurrency=3):
+        got[sym] = (books, err)
+
+    assert set(got) == set(syms)
+    assert isinstance(got["BAD/USDT"][1], RuntimeError)
+    assert len(got["S0/USDT"][0]) == 2
+    assert a.max_inflight == 3 and b.max_inflight == 3
+
+
+async def test_trade_once_is_concurrent_and_reports_cycle_time(fresh_quotes):
+    a, b = SlowExchange("a", 0.05), SlowExchange("b", 0.05)
+    s = Settings(_env_file=None, symbols=[f"S{i}/USDT" for i in range(10)],
+                 dry_run=True, demo_mode=False, fetch_concurrency=10)
+    st = State()
+
+    await trade_once([a, b], s, st, AntiFlood(), DailyLimitUsd(1000))
+
+    # последовательно было бы 20 * 50ms = 1s
+    assert 0 < st.last_cycle_ms < 500
+    assert st.total_trades == 0
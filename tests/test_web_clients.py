@@ -0,0 +1,82 @@
+import asyncio
+
+import storage.journal_csv as jc
+import storage.positions_csv as pc
+from config import Settings
+from engine.quotes import quotes
+from exchanges.base import BaseExchange
+from exchanges.venues import ClientRegistry
+from web.metrics import State, build_app, web_client_names
+
+
+class Client(BaseExchange):
+    opened = 0
+    closed = 0
+
+    def __init__(self, name):
+        self.name = name
+        self._markets = {"BTC/KRW": {"limits": {"amount": {"min": 0.0001}}}}
+
+    async def __aenter__(self):
+        await asyncio.sleep(0.05)  # load_markets
+        Client.opened += 1
+        return self
+
+    async def close(self):
+        Client.closed += 1
+
+    async def get_orderbook(self, symbol):
+        return {"bids": [[158_780_000.0, 1.0]], "asks": [[158_800_000.0, 1.0]]}
+
+    async def get_ticker(self, symbol): return {}
+    async def get_balance(self): return {}
+    async def create_market_order(self, symbol, side, amount): return {"id": "1"}
+    async def cancel_order(self, order_id, symbol): return None
+    def normalize_symbol(self, common): return common
+    def lot_size(self, symbol): return 0.0001
+    def price_step(self, symbol): return 1.0
+    def min_notional(self, symbol): return 0.0
+
+
+async def test_registry_opens_each_client_once():
+    Client.opened = Client.closed = 0
+    reg = ClientRegistry(None, factory=lambda name, s: Client(name))
+    got = await asyncio.gather(*(reg.get("gate") for _ in range(5)))
+    assert all(ex is got[0] for ex in got)
+    assert Client.opened == 1
+    await reg.close()
+    assert Client.closed == 1
+    assert reg.peek("gate") is None
+
+
+async def test_simulate_news_reuses_app_clients(aiohttp_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(jc, "CSV_PATH", tmp_path / "trades.csv")
+    monkeypatch.setattr(pc, "FILE", tmp_path / "open_positions.csv")
+    quotes._books.clear()
+    Client.opened = Client.closed = 0
+    s = Settings(_env_file=None, dry_run=True, bithumb_api_key="k", bithumb_api_secret="x")
+    reg = ClientRegistry(s, factory=lambda name, _: Client(name))
+    client = await aiohttp_client(build_app(State(), settings=s, clients=reg))
+
+    for _ in range(3):
+        r = await client.get("/simulate_news?ticker=BTC&quote=KRW&budget=5000000")
+        assert (await r.json())["ok"] is True
+    # bithumb + прогрев gate/bybit — по одному разу на всё приложение
+    assert Client.opened == 3
+    for path in ("/wp-login.php", "/.env", "/admin/x"):
+        await client.get(path)
+    data = await (await client.get("/metrics?format=json")).json()
+    assert data["http"]["/simulate_news"]["count"] == 3
+    assert data["http"]["unmatched"]["count"] == 3  # сканер не плодит ключи
+    assert "/.env" not in data["http"]
+
+    await client.close()
+    assert Client.closed == 3
+
+
+def test_warm_up_only_live_venues():
+    assert web_client_names(None) == []
+    assert web_client_names(Settings(_env_file=None, venues=["sim_a", "sim_b"])) == []
+    assert web_client_names(Settings(_env_file=None, venues=["gate"])) == ["gate"]
+    s = Settings(_env_file=None, venues=["bybit", "gate"], bithumb_api_key="k")
+    assert web_client_names(s) == ["bithumb", "bybit", "gate"]
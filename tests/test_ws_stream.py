@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from exchanges.bybit import BybitClient
+from exchanges.stream import BybitBookStream, GateBookStream
+from exchanges.ws_standin import StandInServer
+
+
+async def wait_for(cond, timeout: float = 5.0):
+    for _ in range(int(timeout / 0.01)):
+        v = cond()
+        if v:
+            return v
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+@pytest.mark.parametrize("venue, cls", [("bybit", BybitBookStream), ("gate", GateBookStream)])
+async def test_snapshot_and_deltas(venue, cls):
+    srv = StandInServer(venue)
+    url = await srv.start()
+    st = cls(url=url)
+    st.subscribe(["BTC/USDT"])
+    st.start()
+    try:
+        await srv.wait_subscribed("BTC/USDT")
+        await srv.snapshot("BTC/USDT", [[100, 1], [99, 2]], [[101, 1], [102, 3]])
+        await srv.delta("BTC/USDT", [[100, 0], [99.5, 4]], [[100.5, 0.5]])
+
+        ob = await wait_for(lambda: (st.get("BTC/USDT") or {}).get("nonce") == 1002
+                            and st.get("BTC/USDT"))
+        assert ob["bids"] == [[99.5, 4.0], [99.0, 2.0]]
+        assert ob["asks"][0] == [100.5, 0.5]
+    finally:
+        await st.stop()
+        await srv.stop()
+
+
+@pytest.mark.parametrize("venue, cls", [("bybit", BybitBookStream), ("gate", GateBookStream)])
+async def test_gap_triggers_resubscribe(venue, cls):
+    srv = StandInServer(venue)
+    url = await srv.start()
+    st = cls(url=url)
+    st.subscribe(["ETH/USDT"])
+    st.start()
+    try:
+        await srv.wait_subscribed("ETH/USDT")
+        await srv.snapshot("ETH/USDT", [[10, 1]], [[11, 1]])
+        await wait_for(lambda: st.get("ETH/USDT"))
+        await srv.delta("ETH/USDT", [[10, 2]], [], gap=True)
+
+        await srv.wait_subscribed("ETH/USDT", count=2)
+        assert st.resyncs == 1
+        assert st.get("ETH/USDT") is None
+    finally:
+        await st.stop()
+        await srv.stop()
+
+
+async def test_reconnect_resubscribes():
+    srv = StandInServer("bybit")
+    url = await srv.start()
+    st = BybitBookStream(url=url, reconnect_min=0.01)
+    st.subscribe(["BTC/USDT"])
+    st.start()
+    try:
+        await srv.wait_subscribed("BTC/USDT")
+        await srv.snapshot("BTC/USDT", [[100, 1]], [[101, 1]])
+        await wait_for(lambda: st.get("BTC/USDT"))
+
+        await srv.drop()
+        await srv.wait_subscribed("BTC/USDT", count=2)
+        assert st.reconnects >= 1
+        await srv.snapshot("BTC/USDT", [[200, 1]], [[201, 1]])
+        ob = await wait_for(lambda: st.get("BTC/USDT"))
+        assert ob["bids"][0][0] == 200.0
+    finally:
+        await st.stop()
+        await srv.stop()
+
+
+async def test_client_serves_book_from_memory():
+    srv = StandInServer("bybit")
+    url = await srv.start()
+    client = BybitClient("", "", stream=True, ws_url=url)
+
+    async def no_rest(*a, **kw):
+        raise AssertionError("REST must not be called")
+
+    try:
+        client.watch(["BTC/USDT"])
+        await srv.wait_subscribed("BTC/USDT")
+        await srv.snapshot("BTC/USDT", [[100, 1]], [[101, 1]])
+        await wait_for(lambda: client.stream.get("BTC/USDT"))
+        client.x.fetch_order_book = no_rest
+
+        ob = await client.get_orderbook("BTC/USDT")
+        assert ob["bids"][0] == [100.0, 1.0]
+    finally:
+        await client.close()
+        await srv.stop()
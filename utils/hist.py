@@ -0,0 +1,49 @@
+import math
+from typing import Dict, List
+
+
+class Histogram:
+    """
+    Гистограмма с логарифмическими корзинами и фиксированной памятью:
+    sub корзин на каждую степень двойки между lo и hi (sub=16 — ошибка
+    квантиля ~2%). Значения ниже lo попадают в первую корзину, выше hi — в
+    последнюю; точный max хранится отдельно.
+    """
+    __slots__ = ("lo", "sub", "counts", "count", "total", "max")
+
+    def __init__(self, lo: float = 0.001, hi: float = 60_000.0, sub: int = 16) -> None:
+        self.lo = lo
+        self.sub = sub
+        self.counts: List[int] = [0] * (int(math.log2(hi / lo) * sub) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, v: float) -> None:
+        i = int(math.log2(v / self.lo) * self.sub) if v > self.lo else 0
+        self.counts[min(i, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                # середина корзины в логарифмической шкале
+                return min(self.lo * 2 ** ((i + 0.5) / self.sub), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "p50": round(self.quantile(0.50), 3),
+            "p90": round(self.quantile(0.90), 3),
+            "p99": round(self.quantile(0.99), 3),
+            "max": round(self.max, 3),
+        }
@@ -0,0 +1,271 @@
+import asyncio
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# границы корзин по умолчанию, секунды: от 0.5 мс до 10 с
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# спред, б.п.: отрицательные — обычное состояние рынка, интересен хвост у порога
+SPREAD_BUCKETS = (-100.0, -50.0, -20.0, -10.0, -5.0, 0.0, 5.0, 10.0, 20.0,
+                  30.0, 50.0, 100.0, 200.0, 500.0)
+
+Labels = Tuple[str, ...]
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if v != v:
+        return "NaN"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+
+class HistogramChild:
+    """
+    Корзины Prometheus: границы фиксированы при создании, observe — bisect
+    и инкремент в готовом списке, без блокировок и новых объектов. Накопительные
+    суммы (le) считаются только при выдаче.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последняя — +Inf
+        self.sum = 0.0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class _Family(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, object] = {}
+
+    @abstractmethod
+    def _new(self) -> object: ...
+
+    def labels(self, *values: str):
+        """Дочерняя серия; на горячем пути её лучше держать ссылкой."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new()
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_fmt(child.value)}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, n: float = 1.0) -> None:
+        self.labels().inc(n)
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, v: float) -> None:
+        self.labels().set(v)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, v: float) -> None:
+        self.labels().observe(v)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            acc = 0
+            for le, c in zip(self.buckets + (math.inf,), child.counts):
+                acc += c
+                le_label = 'le="' + _fmt(le) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le_label)} {acc}"
+            base = _labels(self.labelnames, values)
+            yield f"{self.name}_sum{base} {_fmt(child.sum)}"
+            yield f"{self.name}_count{base} {acc}"
+
+
+class Registry:
+    """Метрики процесса в текстовом формате Prometheus (/metrics)."""
+
+    def __init__(self) -> None:
+        self.families: Dict[str, _Family] = {}
+
+    def _add(self, fam: _Family) -> _Family:
+        if fam.name in self.families:
+            raise ValueError(f"metric {fam.name} already registered")
+        self.families[fam.name] = fam
+        return fam
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """Снимок серий для передачи в другой процесс (шарды -> супервизор), только примитивы."""
+        out = []
+        for fam in self.families.values():
+            if not fam._children:
+                continue
+            d: Dict[str, Any] = {"name": fam.name, "kind": fam.kind, "help": fam.help,
+                                 "labels": list(fam.labelnames)}
+            if isinstance(fam, Histogram):
+                d["buckets"] = list(fam.buckets)
+                d["series"] = [[list(v), list(c.counts), c.sum] for v, c in fam._children.items()]
+            else:
+                d["series"] = [[list(v), c.value] for v, c in fam._children.items()]
+            out.append(d)
+        return out
+
+    def merge(self, dump: List[Dict[str, Any]], shard: str) -> None:
+        """
+        Сложить снимок шарда: счётчики и корзины гистограмм суммируются по всем
+        шардам, gauge — своя серия на шард (метка shard).
+        """
+        for d in dump:
+            fam = self.families.get(d["name"])
+            names = d["labels"] + (["shard"] if d["kind"] == "gauge" else [])
+            if fam is None:
+                if d["kind"] == "histogram":
+                    fam = self.histogram(d["name"], d["help"], names, d["buckets"])
+                elif d["kind"] == "counter":
+                    fam = self.counter(d["name"], d["help"], names)
+                else:
+                    fam = self.gauge(d["name"], d["help"], names)
+            for ser in d["series"]:
+                values = tuple(ser[0])
+                if d["kind"] == "histogram":
+                    child = fam.labels(*values)
+                    if len(child.counts) != len(ser[1]):
+                        continue  # у шарда другие корзины — не складываем
+                    for k, c in enumerate(ser[1]):
+                        child.counts[k] += c
+                    child.sum += ser[2]
+                elif d["kind"] == "counter":
+                    fam.labels(*values).inc(ser[1])
+                else:
+                    fam.labels(*values, shard).set(ser[1])
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        for fam in self.families.values():
+            if fam._children:
+                lines.extend(fam.render())
+        return lines
+
+
+def snapshot_family(name: str, kind: str, help: str, samples: Dict[Labels, float],
+                    labelnames: Sequence[str] = ()) -> List[str]:
+    """Серия из готового снимка (счётчики State, кэш стаканов, риск) — считается при выдаче."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for values, v in samples.items():
+        lines.append(f"{name}{_labels(labelnames, values)} {_fmt(v)}")
+    return lines
+
+
+async def watch_loop_lag(hist: HistogramChild, last: GaugeChild, interval: float = 0.1) -> None:
+    """Задержка event loop: насколько sleep(interval) проснулся позже срока."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - t0 - interval, 0.0)
+        hist.observe(lag)
+        last.set(lag)
+
+
+# метрики процесса; дочерние серии без меток берутся один раз — на горячем пути только observe
+registry = Registry()
+fetch_seconds = registry.histogram(
+    "arb_orderbook_fetch_seconds", "REST order book fetch latency (cache misses)", ["venue"])
+spread_bps = registry.histogram(
+    "arb_spread_bps", "Best net spread per evaluated symbol, bps", buckets=SPREAD_BUCKETS).labels()
+execution_seconds = registry.histogram(
+    "arb_execution_seconds", "market_hedge wall time until both legs answered or timed out").labels()
+cycle_seconds = registry.histogram(
+    "arb_cycle_seconds", "trade_once cycle duration").labels()
+order_ack_seconds = registry.histogram(
+    "arb_order_ack_seconds", "Order send -> exchange answer per hedge leg", ["venue", "side"])
+http_seconds = registry.histogram(
+    "arb_http_request_seconds", "HTTP handler duration", ["path"])
+loop_lag_seconds = registry.histogram(
+    "arb_event_loop_lag_seconds", "How late the event loop woke a periodic sleep",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)).labels()
+loop_lag_last = registry.gauge(
+    "arb_event_loop_lag_last_seconds", "Last measured event loop lag").labels()
@@ -0,0 +1,133 @@
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils.hist import Histogram
+
+
+class Trace:
+    """
+    Разбивка одного решения по стадиям, perf_counter_ns. mark(stage) — стадия
+    от предыдущей отметки до сейчас (последовательные шаги); add — явный
+    интервал (параллельные запросы стаканов перекрываются).
+    """
+    __slots__ = ("kind", "key", "t0", "last", "spans", "outcome")
+
+    def __init__(self, kind: str, key: str = "", t0: Optional[int] = None) -> None:
+        self.kind = kind
+        self.key = key
+        self.t0 = t0 if t0 is not None else time.perf_counter_ns()
+        self.last = self.t0
+        self.spans: List[Tuple[str, int, int]] = []  # (стадия, начало от t0, длительность), нс
+        self.outcome = ""
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter_ns()
+        self.spans.append((stage, self.last - self.t0, now - self.last))
+        self.last = now
+
+    def add(self, stage: str, start_ns: int, end_ns: int) -> None:
+        self.spans.append((stage, start_ns - self.t0, end_ns - start_ns))
+        if end_ns > self.last:
+            self.last = end_ns
+
+    def to_dict(self, total_ns: int) -> Dict[str, Any]:
+        return {
+            "kind": self.kind, "key": self.key, "outcome": self.outcome,
+            "total_ms": round(total_ns / 1e6, 3),
+            "spans": [{"stage": s, "at_ms": round(at / 1e6, 3), "ms": round(d / 1e6, 3)}
+                      for s, at, d in self.spans],
+        }
+
+
+class _NullTrace(Trace):
+    # трассировка выключена или решение вне трассы: отметки ничего не стоят
+    def __init__(self) -> None:
+        super().__init__("", t0=0)
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def add(self, stage: str, start_ns: int, end_ns: int) -> None:
+        pass
+
+
+NULL = _NullTrace()
+
+# трасса текущего решения: стадии внутри evaluate_symbol пишутся без передачи аргументом
+current: ContextVar[Trace] = ContextVar("trace", default=NULL)
+
+
+class Tracer:
+    """
+    Гистограммы длительности по (тип трассы, стадия) и кольцевой буфер keep
+    самых медленных последних решений с полной разбивкой. Медленное — дольше
+    slow_ms, а при slow_ms=0 — дольше текущего p90 своего типа (порог
+    пересчитывается раз в 64 трассы, до 20 трасс в буфер идут все).
+    """
+
+    def __init__(self, keep: int = 100, slow_ms: float = 0.0, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.stages: Dict[Tuple[str, str], Histogram] = {}
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._p90: Dict[str, float] = {}
+
+    def configure(self, keep: Optional[int] = None, slow_ms: Optional[float] = None,
+                  enabled: Optional[bool] = None) -> None:
+        if keep is not None:
+            self.slow = deque(self.slow, maxlen=keep)
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if enabled is not None:
+            self.enabled = enabled
+
+    def start(self, kind: str, key: str = "", t0: Optional[int] = None) -> Trace:
+        return Trace(kind, key, t0) if self.enabled else NULL
+
+    def _hist(self, kind: str, stage: str) -> Histogram:
+        h = self.stages.get((kind, stage))
+        if h is None:
+            h = self.stages[(kind, stage)] = Histogram()
+        return h
+
+    def finish(self, tr: Trace) -> None:
+        if tr is NULL:
+            return
+        total = time.perf_counter_ns() - tr.t0
+        total_ms = total / 1e6
+        per: Dict[str, int] = {}
+        for stage, _, d in tr.spans:
+            per[stage] = per.get(stage, 0) + d
+        for stage, d in per.items():
+            self._hist(tr.kind, stage).add(d / 1e6)
+        h = self._hist(tr.kind, "total")
+        h.add(total_ms)
+        if self.slow_ms > 0:
+            threshold = self.slow_ms
+        else:
+            if h.count < 20:
+                threshold = 0.0
+            elif h.count % 64 == 0 or tr.kind not in self._p90:
+                threshold = self._p90[tr.kind] = h.quantile(0.90)
+            else:
+                threshold = self._p90[tr.kind]
+        if total_ms >= threshold:
+            item = tr.to_dict(total)
+            item["ts"] = time.time()
+            self.slow.append(item)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        out: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (kind, stage), h in sorted(self.stages.items()):
+            out.setdefault(kind, {})[stage] = h.snapshot()
+        return out
+
+    def slowest(self, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        items = [x for x in self.slow if kind is None or x["kind"] == kind]
+        return sorted(items, key=lambda x: x["total_ms"], reverse=True)[:limit]
+
+
+# общий на процесс трассировщик (/trace)
+tracer = Tracer()
@@ -1,13 +1,24 @@
+import asyncio
 import math
+import time
 
 from aiohttp import web
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
-from exchanges.bithumb import BithumbClient
-from engine.executor import Executor
+from engine.inventory import inventory
+from exchanges.connections import pools
+from exchanges.ratelimit import limiters
+from exchanges.venues import ClientRegistry
+from engine.events import LatencyStats
+from engine.executor import Executor, leg_stats
+from engine.hedges import hedges
+from engine.quotes import quotes
 from storage.journal_csv import append_trade, read_last_trades, pnl_summary
 from storage.positions_csv import save_open_position, list_open_positions, find_open_position, close_position
 from utils import news_parser
+from utils.prom import http_seconds, loop_lag_last, loop_lag_seconds, registry, snapshot_family, \
+    watch_loop_lag
+from utils.trace import tracer
 
 
 def choose_symbol_on_bithumb(bh, base: str, preferred_quote: str) -> str:
@@ -23,9 +34,9 @@ def choose_symbol_on_bithumb(bh, base: str, preferred_quote: str) -> str:
     if want in bh._markets:
         return want
 
-    for s, m in bh._markets.items():
-        if (m.get("base") or "").upper() == base:
-            return s
+    sym = bh.rules_index().by_base.get(base)
+    if sym is not None:
+        return sym
 
     raise RuntimeError(f"{bh.name} has no market for base {base}")
 
@@ -36,22 +47,102 @@ class State:
         self.success_trades = 0
         self.avg_spread_bps = 0.0
         self.avg_execution_ms = 0.0
+        self.last_cycle_ms = 0.0
+        self.avg_cycle_ms = 0.0
+        # событийный режим: апдейт стакана -> решение / -> отправка ордера, мкс
+        self.tick_to_decision = LatencyStats()
+        self.tick_to_dispatch = LatencyStats()
+        self.rate_wait_ms = 0.0  # сколько trade_once ждал бюджет запросов
+        self.http_latency: Dict[str, LatencyStats] = {}  # путь -> время ответа, мкс
+        self.risk: Optional[Any] = None  # RiskEngine торгового цикла (main)
+        self.poller: Optional[Any] = None  # PollScheduler адаптивного опроса (main)
+        self.recorder: Optional[Any] = None  # BookRecorder записи стаканов (main)
+        # куда evaluate_symbol пишет сделку; бэктест собирает журнал в памяти
+        self.journal: Callable[[Dict[str, Any]], None] = append_trade
+        self.last_spread: Dict[str, float] = {}  # символ -> последний лучший спред, б.п.
         self.last_error = ""
 
 async def handle_root(request: web.Request) -> web.Response:
     return web.json_response({"ok": True, "see": [
         "/metrics", "/trades?limit=20", "/pnl",
         "/simulate_news", "/positions", "/close_position",
-        "/hedge_sim_open", "/news_token", 
+        "/hedge_sim_open", "/news_token", "/hedges", "/trace",
         ]})
 
+def _prom_state(st: State) -> List[str]:
+    # счётчики и снимки модулей — считаются при выдаче, горячий путь их не трогает
+    lines: List[str] = []
+    lines += snapshot_family("arb_trades_total", "counter", "Hedges dispatched",
+                             {(): st.total_trades})
+    lines += snapshot_family("arb_trades_success_total", "counter",
+                             "Hedges with both legs filled (dry-run counts as success)",
+                             {(): st.success_trades})
+    lines += snapshot_family("arb_rate_wait_seconds", "gauge",
+                             "Last trade_once wait for exchange request budget",
+                             {(): st.rate_wait_ms / 1000.0})
+    q = quotes.stats()
+    lines += snapshot_family("arb_quote_cache_requests_total", "counter", "Order book cache reads",
+                             {(r,): q[r] for r in ("hits", "misses", "coalesced", "stale")},
+                             ["result"])
+    lims = {name: lim.stats() for name, lim in limiters.items()}
+    if lims:
+        lines += snapshot_family("arb_rate_limit_usage", "gauge", "Share of request budget in use",
+                                 {(n,): x["usage"] for n, x in lims.items()}, ["venue"])
+    legs = leg_stats
+    if legs.timeouts:
+        lines += snapshot_family("arb_leg_timeouts_total", "counter", "Hedge legs past timeout",
+                                 dict(legs.timeouts), ["venue", "side"])
+    if legs.errors:
+        lines += snapshot_family("arb_leg_errors_total", "counter", "Hedge legs rejected",
+                                 dict(legs.errors), ["venue", "side"])
+    hs = hedges.stats()
+    lines += snapshot_family("arb_hedges_active", "gauge", "Hedges not yet settled",
+                             {(): hs["active"]})
+    if hs["done"]:
+        lines += snapshot_family("arb_hedges_done_total", "counter", "Settled hedges by final state",
+                                 {(k,): v for k, v in hs["done"].items()}, ["state"])
+    if st.risk is not None:
+        r = st.risk.stats()
+        lines += snapshot_family("arb_risk_daily_spent_usd", "gauge", "Notional spent today (UTC)",
+                                 {(): r["daily_spent_usd"]})
+        if r["exposure_venue"]:
+            lines += snapshot_family("arb_risk_exposure_usd", "gauge",
+                                     "Notional of open hedges per venue",
+                                     {(k,): v for k, v in r["exposure_venue"].items()}, ["venue"])
+        if r["rejects"]:
+            lines += snapshot_family("arb_risk_rejects_total", "counter", "Pre-trade risk rejects",
+                                     {(k,): v for k, v in r["rejects"].items()}, ["reason"])
+    return lines
+
+
 async def handle_metrics(request: web.Request) -> web.Response:
+    # Prometheus text format; /metrics?format=json — прежний JSON со снимками модулей
     st: State = request.app["state"]
+    if request.query.get("format") != "json":
+        body = "\n".join(registry.render() + _prom_state(st)) + "\n"
+        return web.Response(body=body.encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
     data: Dict[str, Any] = {
         "total_trades": st.total_trades,
         "success_trades": st.success_trades,
         "avg_spread_bps": round(st.avg_spread_bps, 4),
         "avg_execution_ms": round(st.avg_execution_ms, 2),
+        "last_cycle_ms": round(st.last_cycle_ms, 2),
+        "avg_cycle_ms": round(st.avg_cycle_ms, 2),
+        "tick_to_decision": st.tick_to_decision.snapshot(),
+        "tick_to_dispatch": st.tick_to_dispatch.snapshot(),
+        "quotes": quotes.stats(),
+        "rate_limits": {name: lim.stats() for name, lim in limiters.items()},
+        "rate_wait_ms": round(st.rate_wait_ms, 1),
+        "connections": pools.stats(),
+        "inventory": inventory.stats(),
+        "execution": leg_stats.snapshot(),  # отправка -> ответ по биржам и сторонам, мс
+        "hedges": hedges.stats(),
+        "risk": st.risk.stats() if st.risk is not None else None,
+        "poll": st.poller.snapshot() if st.poller is not None else None,
+        "recorder": st.recorder.stats() if st.recorder is not None else None,
+        "http": {k: v.snapshot() for k, v in st.http_latency.items()},
+        "loop_lag_ms": round(loop_lag_last.value * 1000.0, 2),
         "last_error": st.last_error,
     }
     return web.json_response(data)
@@ -92,10 +183,73 @@ async def handle_pnl(request: web.Request) -> web.Response:
     return web.json_response(data)
 
 
-def build_app(state: State, settings=None) -> web.Application:
-    app = web.Application()
+@web.middleware
+async def latency_middleware(request: web.Request, handler):
+    t0 = time.perf_counter_ns()
+    try:
+        return await handler(request)
+    finally:
+        dt = time.perf_counter_ns() - t0
+        st: State = request.app["state"]
+        # ключ — маршрут, а не сырой путь: мусорные URL не плодят ни ключи, ни серии
+        route = request.match_info.route.resource
+        path = route.canonical if route is not None else "unmatched"
+        stats = st.http_latency.get(path)
+        if stats is None:
+            stats = st.http_latency[path] = LatencyStats()
+        stats.add(dt / 1000.0)
+        http_seconds.labels(path).observe(dt / 1e9)
+
+
+def web_client_names(settings) -> List[str]:
+    # прогрев — только живые биржи из VENUES; без настроек или с sim-биржами
+    # (офлайн-режим) клиенты открываются по первому запросу, если он будет.
+    # Bithumb нужен только с ключами (иначе /simulate_news работает офлайн)
+    if settings is None:
+        return []
+    venues = [v.lower() for v in getattr(settings, "venues", [])]
+    if any(v.startswith("sim") for v in venues):
+        return []
+    names = []
+    if getattr(settings, "bithumb_api_key", "") or getattr(settings, "bithumb_api_secret", ""):
+        names.append("bithumb")
+    return names + [v for v in venues if v != "bithumb"]
+
+
+async def _start_loop_lag(app: web.Application) -> None:
+    interval = getattr(app["settings"], "loop_lag_interval_ms", 100) / 1000.0
+    app["loop_lag"] = asyncio.create_task(watch_loop_lag(loop_lag_seconds, loop_lag_last, interval))
+
+
+async def _stop_loop_lag(app: web.Application) -> None:
+    app["loop_lag"].cancel()
+    await asyncio.gather(app["loop_lag"], return_exceptions=True)
+
+
+async def _start_clients(app: web.Application) -> None:
+    # прогрев в фоне: HTTP поднимается сразу, первый запрос дождётся открытия
+    names = web_client_names(app["settings"])
+    app["clients_warmup"] = asyncio.create_task(app["clients"].start(names))
+
+
+async def _close_clients(app: web.Application) -> None:
+    warm = app.get("clients_warmup")
+    if warm is not None:
+        warm.cancel()
+        await asyncio.gather(warm, return_exceptions=True)
+    await app["clients"].close()
+
+
+def build_app(state: State, settings=None,
+              clients: Optional[ClientRegistry] = None) -> web.Application:
+    app = web.Application(middlewares=[latency_middleware])
     app["state"] = state
     app["settings"] = settings
+    app["clients"] = clients or ClientRegistry(settings)
+    app.on_startup.append(_start_clients)
+    app.on_startup.append(_start_loop_lag)
+    app.on_cleanup.append(_close_clients)
+    app.on_cleanup.append(_stop_loop_lag)
     app.router.add_get("/", handle_root)
     app.router.add_get("/pnl", handle_pnl)
     app.router.add_get("/trades", handle_trades)
@@ -105,15 +259,46 @@ def build_app(state: State, settings=None) -> web.Application:
     app.router.add_get("/simulate_news", handle_simulate_news)
     app.router.add_get("/hedge_sim_open", handle_hedge_sim_open)
     app.router.add_get("/close_position", handle_close_position_get)
+    app.router.add_get("/hedges", handle_hedges)
+    app.router.add_get("/trace", handle_trace)
+    return app
+
+
+async def handle_shards(request: web.Request) -> web.Response:
+    # супервизор SHARDS=N: метрики шардов сложены; ?format=json — по шардам и общий бюджет
+    sup = request.app["supervisor"]
+    if request.query.get("format") != "json":
+        body = "\n".join(sup.prom()) + "\n"
+        return web.Response(body=body.encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+    return web.json_response(sup.snapshot())
+
+
+async def handle_shards_root(request: web.Request) -> web.Response:
+    return web.json_response({"ok": True, "see": ["/metrics", "/metrics?format=json"]})
+
+
+def build_supervisor_app(supervisor) -> web.Application:
+    # торговли в процессе супервизора нет — только сводка шардов
+    app = web.Application()
+    app["supervisor"] = supervisor
+    app.router.add_get("/", handle_shards_root)
+    app.router.add_get("/metrics", handle_shards)
     return app
 
 
-async def run_http(state: State, host: str = "0.0.0.0", port: int = 8000, settings=None) -> None:
-    app = build_app(state, settings=settings)
+async def run_http(state: State, host: str = "0.0.0.0", port: int = 8000, settings=None,
+                   app: Optional[web.Application] = None) -> None:
+    app = app or build_app(state, settings=settings)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, host, port)
     await site.start()
+    try:
+        # живём до отмены задачи — тогда cleanup закроет клиентов бирж
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def handle_news_token(request: web.Request) -> web.Response:
@@ -141,6 +326,36 @@ async def handle_hedge_sim_open(request: web.Request) -> web.Response:
         return web.json_response({"ok": False, "error": str(e)}, status=400)
 
 
+async def handle_hedges(request: web.Request) -> web.Response:
+    # /hedges?id=12 — один хедж; /hedges?state=active|filled|stuck...&limit=50 — список
+    hid = request.query.get("id")
+    if hid:
+        h = hedges.get(int(hid)) if hid.isdigit() else None
+        if h is None:
+            return web.json_response({"ok": False, "error": "not found"}, status=404)
+        return web.json_response({"ok": True, "item": h.to_dict()})
+    try:
+        limit = int(request.query.get("limit", "50"))
+    except ValueError:
+        limit = 50
+    items = hedges.list(state=request.query.get("state"), limit=limit)
+    return web.json_response({"ok": True, "stats": hedges.stats(), "count": len(items), "items": items})
+
+
+async def handle_trace(request: web.Request) -> web.Response:
+    # /trace?kind=decision&limit=20 — гистограммы стадий (мс) и самые медленные решения
+    try:
+        limit = int(request.query.get("limit", "20"))
+    except ValueError:
+        limit = 20
+    kind = request.query.get("kind")
+    stages = tracer.snapshot()
+    if kind:
+        stages = {kind: stages.get(kind, {})}
+    return web.json_response({"ok": True, "enabled": tracer.enabled, "stages": stages,
+                              "slowest": tracer.slowest(limit=limit, kind=kind)})
+
+
 async def handle_positions(request: web.Request) -> web.Response:
     try:
         symbol = request.query.get("symbol")
@@ -222,14 +437,15 @@ async def handle_simulate_news(request: web.Request) -> web.Response:
         bid = ask = None
         m: Dict[str, Any] = {}
 
+        clients: ClientRegistry = request.app["clients"]
+
         if api_key or api_secret:
-            async with BithumbClient(api_key, api_secret) as bh_client:
-                bh = bh_client
-                sym = choose_symbol_on_bithumb(bh, ticker, quote)
-                ob = await bh.get_orderbook(sym)
-                bid = float(ob["bids"][0][0])
-                ask = float(ob["asks"][0][0])
-                m = getattr(bh, "_markets", {}).get(sym, {}) or {}
+            bh = await clients.get("bithumb")
+            sym = choose_symbol_on_bithumb(bh, ticker, quote)
+            ob = await quotes.get(bh, sym)
+            bid = float(ob["bids"][0][0])
+            ask = float(ob["asks"][0][0])
+            m = getattr(bh, "_markets", {}).get(sym, {}) or {}
         else:
             ask = 158_800_000.0
             bid = 158_780_000.0
@@ -346,23 +562,23 @@ async def handle_simulate_news(request: web.Request) -> web.Response:
             best_bid2 = -1.0
 
             try:
-                from exchanges.gate import GateClient
-                async with GateClient(getattr(s, "gate_api_key", ""), getattr(s, "gate_api_secret", "")) as ex2:
-                    ob2 = await ex2.get_orderbook(sym)
-                    bid2 = float(ob2["bids"][0][0])
-                    if bid2 > best_bid2:
-                        best_bid2, best_ex = bid2, "gate"
+                ob2 = quotes.peek("gate", sym)
+                if ob2 is None:
+                    ob2 = await quotes.get(await clients.get("gate"), sym)
+                bid2 = float(ob2["bids"][0][0])
+                if bid2 > best_bid2:
+                    best_bid2, best_ex = bid2, "gate"
             except Exception:
                 pass
 
             # Bybit
             try:
-                from exchanges.bybit import BybitClient
-                async with BybitClient(getattr(s, "bybit_api_key", ""), getattr(s, "bybit_api_secret", "")) as ex2:
-                    ob2 = await ex2.get_orderbook(sym)
-                    bid2 = float(ob2["bids"][0][0])
-                    if bid2 > best_bid2:
-                        best_bid2, best_ex = bid2, "bybit"
+                ob2 = quotes.peek("bybit", sym)
+                if ob2 is None:
+                    ob2 = await quotes.get(await clients.get("bybit"), sym)
+                bid2 = float(ob2["bids"][0][0])
+                if bid2 > best_bid2:
+                    best_bid2, best_ex = bid2, "bybit"
             except Exception:
                 pass
 